@@ -0,0 +1,60 @@
+"""
+Benchmark of the email validation engines on adversarial inputs.
+
+Compares the latency of the backtracking regular expression with the linear time scanner, on
+crafted inputs of growing length. The scanner should stay flat relative to the input length,
+and the strict scanner should stay flat regardless of the input length, because it rejects
+oversized inputs before scanning them.
+
+Usage:
+    python benchmarks/bench_adversarial_validation.py
+"""
+
+import time
+
+import harness  # noqa: F401 (puts the checkout on the path)
+
+from extract_email_from_http_header import validate_email
+
+# Constants.
+LENGTHS = (64, 1024, 16384, 65536)
+REPEAT = 20
+ENGINES = (validate_email.ENGINE_REGULAR_EXPRESSION,
+           validate_email.ENGINE_SCANNER,
+           validate_email.ENGINE_SCANNER_STRICT)
+
+
+def adversarial_inputs(length: int):
+    """Build inputs that make the regular expression backtrack, of roughly the given length."""
+
+    half = max(length // 2, 1)
+    return {
+        "many_labels_bad_end": "a@" + "a." * half + "!",
+        "many_labels_long_tld": "a@" + "ab." * (length // 3) + "abcde",
+        "long_local_part_no_at": "a" * length,
+        "long_label_bad_end": "a@" + "a" * length + ".a",
+    }
+
+
+def time_call(function, argument, repeat: int = REPEAT):
+    """Return the best time of a call, in microseconds."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def main():
+
+    print("%-24s %8s %22s %22s %22s" % (("input", "length") + ENGINES))
+    for length in LENGTHS:
+        for name, email in adversarial_inputs(length).items():
+            timings = [time_call(validate_email.get_matcher(engine), email) for engine in ENGINES]
+            print("%-24s %8d %20.1fus %20.1fus %20.1fus" % ((name, len(email)) + tuple(timings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of the memory-mapped denylist.
+
+Compiles a denylist of random domains, and reports the time to compile it, its size on disk, the
+latency of a lookup that is denied and of one that is not, and the latency of validate_email()
+with and without the denylist. Then reports the resident memory of the process after every page
+of the denylist was read, split into the private memory of the process and the pages of the file,
+which every process of the host shares. For comparison, it loads the same domains into a set, as
+each process would otherwise do.
+
+Usage:
+    python benchmarks/bench_denylist.py [--entries 1000000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+import harness
+
+from extract_email_from_http_header import domain_denylist
+from extract_email_from_http_header import validate_email
+
+# Constants.
+EMAIL = "alice.smith@mail.corp.com"
+SEED = 0
+
+# The fields of /proc/self/status holding the private and the file backed resident memory.
+STATUS_PRIVATE = "RssAnon:"
+STATUS_FILE = "RssFile:"
+
+
+def random_domains(count: int):
+    """Return the given number of distinct random domains."""
+
+    generator = random.Random(SEED)
+    letters = string.ascii_lowercase + string.digits
+    domains = set()
+    while len(domains) < count:
+        domains.add("".join(generator.choices(letters, k=generator.randint(6, 14))) + "."
+                    + generator.choice(("com", "net", "org", "io", "xyz")))
+    return sorted(domains)
+
+
+def resident_memory():
+    """Return the private and the file backed resident memory of the process, in bytes, or None
+    where /proc is not available."""
+
+    try:
+        with open("/proc/self/status") as file:
+            fields = dict(line.split(None, 1) for line in file if line.startswith((STATUS_PRIVATE, STATUS_FILE)))
+    except OSError:
+        return None, None
+    return int(fields[STATUS_PRIVATE].split()[0]) * 1024, int(fields[STATUS_FILE].split()[0]) * 1024
+
+
+def megabytes(value) -> str:
+    return "n/a" if value is None else "%.1f MB" % (value / 1e6)
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000000)
+    arguments = parser.parse_args(arguments)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Write the source file, and compile it.
+        source = os.path.join(directory, "denylist.txt")
+        path = os.path.join(directory, "denylist.bin")
+        domains = random_domains(arguments.entries)
+        with open(source, "w") as file:
+            file.write("\n".join(domains) + "\n")
+        denied_email = "someone@" + domains[len(domains) // 2]
+        del domains
+        gc.collect()
+
+        started = time.perf_counter()
+        count = domain_denylist.compile_denylist_files([source], path)
+        compile_seconds = time.perf_counter() - started
+        print("%d entries compiled in %.2f s, %s on disk" % (count, compile_seconds, megabytes(os.path.getsize(path))))
+
+        # Latency.
+        gc.collect()
+        private_before, file_before = resident_memory()
+        denylist = domain_denylist.DomainDenylist(path)
+        harness.print_results([
+            harness.run("denylist/denied", lambda: denylist.matches(denied_email)),
+            harness.run("denylist/not denied", lambda: denylist.matches(EMAIL)),
+            harness.run("validate_email/without denylist", lambda: validate_email.validate_email(EMAIL)),
+            harness.run("validate_email/with denylist", lambda: validate_email.validate_email(EMAIL, denylist=denylist)),
+        ])
+
+        # Memory, once every page of the file was read.
+        sum(memoryview(denylist._map)[::4096])
+        private_after, file_after = resident_memory()
+        print("denylist: %s private, %s of shared file pages" % (
+            megabytes(None if private_before is None else private_after - private_before),
+            megabytes(None if file_before is None else file_after - file_before)))
+        denylist.close()
+
+        gc.collect()
+        private_before, _ = resident_memory()
+        with open(source) as file:
+            domain_set = set(line.strip() for line in file)
+        private_after, _ = resident_memory()
+        print("set of %d domains: %s private" % (len(domain_set), megabytes(
+            None if private_before is None else private_after - private_before)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
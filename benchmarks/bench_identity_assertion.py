@@ -0,0 +1,111 @@
+"""
+Benchmark of the extraction of the email from a signed identity assertion.
+
+Compares reading a plain email header with verifying an assertion on every call (no cache) and
+with the verified assertion taken from the cache, as on every rerun of a session after the
+first, for each algorithm. The keys are generated, and the key set is written to a temporary
+file. Without cryptography, only HS256 is measured.
+
+Usage:
+    python benchmarks/bench_identity_assertion.py
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+
+import harness
+
+from extract_email_from_http_header import extract_email_from_headers
+from extract_email_from_http_header import identity_assertion
+
+# Optional dependency. cryptography is only needed to sign with RS256 and ES256.
+try:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.asymmetric import utils
+except ImportError:
+    hashes = ec = padding = rsa = utils = None
+
+# Constants.
+EMAIL = "alice.smith@mail.corp.com"
+ASSERTION_HEADER = "X-Assertion"
+
+
+def encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+def encode_integer(value: int, size: int | None = None) -> str:
+    return encode(value.to_bytes(size or (value.bit_length() + 7) // 8, "big"))
+
+
+def sign(algorithm: str, kid: str, key, claims: dict) -> str:
+    """Return an assertion with the given claims, signed with the given private key."""
+
+    header = encode(json.dumps({"alg": algorithm, "kid": kid, "typ": "JWT"}).encode("utf-8"))
+    payload = encode(json.dumps(claims).encode("utf-8"))
+    signing_input = (header + "." + payload).encode("ascii")
+    if algorithm == identity_assertion.ALGORITHM_HS256:
+        signature = hmac.new(key, signing_input, hashlib.sha256).digest()
+    elif algorithm == identity_assertion.ALGORITHM_RS256:
+        signature = key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+    else:
+        r, s = utils.decode_dss_signature(key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+    return header + "." + payload + "." + encode(signature)
+
+
+def main():
+
+    secret = os.urandom(32)
+    jwks = {"keys": [{"kty": "oct", "kid": "hs", "k": encode(secret)}]}
+    signers = [(identity_assertion.ALGORITHM_HS256, "hs", secret)]
+    if rsa is not None:
+        rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        ec_key = ec.generate_private_key(ec.SECP256R1())
+        rsa_numbers = rsa_key.public_key().public_numbers()
+        ec_numbers = ec_key.public_key().public_numbers()
+        jwks["keys"] += [
+            {"kty": "RSA", "kid": "rs", "n": encode_integer(rsa_numbers.n), "e": encode_integer(rsa_numbers.e)},
+            {"kty": "EC", "kid": "es", "crv": "P-256", "x": encode_integer(ec_numbers.x, 32),
+             "y": encode_integer(ec_numbers.y, 32)},
+        ]
+        signers += [(identity_assertion.ALGORITHM_RS256, "rs", rsa_key), (identity_assertion.ALGORITHM_ES256, "es", ec_key)]
+    else:
+        print("cryptography is not installed: skipping RS256 and ES256.")
+    claims = {"email": EMAIL, "exp": time.time() + 3600}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jwks.json")
+        with open(path, "w") as file:
+            json.dump(jwks, file)
+
+        session_state = {}
+        plain_headers = {"X-Email": EMAIL}
+        results = [harness.run("plain header", lambda: extract_email_from_headers.extract_email_from_headers(
+            session_state, header_key="X-Email", headers=plain_headers))]
+
+        for algorithm, kid, key in signers:
+            headers = {ASSERTION_HEADER: sign(algorithm, kid, key, claims)}
+            for name, max_size in (("no cache", 0), ("cached", identity_assertion.DEFAULT_MAX_SIZE)):
+                verifier = identity_assertion.AssertionVerifier(path, max_size=max_size)
+                results.append(harness.run(
+                    algorithm + "/" + name,
+                    lambda headers=headers, verifier=verifier: extract_email_from_headers.extract_email_from_headers(
+                        session_state, header_key=ASSERTION_HEADER, headers=headers, assertion_verifier=verifier)))
+
+        harness.print_results(results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Import time of the package and of its submodules, each measured in a fresh interpreter.
+
+Also checks that the submodules that do not need Streamlit can be imported without importing
+it, and, if a budget is given, that each of them imports within the budget. The exit status is 1
+if any of them pulls in Streamlit or is over the budget, so this can be run by CI. The modules
+whose dependencies are not installed are reported as skipped. The same Streamlit check runs as a
+test in tests/test_import_time.py.
+
+Usage:
+    python benchmarks/bench_import_time.py [--budget-ms MS]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Constants.
+PACKAGE = "extract_email_from_http_header"
+
+# The root of the checkout. The modules are imported from there, ahead of an installed copy.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules that must be importable without importing Streamlit.
+STREAMLIT_FREE_MODULES = (
+    PACKAGE,
+    PACKAGE + ".canonicalize_email",
+    PACKAGE + ".domain_allowlist",
+    PACKAGE + ".domain_denylist",
+    PACKAGE + ".email_scanner",
+    PACKAGE + ".extract_email_from_access_logs",
+    PACKAGE + ".extract_email_from_raw_headers",
+    PACKAGE + ".identity_assertion",
+    PACKAGE + ".instrumentation",
+    PACKAGE + ".middleware",
+    PACKAGE + ".output",
+    PACKAGE + ".shared_cache",
+    PACKAGE + ".validate_email",
+    PACKAGE + ".validate_email_async",
+    PACKAGE + ".validate_email_cache",
+    PACKAGE + ".validate_email_parallel",
+    PACKAGE + ".validate_email_vectorized",
+)
+
+# The modules that need Streamlit.
+STREAMLIT_MODULES = (
+    PACKAGE + ".extract_email_from_headers",
+    PACKAGE + ".session_cache",
+    PACKAGE + ".streamlit_helper_email_input",
+    PACKAGE + ".streamlit_helper_multi_email_input",
+)
+
+# The message of an import that failed because a module is not installed.
+MISSING_MODULE = re.compile(r"ModuleNotFoundError: No module named '([^']+)'")
+
+PROBE = """
+import sys, time, tracemalloc
+tracemalloc.start()
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed, tracemalloc.get_traced_memory()[1], "streamlit" in sys.modules)
+"""
+
+
+class MissingDependencyError(Exception):
+    """A module could not be imported because one of its dependencies is not installed."""
+
+
+def probe(module: str):
+    """Import the given module in a fresh interpreter, and return the import time in seconds, the
+    peak memory allocated in bytes, and whether Streamlit was imported. Raise
+    MissingDependencyError if a dependency of the module is not installed."""
+
+    completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=ROOT, capture_output=True,
+                               text=True)
+    if completed.returncode != 0:
+        missing = MISSING_MODULE.search(completed.stderr)
+        if missing is not None and not missing.group(1).startswith(PACKAGE):
+            raise MissingDependencyError(missing.group(1))
+        raise RuntimeError("Importing " + module + " failed:\n" + completed.stderr)
+    output = completed.stdout.split()
+    return float(output[0]), int(output[1]), output[2] == "True"
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=None, metavar="MS",
+                        help="Fail if a module that does not need Streamlit takes longer than this to import.")
+    arguments = parser.parse_args(arguments)
+
+    failures = []
+    over_budget = []
+    print("%-64s %10s %12s %10s" % ("module", "ms", "peak KiB", "streamlit"))
+    for module in STREAMLIT_FREE_MODULES + STREAMLIT_MODULES:
+        try:
+            elapsed, peak, imports_streamlit = probe(module)
+        except MissingDependencyError as error:
+            print("%-64s %s" % (module, "skipped, " + str(error) + " is not installed"))
+            continue
+        print("%-64s %10.1f %12.0f %10s" % (module, elapsed * 1e3, peak / 1024, imports_streamlit))
+        if module in STREAMLIT_FREE_MODULES:
+            if imports_streamlit:
+                failures.append(module)
+            if arguments.budget_ms is not None and elapsed * 1e3 > arguments.budget_ms:
+                over_budget.append(module)
+
+    if failures:
+        print("These modules import Streamlit: " + ", ".join(failures))
+    if over_budget:
+        print("These modules take longer than %g ms to import: %s" % (arguments.budget_ms, ", ".join(over_budget)))
+    return 1 if failures or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
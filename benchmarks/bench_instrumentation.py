@@ -0,0 +1,64 @@
+"""
+Benchmark of the cost of the instrumentation.
+
+Measures validate_email() and the middleware identify() before the instrumentation is ever
+enabled, while it is enabled (with and without a hook), and after it is disabled again. The
+exit status is 1 if the disabled functions are not the original ones, so this can be run as a
+regression check that the disabled instrumentation costs nothing.
+
+Usage:
+    python benchmarks/bench_instrumentation.py
+"""
+
+import sys
+
+import harness
+
+from extract_email_from_http_header import instrumentation
+from extract_email_from_http_header import middleware
+from extract_email_from_http_header import validate_email
+
+# Constants.
+EMAIL = "alice.smith@mail.corp.com"
+ENDS_WITH = "@mail.corp.com"
+HEADERS = {"Host": "dashboard.corp.com", "User-Agent": "Mozilla/5.0", "X-Email": EMAIL}
+FUNCTIONS = ("validate_email.validate_email", "middleware.identify")
+
+
+def benchmarks():
+    """Return the benchmarks, calling the functions through their modules, as the package does."""
+
+    header_provider = middleware.MappingHeaderProvider()
+    return [
+        ("validate_email", lambda: validate_email.validate_email(EMAIL, ends_with=ENDS_WITH)),
+        ("identify", lambda: middleware.identify(HEADERS, header_provider, ends_with=ENDS_WITH)),
+    ]
+
+
+def run(state: str):
+    return [harness.run(name + "/" + state, function) for name, function in benchmarks()]
+
+
+def main():
+
+    originals = (validate_email.validate_email, middleware.identify)
+
+    results = run("never enabled")
+
+    instrumentation.enable(FUNCTIONS)
+    results += run("enabled")
+    instrumentation.add_hook(lambda name, result, elapsed: None)
+    results += run("enabled with hook")
+    instrumentation.disable()
+
+    results += run("disabled")
+    harness.print_results(sorted(results, key=lambda result: result[harness.FIELD_NAME]))
+
+    if (validate_email.validate_email, middleware.identify) != originals:
+        print("The disabled instrumentation did not put the original functions back.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark of the latency added by the ASGI and WSGI identity middleware.
+
+Calls a minimal application directly and through the middleware, with realistic request headers,
+and reports the latency of both and the difference. No server or network is involved, so the
+difference is the cost of the middleware alone.
+
+Usage:
+    python benchmarks/bench_middleware.py
+"""
+
+import asyncio
+import sys
+
+import harness
+
+from extract_email_from_http_header import middleware
+
+# Constants.
+EMAIL = "alice.smith@mail.corp.com"
+ENDS_WITH = "@mail.corp.com"
+ASGI_HEADERS = [(b"host", b"api.corp.com"),
+                (b"user-agent", b"Mozilla/5.0"),
+                (b"accept", b"application/json"),
+                (b"accept-encoding", b"gzip, deflate, br"),
+                (b"cookie", b"session=0123456789abcdef"),
+                (b"x-forwarded-for", b"10.0.0.1"),
+                (b"x-email", EMAIL.encode("latin-1"))]
+WSGI_ENVIRON = {"REQUEST_METHOD": "GET",
+                "PATH_INFO": "/",
+                "HTTP_HOST": "api.corp.com",
+                "HTTP_USER_AGENT": "Mozilla/5.0",
+                "HTTP_ACCEPT": "application/json",
+                "HTTP_ACCEPT_ENCODING": "gzip, deflate, br",
+                "HTTP_COOKIE": "session=0123456789abcdef",
+                "HTTP_X_FORWARDED_FOR": "10.0.0.1",
+                "HTTP_X_EMAIL": EMAIL}
+ASGI_REQUESTS_PER_CALL = 100
+
+
+async def asgi_application(scope, receive, send):
+    pass
+
+
+def wsgi_application(environ, start_response):
+    return []
+
+
+def asgi_benchmark(application):
+    """Return a function that sends a batch of requests through the given ASGI application. The
+    requests are batched so that the cost of running the event loop does not hide the middleware."""
+
+    loop = asyncio.new_event_loop()
+
+    async def requests():
+        for _ in range(ASGI_REQUESTS_PER_CALL):
+            await application({"type": "http", "headers": ASGI_HEADERS}, None, None)
+
+    return lambda: loop.run_until_complete(requests())
+
+
+def wsgi_benchmark(application):
+    """Return a function that sends a request through the given WSGI application."""
+
+    return lambda: application(dict(WSGI_ENVIRON), None)
+
+
+def main():
+
+    asgi_middleware = middleware.EmailIdentityASGIMiddleware(asgi_application, ends_with=ENDS_WITH)
+    wsgi_middleware = middleware.EmailIdentityWSGIMiddleware(wsgi_application, ends_with=ENDS_WITH)
+
+    results = [
+        harness.run("asgi/bare (x%d)" % ASGI_REQUESTS_PER_CALL, asgi_benchmark(asgi_application)),
+        harness.run("asgi/middleware (x%d)" % ASGI_REQUESTS_PER_CALL, asgi_benchmark(asgi_middleware)),
+        harness.run("wsgi/bare", wsgi_benchmark(wsgi_application)),
+        harness.run("wsgi/middleware", wsgi_benchmark(wsgi_middleware)),
+    ]
+    harness.print_results(results)
+
+    field = harness.FIELD_MEAN_MICROSECONDS
+    print("ASGI overhead per request: %.3f us" % ((results[1][field] - results[0][field]) / ASGI_REQUESTS_PER_CALL))
+    print("WSGI overhead per request: %.3f us" % (results[3][field] - results[2][field]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Benchmark of the parallel bulk validation.
+
+Validates the same input with 1, 2, 4, ... worker processes up to the number of CPUs, and
+reports the throughput and the speed-up relative to a single process. The speed-up should be
+close to the number of workers, up to the number of physical cores.
+
+Usage:
+    python benchmarks/bench_parallel_validation.py [--count N] [--chunk-size N]
+"""
+
+import argparse
+import os
+import time
+
+import harness  # noqa: F401 (puts the checkout on the path)
+
+from extract_email_from_http_header import validate_email
+from extract_email_from_http_header import validate_email_parallel
+
+# Constants.
+SAMPLE_EMAILS = ("alice@corp.com", "bob.smith@mail.example.org", "not-an-email", "carol@sub.corp.co",
+                 "dave@localhost", "eve-99@example.io")
+
+
+def worker_counts():
+    """Return 1, 2, 4, ... up to the number of CPUs, including the number of CPUs itself."""
+
+    cpus = os.cpu_count() or 1
+    counts = []
+    count = 1
+    while count < cpus:
+        counts.append(count)
+        count *= 2
+    counts.append(cpus)
+    return counts
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=4000000)
+    parser.add_argument("--chunk-size", type=int, default=validate_email_parallel.DEFAULT_CHUNK_SIZE)
+    arguments = parser.parse_args()
+
+    emails = [SAMPLE_EMAILS[index % len(SAMPLE_EMAILS)] for index in range(arguments.count)]
+    expected = validate_email.validate_emails(emails, ends_with=".com")[0]
+
+    baseline = None
+    print("%8s %12s %16s %10s" % ("workers", "seconds", "emails/second", "speed-up"))
+    for workers in worker_counts():
+        started = time.perf_counter()
+        results = validate_email_parallel.validate_emails_parallel(emails, ends_with=".com", workers=workers,
+                                                                   chunk_size=arguments.chunk_size,
+                                                                   min_parallel_size=0)
+        elapsed = time.perf_counter() - started
+        assert results == expected, "The parallel results differ from the single process results."
+        baseline = baseline or elapsed
+        print("%8d %12.3f %16.0f %9.2fx" % (workers, elapsed, len(emails) / elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()
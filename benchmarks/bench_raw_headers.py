@@ -0,0 +1,81 @@
+"""
+Benchmark of the extraction of the email from a raw HTTP/1.1 header block.
+
+Compares the zero-copy scan of extract_email_from_raw_headers() with decoding the block and
+splitting it into a dictionary first. For each, reports the latency, and the peak memory
+allocated by one call, as measured by tracemalloc.
+
+Usage:
+    python benchmarks/bench_raw_headers.py
+"""
+
+import sys
+import tracemalloc
+
+import harness
+
+from extract_email_from_http_header import extract_email_from_raw_headers
+from extract_email_from_http_header import validate_email
+
+# Constants.
+EMAIL = "alice.smith@mail.corp.com"
+HEADER_BLOCK = (b"GET /dashboard HTTP/1.1\r\n"
+                b"Host: dashboard.corp.com\r\n"
+                b"User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)\r\n"
+                b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+                b"Accept-Language: en-US,en;q=0.5\r\n"
+                b"Accept-Encoding: gzip, deflate, br\r\n"
+                b"Cookie: session=0123456789abcdef0123456789abcdef; theme=dark\r\n"
+                b"X-Forwarded-For: 10.0.0.1, 10.0.0.2\r\n"
+                b"X-Forwarded-Proto: https\r\n"
+                b"X-Email: " + EMAIL.encode("latin-1") + b"\r\n"
+                b"Connection: keep-alive\r\n"
+                b"\r\n")
+
+
+def parse_into_dictionary(block):
+    """The straightforward way: decode the block, split it into a dictionary, and look up the header."""
+
+    headers = {}
+    for line in bytes(block).decode("latin-1").split("\r\n")[1:]:
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    email = headers.get("x-email")
+    return validate_email.validate_email(email, engine=validate_email.ENGINE_SCANNER)
+
+
+def peak_allocated_bytes(function) -> int:
+    """Return the peak memory allocated by one call of the given function."""
+
+    function()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+
+    view = memoryview(HEADER_BLOCK)
+    benchmarks = [
+        ("dictionary/bytes", lambda: parse_into_dictionary(HEADER_BLOCK)),
+        ("raw/bytes", lambda: extract_email_from_raw_headers.extract_email_from_raw_headers(HEADER_BLOCK)),
+        ("raw/memoryview", lambda: extract_email_from_raw_headers.extract_email_from_raw_headers(view)),
+    ]
+
+    harness.print_results([harness.run(name, function) for name, function in benchmarks])
+    print()
+    print("%-50s %12s" % ("benchmark", "peak bytes"))
+    for name, function in benchmarks:
+        print("%-50s %12d" % (name, peak_allocated_bytes(function)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark and stress test of the cache of the mail server check shared by the processes of a host.
+
+First measures the latency of a lookup that hits, of a lookup that misses, and of a write, next to
+a hit of the DomainCache of a single process. A lookup of the name server, which the cache saves,
+takes milliseconds. Then starts several processes that look up and write the same domains through
+the same cache at the same time, and checks that every answer they get is the one that was
+written, and that the cache stays within its bounds. The exit status is 1 if any check fails, so
+this can be run as a regression check.
+
+Usage:
+    python benchmarks/bench_shared_cache.py [--processes 4] [--operations 5000]
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import harness
+
+from extract_email_from_http_header import shared_cache
+from extract_email_from_http_header import validate_email_async
+
+# Constants.
+DOMAIN = "mail.corp.com"
+STRESS_DOMAINS = ["domain%d.com" % index for index in range(1500)]
+STRESS_MAX_SIZE = 1000
+
+
+def has_mail_server(domain: str) -> bool:
+    """The answer of the fake name server of the stress test."""
+
+    return sum(map(ord, domain)) % 3 != 0
+
+
+def stress(path: str, worker: int, operations: int):
+    """Look up and write domains through the cache, and return the number of wrong answers and of
+    database errors."""
+
+    cache = shared_cache.SharedCache(path, max_size=STRESS_MAX_SIZE)
+    wrong = 0
+    for operation in range(operations):
+        domain = STRESS_DOMAINS[(operation * 7919 + worker * 104729) % len(STRESS_DOMAINS)]
+        answer = cache.get(domain)
+        if answer is None:
+            cache.set(domain, has_mail_server(domain))
+        elif answer is not has_mail_server(domain):
+            wrong += 1
+    return wrong, cache.info().errors
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=5000, help="Lookups per process.")
+    arguments = parser.parse_args(arguments)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Latency.
+        cache = shared_cache.SharedCache(os.path.join(directory, "latency.sqlite3"))
+        cache.set(DOMAIN, True)
+        domain_cache = validate_email_async.DomainCache()
+        domain_cache.set(DOMAIN, True)
+        misses = ("miss%d.com" % index for index in itertools.count())
+        writes = ("write%d.com" % index for index in itertools.count())
+        harness.print_results([
+            harness.run("domain_cache/hit", lambda: domain_cache.get(DOMAIN)),
+            harness.run("shared_cache/hit", lambda: cache.get(DOMAIN)),
+            harness.run("shared_cache/miss", lambda: cache.get(next(misses))),
+            harness.run("shared_cache/write", lambda: cache.set(next(writes), True)),
+        ])
+
+        # Concurrent writers.
+        path = os.path.join(directory, "stress.sqlite3")
+        shared_cache.SharedCache(path, max_size=STRESS_MAX_SIZE)
+        with multiprocessing.get_context("spawn").Pool(arguments.processes) as pool:
+            outcomes = pool.starmap(stress, [(path, worker, arguments.operations)
+                                             for worker in range(arguments.processes)])
+        wrong = sum(outcome[0] for outcome in outcomes)
+        errors = sum(outcome[1] for outcome in outcomes)
+        size = shared_cache.SharedCache(path, max_size=STRESS_MAX_SIZE).info().size
+        print("%d processes x %d lookups: %d wrong answers, %d database errors (counted as misses), "
+              "%d entries (max %d)" % (arguments.processes, arguments.operations, wrong, errors, size, STRESS_MAX_SIZE))
+
+    # The entries are evicted every EVICTION_INTERVAL writes per process, so there may be up to that
+    # many extra entries per process in between.
+    if wrong or size > STRESS_MAX_SIZE + arguments.processes * shared_cache.EVICTION_INTERVAL:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
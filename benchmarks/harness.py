@@ -0,0 +1,134 @@
+"""
+Small benchmark harness shared by the benchmark scripts.
+
+A benchmark is a function taking no argument. It is called in samples of a fixed number of
+calls, and the time of every sample is divided by the number of calls, so that the timer
+overhead does not dominate fast functions. The throughput and the latency percentiles are
+computed from the samples.
+
+The benchmarks are run as scripts from a checkout of the repository, as in
+"python benchmarks/run_benchmarks.py", so importing this module puts the root of the checkout on
+the path, ahead of an installed copy of the package. Every benchmark script imports it before the
+package.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+# The root of the checkout, which holds the package.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(1, ROOT)
+
+# Constants.
+DEFAULT_SAMPLES = 200
+DEFAULT_TARGET_SAMPLE_SECONDS = 0.002
+PERCENTILES = (50, 95, 99)
+
+# The fields of a result.
+FIELD_NAME = "name"
+FIELD_CALLS = "calls"
+FIELD_OPERATIONS_PER_SECOND = "operations_per_second"
+FIELD_MEAN_MICROSECONDS = "mean_us"
+
+
+def percentile_field(percentile: int) -> str:
+    return "p" + str(percentile) + "_us"
+
+
+def calibrate(function, target_seconds: float = DEFAULT_TARGET_SAMPLE_SECONDS) -> int:
+    """Find how many calls of the given function take about the given time."""
+
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds or calls >= 1 << 20:
+            return calls
+        calls *= 2
+
+
+def run(name: str, function, samples: int = DEFAULT_SAMPLES) -> dict:
+    """Run a benchmark and return its result."""
+
+    calls = calibrate(function)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append((time.perf_counter() - started) / calls)
+
+    timings.sort()
+    result = {
+        FIELD_NAME: name,
+        FIELD_CALLS: calls * samples,
+        FIELD_OPERATIONS_PER_SECOND: 1.0 / statistics.fmean(timings),
+        FIELD_MEAN_MICROSECONDS: statistics.fmean(timings) * 1e6,
+    }
+    for percentile in PERCENTILES:
+        index = min(len(timings) - 1, int(round(percentile / 100.0 * (len(timings) - 1))))
+        result[percentile_field(percentile)] = timings[index] * 1e6
+    return result
+
+
+def print_results(results, baseline: dict | None = None):
+    """Print the results as a table, with the change relative to the baseline if one is given."""
+
+    header = "%-50s %14s %10s" % ("benchmark", "ops/s", "mean us")
+    header += "".join(" %10s" % percentile_field(percentile) for percentile in PERCENTILES)
+    if baseline is not None:
+        header += " %10s" % "vs base"
+    print(header)
+
+    for result in results:
+        line = "%-50s %14.0f %10.3f" % (result[FIELD_NAME], result[FIELD_OPERATIONS_PER_SECOND],
+                                        result[FIELD_MEAN_MICROSECONDS])
+        line += "".join(" %10.3f" % result[percentile_field(percentile)] for percentile in PERCENTILES)
+        if baseline is not None:
+            change = relative_change(result, baseline)
+            line += " %10s" % ("n/a" if change is None else "%+9.1f%%" % (change * 100))
+        print(line)
+
+
+def relative_change(result: dict, baseline: dict):
+    """Return the relative change of the median latency against the baseline, positive when slower,
+    or None if the benchmark is not in the baseline. The median is used because it is less noisy
+    than the mean."""
+
+    base = baseline.get(result[FIELD_NAME])
+    if base is None:
+        return None
+    field = percentile_field(50)
+    return result[field] / base[field] - 1.0
+
+
+def save_baseline(results, path: str):
+    """Save the results as a baseline."""
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({result[FIELD_NAME]: result for result in results}, file, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> dict:
+    """Load a baseline saved by save_baseline()."""
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def regressions(results, baseline: dict, threshold: float):
+    """Return the names of the benchmarks that got slower than the baseline by more than the given
+    relative threshold."""
+
+    names = []
+    for result in results:
+        change = relative_change(result, baseline)
+        if change is not None and change > threshold:
+            names.append(result[FIELD_NAME])
+    return names
@@ -0,0 +1,237 @@
+"""
+Benchmark suite of the hot paths: the email validation, the email extraction, and a full rerun
+of the Streamlit helper.
+
+Runs offline: Streamlit's runtime is stubbed, so that the websocket headers are read from a fake
+connection, and the helper is given a fake session_state and a fake container, so no Streamlit
+server is needed. The headers are still read by Streamlit's _get_websocket_headers(), so its cost
+is measured; the deprecation warning that it logs on every call is not shown.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--filter TEXT] [--save-baseline FILE]
+                                        [--baseline FILE] [--threshold 0.10]
+
+With --baseline, the results are compared to a baseline saved by --save-baseline, and the
+exit status is 1 if any benchmark got slower by more than the threshold.
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import types
+
+import harness
+import streamlit.config
+import streamlit.logger
+from streamlit import runtime
+from streamlit.web.server import websocket_headers
+from streamlit.web.server.browser_websocket_handler import BrowserWebSocketHandler
+
+from extract_email_from_http_header import extract_email_from_headers
+from extract_email_from_http_header import session_cache
+from extract_email_from_http_header import streamlit_helper_email_input
+from extract_email_from_http_header import streamlit_helper_multi_email_input
+from extract_email_from_http_header import validate_email
+
+# Constants.
+VALID_EMAIL = "alice.smith@mail.corp.com"
+INVALID_EMAIL = "alice.smith@corp"
+ADVERSARIAL_EMAIL = "a@" + "a." * 2000 + "!"
+ENDS_WITH = "@mail.corp.com"
+HEADERS = {"Host": "dashboard.corp.com",
+           "User-Agent": "Mozilla/5.0",
+           "Accept": "*/*",
+           "X-Forwarded-Email": VALID_EMAIL,
+           "X-Email": VALID_EMAIL}
+HEADERS_WITHOUT_EMAIL = {"Host": "dashboard.corp.com", "User-Agent": "Mozilla/5.0", "Accept": "*/*"}
+WIDGET_KEY = "email"
+OUTPUT_KEY = "email_output"
+MULTI_EMAIL_INPUT_SIZES = (10, 100, 1000)
+
+# The script run context of every fake session.
+FAKE_CONTEXT = types.SimpleNamespace(session_id="session")
+
+
+class FakeSessionState(dict):
+    """Stands in for streamlit.session_state."""
+
+
+class FakeContainer:
+    """Stands in for a Streamlit container. Like a real widget, the text input returns the value
+    stored under its key in the session_state if there is one."""
+
+    def __init__(self, session_state):
+        self.session_state = session_state
+
+    def text_input(self, label, value="", key=None, **kwargs):
+        if key is not None:
+            value = self.session_state.setdefault(key, value)
+        return value
+
+    text_area = text_input
+
+
+class FakeRuntime(threading.local):
+    """Stands in for Streamlit's runtime. The session run by the current thread is connected by
+    the client set on it."""
+
+    client = None
+
+    def get_client(self, session_id):
+        return self.client
+
+
+FAKE_RUNTIME = FakeRuntime()
+
+
+def make_client(headers):
+    """Return a fake websocket connection, opened by a request with the given headers."""
+
+    client = object.__new__(BrowserWebSocketHandler)
+    client.request = types.SimpleNamespace(headers=headers)
+    return client
+
+
+def stub_runtime():
+    """Make Streamlit run every script in a fake session, connected by FAKE_RUNTIME.client."""
+
+    runtime.get_instance = lambda: FAKE_RUNTIME
+    websocket_headers.get_script_run_ctx = lambda: FAKE_CONTEXT
+    session_cache.get_script_run_ctx = lambda: FAKE_CONTEXT
+
+    # The configuration is parsed first, since parsing it sets the level of the logs again.
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level(logging.ERROR)
+
+
+def stub_headers(headers):
+    """Make the current thread run a session whose connection was opened by a request with the given
+    headers."""
+
+    FAKE_RUNTIME.client = make_client(headers)
+
+
+def helper_first_load():
+    """A first run of the helper in a new session."""
+
+    session_state = FakeSessionState()
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state, container=FakeContainer(session_state),
+                                                              session_state_key=WIDGET_KEY,
+                                                              session_state_key_function_output=OUTPUT_KEY,
+                                                              email_ends_with=ENDS_WITH)
+
+
+def helper_rerun():
+    """Return a function that reruns the helper in an existing session."""
+
+    session_state = FakeSessionState()
+    container = FakeContainer(session_state)
+
+    def rerun():
+        streamlit_helper_email_input.streamlit_helper_email_input(session_state, container=container,
+                                                                  session_state_key=WIDGET_KEY,
+                                                                  session_state_key_function_output=OUTPUT_KEY,
+                                                                  email_ends_with=ENDS_WITH)
+
+    rerun()
+    return rerun
+
+
+def multi_email_input_rerun(size: int, change: bool):
+    """Return a function that reruns the multi email helper in an existing session, holding the given
+    number of emails. If change is True, then every rerun adds or removes one email, as typing does."""
+
+    session_state = FakeSessionState()
+    container = FakeContainer(session_state)
+    texts = [", ".join("user%d@mail.corp.com" % index for index in range(size))]
+    texts.append(texts[0] + ", new.user@mail.corp.com")
+    reruns = [0]
+
+    def rerun():
+        if change:
+            reruns[0] += 1
+            session_state[WIDGET_KEY] = texts[reruns[0] % 2]
+        streamlit_helper_multi_email_input.streamlit_helper_multi_email_input(
+            session_state, container=container, session_state_key=WIDGET_KEY, email_ends_with=ENDS_WITH)
+
+    session_state[WIDGET_KEY] = texts[0]
+    rerun()
+    return rerun
+
+
+def benchmarks():
+    """Return the benchmarks, as (name, function, headers) tuples."""
+
+    emails = [VALID_EMAIL, INVALID_EMAIL] * 500
+    session_state = FakeSessionState()
+    return [
+        ("validate_email/valid", lambda: validate_email.validate_email(VALID_EMAIL), HEADERS),
+        ("validate_email/valid_ends_with", lambda: validate_email.validate_email(VALID_EMAIL, ENDS_WITH), HEADERS),
+        ("validate_email/invalid", lambda: validate_email.validate_email(INVALID_EMAIL), HEADERS),
+        ("validate_email/does_not_end_with", lambda: validate_email.validate_email(VALID_EMAIL, "@x.org"), HEADERS),
+        ("validate_email/adversarial_regex",
+         lambda: validate_email.validate_email(ADVERSARIAL_EMAIL), HEADERS),
+        ("validate_email/adversarial_scanner",
+         lambda: validate_email.validate_email(ADVERSARIAL_EMAIL, engine=validate_email.ENGINE_SCANNER), HEADERS),
+        ("validate_emails/1000", lambda: validate_email.validate_emails(emails, ENDS_WITH), HEADERS),
+        ("extract_email_from_headers/success",
+         lambda: extract_email_from_headers.extract_email_from_headers(session_state, session_state_key=WIDGET_KEY),
+         HEADERS),
+        ("extract_email_from_headers/no_header",
+         lambda: extract_email_from_headers.extract_email_from_headers(session_state, session_state_key=WIDGET_KEY),
+         HEADERS_WITHOUT_EMAIL),
+        ("extract_email_from_headers/session_cache_hit",
+         lambda: session_cache.cached_extract_email_from_headers(session_state, session_state_key=WIDGET_KEY),
+         HEADERS),
+        ("extract_email_from_any_header/success",
+         lambda: extract_email_from_headers.extract_email_from_any_header(session_state, session_state_key=WIDGET_KEY),
+         HEADERS),
+        ("streamlit_helper_email_input/first_load", helper_first_load, HEADERS),
+        ("streamlit_helper_email_input/rerun", helper_rerun(), HEADERS),
+    ] + [
+        ("streamlit_helper_multi_email_input/rerun_%s/%d" % ("changed" if change else "unchanged", size),
+         multi_email_input_rerun(size, change), HEADERS)
+        for change in (False, True) for size in MULTI_EMAIL_INPUT_SIZES
+    ]
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default=None, help="Only run the benchmarks whose name contains this text.")
+    parser.add_argument("--samples", type=int, default=harness.DEFAULT_SAMPLES)
+    parser.add_argument("--save-baseline", default=None, metavar="FILE")
+    parser.add_argument("--baseline", default=None, metavar="FILE")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slow-down against the baseline that counts as a regression.")
+    arguments = parser.parse_args(arguments)
+
+    # The helper reruns are primed when the benchmarks are built, so the headers are stubbed first.
+    stub_runtime()
+    stub_headers(HEADERS)
+
+    results = []
+    for name, function, headers in benchmarks():
+        if arguments.filter is not None and arguments.filter not in name:
+            continue
+        stub_headers(headers)
+        results.append(harness.run(name, function, samples=arguments.samples))
+
+    baseline = harness.load_baseline(arguments.baseline) if arguments.baseline is not None else None
+    harness.print_results(results, baseline)
+
+    if arguments.save_baseline is not None:
+        harness.save_baseline(results, arguments.save_baseline)
+
+    if baseline is not None:
+        slower = harness.regressions(results, baseline, arguments.threshold)
+        if slower:
+            print("Slower than the baseline: " + ", ".join(slower))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Load simulator of many concurrent Streamlit sessions.
+
+Creates fake sessions, each with its own session_state and its own request headers, and replays
+a scripted sequence of reruns in every session, from several threads at once, as the Streamlit
+server does. Every rerun runs what an app using the package runs: it extracts the email of the
+user from the headers, and then runs the email input helper.
+
+The script of a session is its first load, and then cycles of reruns caused by other widgets,
+typing a new email one character at a time (most of the reruns are then validation failures),
+and entering an email of another domain and a text that is not an email at all.
+
+Reports the throughput and the latency percentiles of the reruns. Then replays the scripts again
+in one thread, with tracemalloc, and reports the memory held per session after half and after all
+of the reruns, so that state that keeps growing with the reruns of a session shows up. The exit
+status is 1 if the growth per session and rerun is above --max-growth, so this can be run as a
+regression check.
+
+With --users, the sessions are opened by that many users, so that several sessions hold the
+email of the same user, as when users open the app in several tabs. With --canonicalize, the
+emails are canonicalized and interned (see canonicalize_email), and the memory saved by sharing
+them between the sessions is reported.
+
+Runs offline: Streamlit's runtime is stubbed, so that each session reads its headers from its own
+fake connection, and the helper is given a fake session_state and a fake container, as in
+run_benchmarks.
+
+Usage:
+    python benchmarks/simulate_sessions.py [--sessions 200] [--threads 8] [--reruns 60]
+                                           [--use-session-cache] [--max-growth BYTES]
+                                           [--users USERS] [--canonicalize]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import harness  # noqa: F401 (puts the checkout on the path)
+from run_benchmarks import FAKE_RUNTIME
+from run_benchmarks import FakeContainer
+from run_benchmarks import FakeSessionState
+from run_benchmarks import make_client
+from run_benchmarks import stub_runtime
+
+from extract_email_from_http_header import canonicalize_email
+from extract_email_from_http_header import extract_email_from_headers
+from extract_email_from_http_header import session_cache
+from extract_email_from_http_header import streamlit_helper_email_input
+
+# Constants.
+ENDS_WITH = "@mail.corp.com"
+WIDGET_KEY = "email"
+OUTPUT_KEY = "email_output"
+IDENTITY_KEY = "user_email"
+SEED = 0
+PERCENTILES = (50, 90, 99, 99.9)
+
+# The share of the sessions whose request has no email header, and whose email header does not
+# hold a valid email. The other sessions have a valid email.
+SHARE_WITHOUT_HEADER = 0.1
+SHARE_WITH_INVALID_HEADER = 0.1
+
+# The texts entered in the cycles of the script. Typing the email enters every prefix of it.
+TYPED_EMAIL_FORMAT = "new.user.{0}@mail.corp.com"
+OTHER_DOMAIN_EMAIL = "someone@other.org"
+NOT_AN_EMAIL = "not an email"
+IDLE_RERUNS_PER_CYCLE = 3
+
+# A step of a script that does not change the value of the widget.
+NO_CHANGE = None
+
+
+class Session:
+    """A fake session: its session_state, its container, its connection, and its script, a list of
+    the values entered in the widget before each rerun (or NO_CHANGE)."""
+
+    __slots__ = ("session_state", "container", "client", "script")
+
+    def __init__(self, index: int, reruns: int, generator: random.Random, users: int | None = None):
+
+        self.session_state = FakeSessionState()
+        self.container = FakeContainer(self.session_state)
+        headers = {"Host": "dashboard.corp.com", "User-Agent": "Mozilla/5.0", "Accept": "*/*"}
+        draw = generator.random()
+        user = index if users is None else index % users
+        if draw >= SHARE_WITHOUT_HEADER + SHARE_WITH_INVALID_HEADER:
+            headers["X-Email"] = "user.%d@mail.corp.com" % user
+        elif draw >= SHARE_WITHOUT_HEADER:
+            headers["X-Email"] = "user.%d@" % user
+        self.client = make_client(headers)
+        self.script = build_script(index, reruns, generator)
+
+
+def build_script(index: int, reruns: int, generator: random.Random) -> list:
+    """Return the given number of steps: the first load, and then cycles of idle reruns, typing, and
+    validation failures. The cycles start at a random step, so that the sessions are not in step."""
+
+    typed_email = TYPED_EMAIL_FORMAT.format(index)
+    cycle = [NO_CHANGE] * IDLE_RERUNS_PER_CYCLE
+    cycle += [typed_email[:length] for length in range(1, len(typed_email) + 1)]
+    cycle += [NO_CHANGE, OTHER_DOMAIN_EMAIL, NOT_AN_EMAIL, typed_email]
+    offset = generator.randrange(len(cycle))
+    return [NO_CHANGE] + [cycle[(offset + step) % len(cycle)] for step in range(reruns - 1)]
+
+
+def rerun(session: Session, step: int, use_session_cache: bool, canonicalizer=None):
+    """Run the given step of the script of the given session, as the app would."""
+
+    # The value of the widget is a new string on every change, as when it comes from the browser,
+    # rather than the string of the script.
+    value = session.script[step]
+    if value is not NO_CHANGE:
+        session.session_state[WIDGET_KEY] = (value + " ")[:-1]
+    FAKE_RUNTIME.client = session.client
+
+    session_state = session.session_state
+    if use_session_cache:
+        session_cache.cached_extract_email_from_headers(session_state, session_state_key=IDENTITY_KEY,
+                                                        canonicalizer=canonicalizer)
+    else:
+        extract_email_from_headers.extract_email_from_headers(session_state, session_state_key=IDENTITY_KEY,
+                                                              canonicalizer=canonicalizer)
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state, container=session.container,
+                                                              session_state_key=WIDGET_KEY,
+                                                              session_state_key_function_output=OUTPUT_KEY,
+                                                              email_ends_with=ENDS_WITH,
+                                                              use_session_cache=use_session_cache,
+                                                              canonicalizer=canonicalizer)
+
+
+def run_sessions(sessions: list, steps: range, use_session_cache: bool, canonicalizer=None,
+                 latencies: list | None = None):
+    """Run the given steps of every given session, in turn, so that the sessions are interleaved.
+    Record the latency of every rerun in the given list, if one is given."""
+
+    clock = time.perf_counter
+    for step in steps:
+        for session in sessions:
+            started = clock()
+            rerun(session, step, use_session_cache, canonicalizer)
+            if latencies is not None:
+                latencies.append(clock() - started)
+
+
+def measure_load(arguments) -> tuple:
+    """Run every session from the given number of threads. Each session is always run by the same
+    thread, so that its reruns never overlap, as in Streamlit. Return the number of reruns, the
+    elapsed time, and the sorted latencies."""
+
+    generator = random.Random(SEED)
+    sessions = [Session(index, arguments.reruns, generator, arguments.users) for index in range(arguments.sessions)]
+    canonicalizer = get_canonicalizer(arguments)
+    latencies_per_thread = [[] for _ in range(arguments.threads)]
+    threads = [threading.Thread(target=run_sessions,
+                                args=(sessions[number::arguments.threads], range(arguments.reruns),
+                                      arguments.use_session_cache, canonicalizer, latencies_per_thread[number]))
+               for number in range(arguments.threads)]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latencies in latencies_per_thread for latency in latencies)
+    return len(latencies), elapsed, latencies
+
+
+def measure_memory(arguments) -> tuple:
+    """Replay the scripts in one thread, with tracemalloc. Return the memory held per session after
+    the first load, after half of the reruns, and after all of them, in bytes, and the statistics of
+    the intern table (or None). The memory of the empty sessions and of their scripts is left out."""
+
+    generator = random.Random(SEED)
+    half = arguments.reruns // 2
+    canonicalizer = get_canonicalizer(arguments)
+
+    tracemalloc.start()
+    try:
+        sessions = [Session(index, arguments.reruns, generator, arguments.users) for index in range(arguments.sessions)]
+        before = tracemalloc.get_traced_memory()[0]
+        run_sessions(sessions, range(0, 1), arguments.use_session_cache, canonicalizer)
+        after_first_load = tracemalloc.get_traced_memory()[0]
+        run_sessions(sessions, range(1, half), arguments.use_session_cache, canonicalizer)
+        after_half = tracemalloc.get_traced_memory()[0]
+        run_sessions(sessions, range(half, arguments.reruns), arguments.use_session_cache, canonicalizer)
+        after_all = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    info = canonicalizer.intern_table.info() if canonicalizer is not None else None
+    return tuple((size - before) / arguments.sessions for size in (after_first_load, after_half, after_all)) + (info,)
+
+
+def get_canonicalizer(arguments):
+    """Return a canonicalizer with a new intern table if the emails are to be canonicalized, so that
+    every measure starts from an empty table, or None."""
+
+    if not arguments.canonicalize:
+        return None
+    return canonicalize_email.Canonicalizer(intern_table=canonicalize_email.InternTable())
+
+
+def percentile(values: list, value: float) -> float:
+    return values[min(len(values) - 1, int(round(value / 100.0 * (len(values) - 1))))]
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--reruns", type=int, default=60, help="Reruns per session, including the first load.")
+    parser.add_argument("--use-session-cache", action="store_true",
+                        help="Cache the extraction in the session_state (see session_cache).")
+    parser.add_argument("--max-growth", type=float, default=None, metavar="BYTES",
+                        help="Exit with status 1 if the memory held per session grows by more than this many "
+                             "bytes per rerun, over the second half of the reruns.")
+    parser.add_argument("--users", type=int, default=None,
+                        help="Number of users opening the sessions. Defaults to one user per session.")
+    parser.add_argument("--canonicalize", action="store_true",
+                        help="Canonicalize and intern the emails (see canonicalize_email).")
+    arguments = parser.parse_args(arguments)
+    if arguments.sessions < 1 or arguments.threads < 1 or arguments.reruns < 2:
+        parser.error("At least one session, one thread and two reruns are needed.")
+    if arguments.users is not None and arguments.users < 1:
+        parser.error("At least one user is needed.")
+
+    stub_runtime()
+
+    # Throughput and latency.
+    count, elapsed, latencies = measure_load(arguments)
+    print("%d sessions x %d reruns on %d threads: %d reruns in %.3f s, %.0f reruns/s" % (
+        arguments.sessions, arguments.reruns, arguments.threads, count, elapsed, count / elapsed))
+    print("latency us: " + ", ".join("p%s %.1f" % (format(value, "g"), percentile(latencies, value) * 1e6)
+                                     for value in PERCENTILES) + ", max %.1f" % (latencies[-1] * 1e6))
+
+    # Memory per session.
+    after_first_load, after_half, after_all, info = measure_memory(arguments)
+    half = arguments.reruns // 2
+    growth = (after_all - after_half) / (arguments.reruns - half)
+    print("memory per session: %.0f B after the first load, %.0f B after %d reruns, %.0f B after %d reruns "
+          "(%+.1f B per rerun)" % (after_first_load, after_half, half, after_all, arguments.reruns, growth))
+    if info is not None:
+        print("interned emails: %d distinct, %d shared, %.0f B saved per session" % (
+            info.misses, info.hits, info.bytes_saved / arguments.sessions))
+
+    if arguments.max_growth is not None and growth > arguments.max_growth:
+        print("The memory per session grows by more than %g B per rerun." % arguments.max_growth)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
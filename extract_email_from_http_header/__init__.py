@@ -2,11 +2,53 @@
 extract-email-from-http-header.
 
 Utility package to help extract email from HTTP Request headers.
+
+The submodules are imported the first time they are accessed, so that importing the package, 
+or one of the submodules that do not need Streamlit (such as validate_email), does not import 
+Streamlit.
 """
 
-from . import streamlit_helper_email_input
-from . import extract_email_from_headers
-from . import validate_email
+import importlib
 
 __version__ = "0.1.5"
-__author__ = 'Ng Zheng Han'
\ No newline at end of file
+__author__ = 'Ng Zheng Han'
+
+# The submodules, imported on first access.
+_SUBMODULES = {
+    "canonicalize_email",
+    "domain_allowlist",
+    "domain_denylist",
+    "email_scanner",
+    "extract_email_from_access_logs",
+    "extract_email_from_headers",
+    "extract_email_from_raw_headers",
+    "identity_assertion",
+    "instrumentation",
+    "middleware",
+    "output",
+    "session_cache",
+    "shared_cache",
+    "streamlit_helper_email_input",
+    "streamlit_helper_multi_email_input",
+    "validate_email",
+    "validate_email_async",
+    "validate_email_cache",
+    "validate_email_parallel",
+    "validate_email_vectorized",
+}
+
+__all__ = sorted(_SUBMODULES)
+
+
+def __getattr__(name):
+
+    # Import the submodule. The import stores it as an attribute of the package, so this is 
+    # only called once per submodule.
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
\ No newline at end of file
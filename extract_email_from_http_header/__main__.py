@@ -0,0 +1,76 @@
+"""
+Command line interface.
+
+Counts the requests of every email found in reverse proxy access logs (JSON lines, optionally
+gzip compressed), and validates every email. Prints one tab separated line per email, with the
+email, its number of requests and its validation result code. The emails come from the clients,
+so the fields are quoted as in the "excel-tab" dialect of the csv module when they hold a tab, a
+newline or a quote.
+
+Usage:
+    python -m extract_email_from_http_header access.log [access.log.1.gz ...]
+"""
+
+import argparse
+import csv
+import sys
+
+from . import domain_allowlist
+from . import domain_denylist
+from . import extract_email_from_access_logs
+from . import validate_email
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(prog="python -m extract_email_from_http_header",
+                                     description="Count and validate the emails in reverse proxy access logs.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="Access log in JSON lines, optionally gzip compressed. Use \"-\" for the standard input.")
+    parser.add_argument("--header-key", default=extract_email_from_access_logs.EMAIL_HEADER,
+                        help="Name of the header holding the email. Defaults to \"%(default)s\".")
+    suffix = parser.add_mutually_exclusive_group()
+    suffix.add_argument("--ends-with", default=None,
+                        help="Suffix that every email must end with.")
+    suffix.add_argument("--allowlist", default=None, metavar="FILE",
+                        help="File of allowed domains, one per line. \"*.corp.com\" allows every subdomain of corp.com.")
+    parser.add_argument("--denylist", default=None, metavar="FILE",
+                        help="Denylist compiled with \"python -m extract_email_from_http_header.domain_denylist\".")
+    parser.add_argument("--engine", default=validate_email.ENGINE_SCANNER,
+                        choices=sorted(validate_email.MATCHERS),
+                        help="Engine used to validate the emails. Defaults to \"%(default)s\".")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map uncompressed files instead of reading them through a buffer.")
+    arguments = parser.parse_args(arguments)
+
+    ends_with = arguments.ends_with
+    if arguments.allowlist is not None:
+        ends_with = domain_allowlist.DomainAllowlist.from_file(arguments.allowlist)
+    denylist = None
+    if arguments.denylist is not None:
+        denylist = domain_denylist.DomainDenylist(arguments.denylist)
+
+    statistics = {}
+    rows = extract_email_from_access_logs.count_emails(arguments.paths,
+                                                       header_key=arguments.header_key,
+                                                       ends_with=ends_with,
+                                                       use_mmap=arguments.mmap,
+                                                       engine=arguments.engine,
+                                                       statistics=statistics,
+                                                       denylist=denylist)
+
+    # Print the emails.
+    writer = csv.writer(sys.stdout, dialect="excel-tab", lineterminator="\n")
+    writer.writerow(("email", "count", "result"))
+    for email, count, result in rows:
+        writer.writerow((email, count, int(result)))
+
+    # Print the statistics.
+    for name in sorted(statistics):
+        sys.stderr.write(name + ": " + str(statistics[name]) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
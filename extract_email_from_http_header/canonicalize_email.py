@@ -0,0 +1,237 @@
+"""
+Canonical forms of emails, interned so that every session of the same user shares one string.
+
+The canonical form of an email has its domain in lower case, without the trailing dot of a fully
+qualified domain (so "Alice@Corp.COM." becomes "Alice@corp.com"). The local part is kept as it is,
+since it may be case sensitive, except that its plus tag can optionally be removed
+("alice+news@corp.com" becomes "alice@corp.com").
+
+The internationalized domains are in Unicode: "Alice@Bücher.Example" becomes
+"Alice@bücher.example", and so does "Alice@xn--bcher-kva.example", whose "xn--" labels are decoded
+with the punycode codec. The domains are not converted with the idna codec of the standard library,
+which implements IDNA 2003 and maps "ß" to "ss", so that it would merge the emails of distinct
+domains such as "straße.de" and "strasse.de".
+
+Canonicalize only the emails that passed the validation: the validation runs on the email as it
+was entered (see validate_email).
+
+Each session that extracts the email of the user stores its own copy of the string in its
+session_state. The canonical strings are interned in a bounded table, so that the sessions of
+the same user share one object instead.
+
+Example:
+    canonicalizer = canonicalize_email.Canonicalizer(strip_plus_tag=True)
+    extract_email_from_headers.extract_email_from_headers(canonicalizer=canonicalizer)
+    canonicalize_email.get_default_intern_table().info().bytes_saved
+"""
+
+import collections
+import functools
+import sys
+import threading
+
+from . import domain_allowlist
+
+# Constants.
+DEFAULT_MAX_SIZE = 65536
+EMAIL_SEPARATOR = domain_allowlist.EMAIL_SEPARATOR
+PLUS_TAG_SEPARATOR = "+"
+LABEL_SEPARATOR = domain_allowlist.LABEL_SEPARATOR
+PUNYCODE_PREFIX = "xn--"
+
+# Interning statistics, as returned by InternTable.info(). bytes_saved is the size of the copies
+# that were replaced by an interned string, which can be freed.
+InternTableInfo = collections.namedtuple("InternTableInfo", ["hits", "misses", "evictions", "bytes_saved",
+                                                             "max_size", "size"])
+
+
+def canonicalize_email(email: str, strip_plus_tag: bool = False) -> str | None:
+    """Return the canonical form of the given email, or None if it has no domain. An email that is
+    already canonical is returned as it is, rather than as a copy.
+
+    Parameters
+    ----------
+    Args:
+        email (str):
+            The email.
+        strip_plus_tag (bool, optional):
+            Whether to remove the plus tag of the local part. Defaults to False.
+
+    Returns
+    -------
+    Returns:
+        str | None: The canonical form of the email.
+    """
+
+    local_part, separator, domain = email.strip().rpartition(EMAIL_SEPARATOR)
+    if not separator:
+        return None
+
+    domain = canonicalize_domain(domain)
+    if strip_plus_tag:
+        untagged_local_part = local_part.partition(PLUS_TAG_SEPARATOR)[0]
+        if untagged_local_part:
+            local_part = untagged_local_part
+
+    canonical_email = local_part + EMAIL_SEPARATOR + domain
+    return email if canonical_email == email else canonical_email
+
+
+def canonicalize_domain(domain: str) -> str:
+    """Return the canonical form of the given domain: normalized as by
+    domain_allowlist.normalize_domain(), with its punycode ("xn--") labels decoded to Unicode. A
+    label that is not valid punycode is kept as it is."""
+
+    domain = domain_allowlist.normalize_domain(domain)
+    if PUNYCODE_PREFIX not in domain:
+        return domain
+    return LABEL_SEPARATOR.join(_decode_label(label) for label in domain.split(LABEL_SEPARATOR))
+
+
+@functools.lru_cache(maxsize=256)
+def canonicalize_suffix(suffix: str) -> str:
+    """Return the given suffix that emails must end with (the ends_with of validate_email), with its
+    domain part canonicalized as the domains of the canonical emails are, so that turning on the
+    canonicalization does not change which emails end with it. The domain part is what follows the
+    last "@", or the whole suffix if it has none."""
+
+    local_part, separator, domain = suffix.rpartition(EMAIL_SEPARATOR)
+    return local_part + separator + canonicalize_domain(domain)
+
+
+def _decode_label(label: str) -> str:
+
+    if not label.startswith(PUNYCODE_PREFIX):
+        return label
+    try:
+        decoded_label = label[len(PUNYCODE_PREFIX):].encode("ascii").decode("punycode").lower()
+    except UnicodeError:
+        return label
+    return decoded_label or label
+
+
+class InternTable:
+    """A bounded table of interned strings, with least recently used eviction.
+
+    Unlike sys.intern(), the table never holds more than max_size strings, so that a flood of
+    distinct emails cannot make it grow. An evicted string stays shared by the sessions that
+    already hold it. It is safe to share between threads.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+
+        if max_size < 0:
+            raise ValueError("The maximum size of the table cannot be negative.")
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bytes_saved = 0
+
+    def intern(self, value: str) -> str:
+        """Return the interned string equal to the given one, interning the given one if there is
+        none yet."""
+
+        with self._lock:
+            interned = self._entries.get(value)
+            if interned is not None:
+                self._entries.move_to_end(value)
+                self._hits += 1
+                if interned is not value:
+                    self._bytes_saved += sys.getsizeof(value)
+                return interned
+
+            self._misses += 1
+            if self._max_size > 0:
+                self._entries[value] = value
+                if len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+            return value
+
+    def info(self) -> InternTableInfo:
+        """Return the statistics of the table."""
+
+        with self._lock:
+            return InternTableInfo(self._hits, self._misses, self._evictions, self._bytes_saved, self._max_size,
+                                   len(self._entries))
+
+    def clear(self):
+        """Remove every string from the table, and reset the statistics."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._bytes_saved = 0
+
+
+# The table shared by every Canonicalizer that is not given its own.
+_default_intern_table = InternTable()
+
+
+def get_default_intern_table() -> InternTable:
+    return _default_intern_table
+
+
+class Canonicalizer:
+    """The canonicalization stage that can be given to the extraction and to the validation of
+    emails: it canonicalizes an email, and interns the result.
+
+    An email that cannot be canonicalized (such as a text without a domain) is returned as it is,
+    so that the extraction never fails because of it, and the validation rejects it as before.
+    """
+
+    __slots__ = ("strip_plus_tag", "intern_table")
+
+    def __init__(self, strip_plus_tag: bool = False, should_intern: bool = True,
+                 intern_table: InternTable | None = None):
+        """Build a canonicalizer.
+
+        Parameters
+        ----------
+        Args:
+            strip_plus_tag (bool, optional):
+                Whether to remove the plus tag of the local part. Defaults to False.
+            should_intern (bool, optional):
+                Whether to intern the canonical emails. Defaults to True.
+            intern_table (InternTable | None, optional):
+                The table to intern the canonical emails in. Defaults to the table shared by the
+                package (see get_default_intern_table()).
+        """
+
+        self.strip_plus_tag = strip_plus_tag
+        if not should_intern:
+            self.intern_table = None
+        else:
+            self.intern_table = intern_table if intern_table is not None else _default_intern_table
+
+    def canonicalize(self, email, should_intern: bool = True):
+        """Return the canonical, interned form of the given email, or the email as it is if it cannot
+        be canonicalized. With should_intern=False, the canonical form is not interned, so that a
+        text that may not be a real email (such as an email being typed) does not take a place in
+        the table; it can be interned later with intern()."""
+
+        if not isinstance(email, str):
+            return email
+        canonical_email = canonicalize_email(email, strip_plus_tag=self.strip_plus_tag)
+        if canonical_email is None:
+            return email
+        if should_intern and self.intern_table is not None:
+            return self.intern_table.intern(canonical_email)
+        return canonical_email
+
+    def intern(self, email):
+        """Return the interned form of the given canonical email, or the email as it is if the
+        canonicalizer does not intern."""
+
+        if self.intern_table is None or not isinstance(email, str):
+            return email
+        return self.intern_table.intern(email)
+
+    def __repr__(self) -> str:
+        return ("Canonicalizer(strip_plus_tag=" + repr(self.strip_plus_tag) + ", interned="
+                + repr(self.intern_table is not None) + ")")
@@ -0,0 +1,125 @@
+# Constants.
+WILDCARD_PREFIX = "*."
+SUBDOMAIN_PREFIX = "."
+COMMENT_PREFIX = "#"
+LABEL_SEPARATOR = "."
+EMAIL_SEPARATOR = "@"
+
+
+class DomainAllowlist:
+    """A compiled list of allowed email domains.
+
+    Each entry is either a domain, such as "corp.com", which allows that exact domain, or a
+    wildcard, such as "*.corp.com" (or ".corp.com"), which allows every subdomain of "corp.com"
+    but not "corp.com" itself. Domains are compared without regard to case.
+
+    The entries are kept in two hash sets. Looking up a domain costs one lookup for the domain
+    itself, and one for each of its parent domains, whatever the number of entries.
+
+    An allowlist can be given wherever a suffix (ends_with) is accepted, such as
+    validate_email.validate_email(email, ends_with=allowlist).
+
+    Every change to the entries increments the version of the allowlist, so that the results
+    cached for an allowlist (see validate_email_cache) are not used once it changes.
+    """
+
+    __slots__ = ("_domains", "_wildcards", "_name", "_version")
+
+    def __init__(self, domains=(), name: str | None = None):
+        """Compile the given domains.
+
+        Parameters
+        ----------
+        Args:
+            domains (Iterable[str], optional):
+                The allowed domains and wildcards. Defaults to an empty allowlist.
+            name (str | None, optional):
+                A name used to describe the allowlist in the remarks. Defaults to None.
+        """
+
+        self._domains = set()
+        self._wildcards = set()
+        self._name = name
+        self._version = 0
+        for domain in domains:
+            self.add(domain)
+
+    @classmethod
+    def from_file(cls, path: str, encoding: str = "utf-8"):
+        """Compile the domains in the given file, one per line. Blank lines and lines starting
+        with "#" are ignored."""
+
+        with open(path, encoding=encoding) as file:
+            return cls((line for line in file if not line.lstrip().startswith(COMMENT_PREFIX)), name=path)
+
+    def add(self, domain: str):
+        """Add a domain or a wildcard to the allowlist."""
+
+        if not isinstance(domain, str):
+            raise TypeError("The domain [" + str(domain) + "] is not a string.")
+
+        domain = normalize_domain(domain)
+        if not domain:
+            return
+
+        if domain.startswith(WILDCARD_PREFIX):
+            self._wildcards.add(domain[len(WILDCARD_PREFIX):])
+        elif domain.startswith(SUBDOMAIN_PREFIX):
+            self._wildcards.add(domain[len(SUBDOMAIN_PREFIX):])
+        else:
+            self._domains.add(domain)
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """The number of changes made to the entries so far."""
+
+        return self._version
+
+    def matches_domain(self, domain: str) -> bool:
+        """Check if the given domain is allowed."""
+
+        domain = normalize_domain(domain)
+        if domain in self._domains:
+            return True
+
+        # Check every parent domain against the wildcards, from the longest to the shortest.
+        if self._wildcards:
+            position = domain.find(LABEL_SEPARATOR)
+            while position != -1:
+                if domain[position + 1:] in self._wildcards:
+                    return True
+                position = domain.find(LABEL_SEPARATOR, position + 1)
+
+        return False
+
+    def matches(self, email: str) -> bool:
+        """Check if the domain of the given email is allowed."""
+
+        local_part, separator, domain = email.rpartition(EMAIL_SEPARATOR)
+        return bool(separator) and self.matches_domain(domain)
+
+    def __contains__(self, domain) -> bool:
+        return isinstance(domain, str) and self.matches_domain(domain)
+
+    def __len__(self) -> int:
+        return len(self._domains) + len(self._wildcards)
+
+    def __repr__(self) -> str:
+        if self._name is not None:
+            return "DomainAllowlist(" + repr(self._name) + ", " + str(len(self)) + " entries)"
+        return "DomainAllowlist(" + str(len(self)) + " entries)"
+
+    def __getstate__(self):
+        return self._domains, self._wildcards, self._name
+
+    def __setstate__(self, state):
+        self._domains, self._wildcards, self._name = state
+        self._version = 0
+
+
+def normalize_domain(domain: str) -> str:
+    """Return the given domain as the allowlists and the denylists compare domains: without the
+    surrounding whitespace and the trailing dot of a fully qualified domain, and in lower case."""
+
+    return domain.strip().rstrip(LABEL_SEPARATOR).lower()
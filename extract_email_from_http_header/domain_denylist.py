@@ -0,0 +1,282 @@
+"""
+A compiled, memory-mapped denylist of domains and addresses, such as disposable email providers.
+
+The denylist is compiled once into a file holding the sorted 64 bit hashes of its entries, and
+an index of where the hashes starting with each prefix of bits begin. The file is opened with
+mmap, so every process of the host that opens it shares the same pages of the page cache, and
+opening it costs nothing whatever its size. A lookup is a binary search, within the range given
+by the index, of the hashes of the address, of its domain, and of the parents of its domain.
+
+Compile a denylist with:
+    python -m extract_email_from_http_header.domain_denylist OUTPUT SOURCE [SOURCE ...]
+
+Note:
+Only the hashes are kept, so two different entries may collide. With 64 bit hashes and ten
+million entries, the chance that a given address is denied by a collision is about 5e-13.
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from . import domain_allowlist
+
+# Constants.
+WILDCARD_PREFIX = domain_allowlist.WILDCARD_PREFIX
+SUBDOMAIN_PREFIX = domain_allowlist.SUBDOMAIN_PREFIX
+COMMENT_PREFIX = domain_allowlist.COMMENT_PREFIX
+LABEL_SEPARATOR = domain_allowlist.LABEL_SEPARATOR
+EMAIL_SEPARATOR = domain_allowlist.EMAIL_SEPARATOR
+
+# The kinds of entries. Each is hashed together with the entry, so that the domain "corp.com",
+# the wildcard "*.corp.com" and an address never share a hash.
+KIND_DOMAIN = b"d"
+KIND_WILDCARD = b"w"
+KIND_ADDRESS = b"a"
+
+# The flags of the kinds of entries that the file holds, so that a lookup skips the kinds that
+# it has none of. A list of disposable domains, for example, has no wildcards and no addresses,
+# so its lookups only hash the domain.
+KIND_FLAGS = {KIND_DOMAIN: 1, KIND_WILDCARD: 2, KIND_ADDRESS: 4}
+
+# The format of the file: a header (holding the flags of the kinds of entries), the index, and
+# then the sorted hashes. The index holds, for
+# each value of the first index_bits bits of a hash, the position of the first hash starting
+# with a greater or equal value, followed by the number of hashes. The index and the hashes are
+# unsigned 64 bit integers in the byte order of the host that compiled the file.
+MAGIC = b"EEDL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBQ")
+HASH_SIZE = 8
+HASH_BITS = 64
+HASH_TYPECODE = "Q"
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+# The index has about one entry per this many hashes, so that the binary search within a range
+# only takes a few steps, and the index stays small next to the hashes.
+HASHES_PER_INDEX_ENTRY = 16
+MAX_INDEX_BITS = 24
+
+
+class DomainDenylist:
+    """A compiled denylist of domains and addresses, opened from a file built by compile_denylist().
+
+    Each entry is either a domain, such as "mailinator.com", which denies that exact domain, a
+    wildcard, such as "*.mailinator.com" (or ".mailinator.com"), which denies every subdomain of
+    "mailinator.com", or an address, such as "spam@corp.com", which denies that address only.
+    Entries are compared without regard to case.
+
+    It is safe to share between threads. It can be pickled, which reopens the file on the other
+    side, so it can be given to the workers of a process pool.
+    """
+
+    __slots__ = ("_path", "_file", "_map", "_index", "_index_shift", "_hashes", "_size", "_has_domains",
+                 "_has_wildcards", "_has_addresses")
+
+    def __init__(self, path: str):
+        """Open the compiled denylist at the given path.
+
+        Parameters
+        ----------
+        Args:
+            path (str):
+                The path of a file built by compile_denylist().
+        """
+
+        self._path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped.
+            self._file.close()
+            raise ValueError("The file [" + path + "] is not a compiled denylist.")
+
+        magic, version, byte_order, index_bits, kinds, self._size = HEADER.unpack_from(self._map) if (
+            len(self._map) >= HEADER.size) else (None, None, None, 0, 0, 0)
+        index_size = ((1 << index_bits) + 1) * HASH_SIZE
+        if (magic != MAGIC or version != VERSION or index_bits > MAX_INDEX_BITS
+                or len(self._map) != HEADER.size + index_size + self._size * HASH_SIZE):
+            self.close()
+            raise ValueError("The file [" + path + "] is not a compiled denylist.")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            self.close()
+            raise ValueError("The denylist [" + path + "] was compiled on a host with another byte order.")
+
+        # Views of the index and of the hashes as integers, which are searched without copying them.
+        view = memoryview(self._map)
+        self._index = view[HEADER.size:HEADER.size + index_size].cast(HASH_TYPECODE)
+        self._index_shift = HASH_BITS - index_bits
+        self._hashes = view[HEADER.size + index_size:].cast(HASH_TYPECODE)
+        view.release()
+
+        self._has_domains = bool(kinds & KIND_FLAGS[KIND_DOMAIN])
+        self._has_wildcards = bool(kinds & KIND_FLAGS[KIND_WILDCARD])
+        self._has_addresses = bool(kinds & KIND_FLAGS[KIND_ADDRESS])
+
+    def matches_domain(self, domain: str) -> bool:
+        """Check if the given domain is denied, by itself or by a wildcard of one of its parents."""
+
+        domain = domain_allowlist.normalize_domain(domain)
+        if self._has_domains and self._contains_hash(_hash(KIND_DOMAIN, domain)):
+            return True
+
+        # Check every parent domain against the wildcards, from the longest to the shortest.
+        position = domain.find(LABEL_SEPARATOR) if self._has_wildcards else -1
+        while position != -1:
+            if self._contains_hash(_hash(KIND_WILDCARD, domain[position + 1:])):
+                return True
+            position = domain.find(LABEL_SEPARATOR, position + 1)
+
+        return False
+
+    def matches(self, email: str) -> bool:
+        """Check if the given email, or its domain, is denied."""
+
+        local_part, separator, domain = email.rpartition(EMAIL_SEPARATOR)
+        if not separator:
+            return False
+        return ((self._has_addresses and self._contains_hash(_hash(KIND_ADDRESS, local_part.lower() + EMAIL_SEPARATOR
+                                                                   + domain_allowlist.normalize_domain(domain))))
+                or self.matches_domain(domain))
+
+    def close(self):
+        """Unmap the file. The denylist cannot be used afterwards."""
+
+        for view in (getattr(self, "_index", None), getattr(self, "_hashes", None)):
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+
+    def _contains_hash(self, value: int) -> bool:
+
+        # Only search the hashes that start with the same bits.
+        bucket = value >> self._index_shift
+        index = self._index
+        end = index[bucket + 1]
+        position = bisect_left(self._hashes, value, index[bucket], end)
+        return position < end and self._hashes[position] == value
+
+    def __contains__(self, entry) -> bool:
+        if not isinstance(entry, str):
+            return False
+        return self.matches(entry) if EMAIL_SEPARATOR in entry else self.matches_domain(entry)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return "DomainDenylist(" + repr(self._path) + ", " + str(self._size) + " entries)"
+
+    def __getstate__(self):
+        return self._path
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+
+def compile_denylist(entries, path: str) -> int:
+    """Compile the given entries into a denylist file, which DomainDenylist opens.
+
+    The file is written next to the given path and then renamed over it, so the processes that
+    have the previous file open keep using it until they open it again.
+
+    Parameters
+    ----------
+    Args:
+        entries (Iterable[str]):
+            The denied domains, wildcards and addresses. Blank entries, and entries starting with
+            "#", are ignored.
+        path (str):
+            The path of the file to write.
+
+    Returns
+    -------
+    Returns:
+        int: The number of distinct entries in the file.
+    """
+
+    hashes = set()
+    kinds = 0
+    for entry in entries:
+        if not isinstance(entry, str):
+            raise TypeError("The entry [" + str(entry) + "] is not a string.")
+        entry = entry.strip()
+        if not entry or entry.startswith(COMMENT_PREFIX):
+            continue
+        kind, value = _normalize_entry(entry)
+        kinds |= KIND_FLAGS[kind]
+        hashes.add(_hash(kind, value))
+
+    hashes = sorted(hashes)
+    index_bits = min(MAX_INDEX_BITS, (len(hashes) // HASHES_PER_INDEX_ENTRY).bit_length())
+    index_shift = HASH_BITS - index_bits
+    index = array(HASH_TYPECODE, (bisect_left(hashes, bucket << index_shift) for bucket in range(1 << index_bits)))
+    index.append(len(hashes))
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], index_bits, kinds, len(hashes)))
+        index.tofile(file)
+        array(HASH_TYPECODE, hashes).tofile(file)
+    os.replace(temporary_path, path)
+    return len(hashes)
+
+
+def compile_denylist_files(sources, path: str, encoding: str = "utf-8") -> int:
+    """Compile the entries of the given files, one per line, into a denylist file. See
+    compile_denylist()."""
+
+    def entries():
+        for source in sources:
+            with open(source, encoding=encoding) as file:
+                yield from file
+
+    return compile_denylist(entries(), path)
+
+
+def _normalize_entry(entry: str):
+    """Return the kind of an entry of the denylist, and its value as it is looked up."""
+
+    if EMAIL_SEPARATOR in entry:
+        local_part, _, domain = entry.rpartition(EMAIL_SEPARATOR)
+        return KIND_ADDRESS, local_part.lower() + EMAIL_SEPARATOR + domain_allowlist.normalize_domain(domain)
+
+    domain = domain_allowlist.normalize_domain(entry)
+    if domain.startswith(WILDCARD_PREFIX):
+        return KIND_WILDCARD, domain[len(WILDCARD_PREFIX):]
+    if domain.startswith(SUBDOMAIN_PREFIX):
+        return KIND_WILDCARD, domain[len(SUBDOMAIN_PREFIX):]
+    return KIND_DOMAIN, domain
+
+
+def _hash(kind: bytes, value: str) -> int:
+    """Return the 64 bit hash of a normalized entry of the given kind."""
+
+    return int.from_bytes(hashlib.blake2b(kind + value.encode("utf-8", "surrogatepass"),
+                                          digest_size=HASH_SIZE).digest(), sys.byteorder)
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(prog="python -m extract_email_from_http_header.domain_denylist",
+                                     description="Compile denied domains and addresses into a memory-mappable file.")
+    parser.add_argument("output", metavar="OUTPUT", help="Path of the compiled denylist.")
+    parser.add_argument("sources", nargs="+", metavar="SOURCE",
+                        help="File of denied entries, one per line. \"*.example.com\" denies every subdomain of "
+                             "example.com, and \"user@example.com\" denies one address.")
+    arguments = parser.parse_args(arguments)
+
+    count = compile_denylist_files(arguments.sources, arguments.output)
+    sys.stderr.write(str(count) + " entries written to " + arguments.output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import re
+
+# Constants.
+# The maximum lengths from RFC 5321 (section 4.5.3.1) and RFC 3696 (errata 1690).
+MAX_LENGTH_LOCAL_PART = 64
+MAX_LENGTH_DOMAIN = 255
+MAX_LENGTH_EMAIL = 254
+
+# Modes.
+#
+# MODE_REGEX_COMPATIBLE accepts exactly the same inputs as validate_email.REGULAR_EXPRESSION,
+# including the trailing newline that "$" allows, and does not check any length limits.
+# MODE_STRICT checks the length limits before scanning, and rejects the trailing newline.
+MODE_REGEX_COMPATIBLE = "regex_compatible"
+MODE_STRICT = "strict"
+MODES = {MODE_REGEX_COMPATIBLE, MODE_STRICT}
+
+# The character class of validate_email.REGULAR_EXPRESSION. It is a single class with a single
+# quantifier, so matching it can never backtrack.
+#
+# Note:
+# This is only ever used with fullmatch() on a part of the email that has already been cut
+# out by the scanner.
+PART_CHARACTERS = re.compile(r"[\w\-\.]+")
+
+# The length limits of the last label, from the "{2,4}" in the regular expression.
+MIN_LENGTH_LAST_LABEL = 2
+MAX_LENGTH_LAST_LABEL = 4
+
+
+def match_email(email: str, mode: str = MODE_REGEX_COMPATIBLE) -> bool:
+    """Check if the given email has a valid syntax, in time linear to its length.
+
+    This is a drop-in replacement for matching validate_email.REGULAR_EXPRESSION. Instead of a
+    backtracking regular expression with a nested quantifier, the email is cut at the "@", the
+    characters of both parts are checked with a single character class, and the labels of the
+    domain are checked with string searches.
+
+    Parameters
+    ----------
+    Args:
+        email (str):
+            The email to check.
+        mode (str, optional):
+            Either MODE_REGEX_COMPATIBLE or MODE_STRICT. Defaults to MODE_REGEX_COMPATIBLE.
+
+    Returns
+    -------
+    Returns:
+        bool: True if the email has a valid syntax.
+    """
+
+    # Strict mode checks the overall length first, so that an oversized input is rejected
+    # without looking at its content.
+    if mode == MODE_STRICT:
+        if len(email) > MAX_LENGTH_EMAIL:
+            return False
+    elif mode != MODE_REGEX_COMPATIBLE:
+        raise ValueError("Unknown mode [" + str(mode) + "].")
+
+    # "$" also matches right before a newline at the very end of the input, so the regular
+    # expression accepts a single trailing newline.
+    if mode == MODE_REGEX_COMPATIBLE and email.endswith("\n"):
+        email = email[:-1]
+
+    # There must be exactly one "@", because it is neither a valid character in the local
+    # part nor in the domain.
+    local_part, separator, domain = email.partition("@")
+    if not separator or "@" in domain:
+        return False
+
+    # Check the length limits of the parts.
+    if mode == MODE_STRICT and (len(local_part) > MAX_LENGTH_LOCAL_PART or len(domain) > MAX_LENGTH_DOMAIN):
+        return False
+
+    # Check the labels of the domain. There must be at least one label followed by a ".", and
+    # then a last label of 2 to 4 characters. Every label must be non-empty.
+    last_separator = domain.rfind(".")
+    if last_separator == -1:
+        return False
+    if not MIN_LENGTH_LAST_LABEL <= len(domain) - last_separator - 1 <= MAX_LENGTH_LAST_LABEL:
+        return False
+    if domain.startswith(".") or ".." in domain:
+        return False
+
+    # Check the characters of the local part and of the domain. The domain uses the same
+    # characters as the local part, with the "." as the separator of its labels.
+    if PART_CHARACTERS.fullmatch(local_part) is None or PART_CHARACTERS.fullmatch(domain) is None:
+        return False
+
+    # All the checks passed.
+    return True
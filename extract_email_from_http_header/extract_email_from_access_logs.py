@@ -0,0 +1,229 @@
+import collections
+import gzip
+import json
+import mmap
+import re
+import sys
+
+from . import validate_email
+
+# Constants.
+EMAIL_HEADER = "X-Email"
+STDIN_PATH = "-"
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+
+# nginx logs an empty variable as "-".
+EMPTY_VALUES = {"", "-"}
+
+# The prefix nginx gives to the variables holding request headers, such as "$http_x_email".
+NGINX_HEADER_VARIABLE_PREFIX = "http-"
+
+# Statistics.
+STATISTICS_LINES = "lines"
+STATISTICS_LINES_WITHOUT_HEADER = "lines_without_header"
+STATISTICS_MALFORMED_LINES = "malformed_lines"
+
+# Output index.
+OUTPUT_INDEX_EMAIL = 0
+OUTPUT_INDEX_COUNT = 1
+OUTPUT_INDEX_RESULT = 2
+
+
+def open_log(path: str, use_mmap: bool = False):
+    """Open an access log and yield its lines as bytes, one at a time.
+
+    Gzip compressed files are detected by their content, not by their name. Memory-mapping is only
+    used for uncompressed regular files; it is ignored for gzip files and for the standard input.
+
+    Parameters
+    ----------
+    Args:
+        path (str):
+            The path of the access log, or "-" for the standard input.
+        use_mmap (bool, optional):
+            Whether to memory-map the file instead of reading it through a buffer. Defaults to False.
+
+    Returns
+    -------
+    Returns:
+        Iterator[bytes]: The lines of the access log.
+    """
+
+    # Read the standard input.
+    if path == STDIN_PATH:
+        yield from sys.stdin.buffer
+        return
+
+    with open(path, "rb") as file:
+
+        # Check if the file is compressed.
+        if file.read(len(GZIP_MAGIC_NUMBER)) == GZIP_MAGIC_NUMBER:
+            file.seek(0)
+            with gzip.GzipFile(fileobj=file) as gzip_file:
+                yield from gzip_file
+            return
+        file.seek(0)
+
+        # Read the uncompressed file.
+        if use_mmap:
+
+            # An empty file cannot be memory-mapped, and has no lines anyway.
+            try:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return
+            with mapped:
+                yield from iter(mapped.readline, b"")
+
+        else:
+            yield from file
+
+
+def header_pattern(header_key: str = EMAIL_HEADER):
+    """Build a pattern that finds the given header name in a raw log line, in any case, with
+    either "-" or "_" between the words, as nginx and Envoy write it."""
+
+    words = [re.escape(word) for word in re.split(r"[-_]", header_key)]
+    return re.compile(b"(?i)" + "[-_]".join(words).encode("ascii"))
+
+
+def normalize_header_name(name: str) -> str:
+    """Normalize the name of a field in a log entry so that it can be compared to a header name."""
+
+    name = name.lower().replace("_", "-")
+    if name.startswith(NGINX_HEADER_VARIABLE_PREFIX):
+        name = name[len(NGINX_HEADER_VARIABLE_PREFIX):]
+    return name
+
+
+def find_header_value(entry, header_name: str):
+    """Find the value of the given normalized header name in a log entry.
+
+    The header is looked for in the top level fields of the entry, and then in the fields of
+    the nested objects, such as the "request_headers" object of an Envoy log entry.
+    """
+
+    if not isinstance(entry, dict):
+        return None
+
+    nested = []
+    for name, value in entry.items():
+        if isinstance(value, dict):
+            nested.append(value)
+        elif isinstance(value, str) and normalize_header_name(name) == header_name:
+            return None if value in EMPTY_VALUES else value
+
+    for value in nested:
+        found = find_header_value(value, header_name)
+        if found is not None:
+            return found
+
+    return None
+
+
+def extract_emails_from_lines(lines, header_key: str = EMAIL_HEADER, statistics: dict | None = None):
+    """Yield the email found in every line of an access log that has one.
+
+    Lines are only decoded when they contain the header name, so lines without the header cost
+    a single search over their bytes.
+
+    Parameters
+    ----------
+    Args:
+        lines (Iterable[bytes]):
+            The lines of the access log, as JSON objects.
+        header_key (str, optional):
+            The name of the header holding the email. Defaults to EMAIL_HEADER.
+        statistics (dict | None, optional):
+            An optional dictionary in which the number of lines read, lines without the header
+            and malformed lines are counted. Defaults to None.
+
+    Returns
+    -------
+    Returns:
+        Iterator[str]: The emails.
+    """
+
+    search = header_pattern(header_key).search
+    header_name = normalize_header_name(header_key)
+    number_of_lines = 0
+    number_of_lines_without_header = 0
+    number_of_malformed_lines = 0
+
+    for line in lines:
+        number_of_lines += 1
+
+        # Skip the lines that cannot have the header.
+        if search(line) is None:
+            number_of_lines_without_header += 1
+            continue
+
+        # Parse the line.
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            number_of_malformed_lines += 1
+            continue
+
+        # Get the email.
+        email = find_header_value(entry, header_name)
+        if email is None:
+            number_of_lines_without_header += 1
+            continue
+
+        yield email
+
+    if statistics is not None:
+        statistics[STATISTICS_LINES] = number_of_lines
+        statistics[STATISTICS_LINES_WITHOUT_HEADER] = number_of_lines_without_header
+        statistics[STATISTICS_MALFORMED_LINES] = number_of_malformed_lines
+
+
+def count_emails(paths, header_key: str = EMAIL_HEADER, ends_with: str = None, use_mmap: bool = False,
+                 engine: str = validate_email.ENGINE_SCANNER, statistics: dict | None = None, denylist=None):
+    """Count the requests of every email in the given access logs, and validate every email.
+
+    The logs are streamed, so the memory used only grows with the number of distinct emails, not
+    with the size of the logs.
+
+    Parameters
+    ----------
+    Args:
+        paths (Iterable[str]):
+            The paths of the access logs.
+        header_key (str, optional):
+            The name of the header holding the email. Defaults to EMAIL_HEADER.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that every email must end with, or allowlist of domains. Defaults to None.
+        use_mmap (bool, optional):
+            Whether to memory-map uncompressed files. Defaults to False.
+        engine (str, optional):
+            The engine used to check the syntax of the emails. The emails come from the
+            client, so this defaults to the linear time validate_email.ENGINE_SCANNER.
+        statistics (dict | None, optional):
+            An optional dictionary in which the lines are counted. Defaults to None.
+        denylist (DomainDenylist, optional):
+            Optional denylist of domains and addresses that the valid emails are looked up in. Defaults to None.
+
+    Returns
+    -------
+    Returns:
+        List[Tuple]: A List of Tuples containing the email, its number of requests, and its
+        validation result code, sorted by decreasing number of requests.
+    """
+
+    counts = collections.Counter()
+    for path in paths:
+        path_statistics = {}
+        counts.update(extract_emails_from_lines(open_log(path, use_mmap=use_mmap), header_key=header_key,
+                                                statistics=path_statistics))
+        if statistics is not None:
+            for name, value in path_statistics.items():
+                statistics[name] = statistics.get(name, 0) + value
+
+    # Validate every distinct email once.
+    emails = list(counts)
+    results, _ = validate_email.validate_emails(emails, ends_with=ends_with, engine=engine, denylist=denylist)
+
+    return sorted(((email, counts[email], result) for email, result in zip(emails, results)),
+                  key=lambda row: (-row[OUTPUT_INDEX_COUNT], row[OUTPUT_INDEX_EMAIL]))
@@ -1,18 +1,40 @@
+import functools
+from enum import IntEnum
+
 import streamlit
 from streamlit.web.server.websocket_headers import _get_websocket_headers
 
+from . import canonicalize_email
+from . import identity_assertion
+from . import output
+from . import validate_email
+
 # Constants.
 SESSION_STATE_KEY = "user_email"
 EMAIL_HEADER = "X-Email"
 EMAIL_UNDEFINED = "undefined"
 
-# Result codes.
-RESULT_UNDEFINED = 0
-RESULT_SUCCESS = 1
-RESULT_FAILURE_UNSPECIFIED = 2
-RESULT_NO_EMAIL_HEADER_IN_REQUEST = 3
-RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NONE = 4
-RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = 5
+# The headers that common authentication proxies (oauth2-proxy, Identity-Aware Proxy, Cloudflare 
+# Access) use for the email, in order of priority.
+EMAIL_HEADERS = ("X-Email", "X-Forwarded-Email", "X-Auth-Request-Email")
+
+# Result codes. They are members of an IntEnum, as in validate_email.
+class Result(IntEnum):
+    UNDEFINED = 0
+    SUCCESS = 1
+    FAILURE_UNSPECIFIED = 2
+    NO_EMAIL_HEADER_IN_REQUEST = 3
+    GIVEN_EMAIL_HEADER_KEY_IS_NONE = 4
+    GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = 5
+    ASSERTION_IS_INVALID = 6
+
+RESULT_UNDEFINED = Result.UNDEFINED
+RESULT_SUCCESS = Result.SUCCESS
+RESULT_FAILURE_UNSPECIFIED = Result.FAILURE_UNSPECIFIED
+RESULT_NO_EMAIL_HEADER_IN_REQUEST = Result.NO_EMAIL_HEADER_IN_REQUEST
+RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NONE = Result.GIVEN_EMAIL_HEADER_KEY_IS_NONE
+RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = Result.GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+RESULT_ASSERTION_IS_INVALID = Result.ASSERTION_IS_INVALID
 
 # Remarks.
 REMARKS_UNDEFINED = ""
@@ -21,18 +43,23 @@ REMARKS_FAILURE_UNSPECIFIED = "Unspecified failure."
 REMARKS_NO_EMAIL_HEADER_IN_REQUEST = "No email header in the Request."
 REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NONE = "The given email header key to search for is the null object \"None\"."
 REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = "The given email header key to search for is not a string."
+REMARKS_ASSERTION_IS_INVALID = "The identity assertion in the http header could not be verified."
 REMARKS_UNABLE_TO_SET_DEFAULT_ON_FAILURE = "Unable to set default email on failure."
 
 # Output index.
 OUTPUT_INDEX_RESULT = 0
 OUTPUT_INDEX_REMARKS = 1
 OUTPUT_INDEX_EMAIL = 2
+OUTPUT_INDEX_HEADER_KEY = 3
 
 
 def extract_email_from_headers(session_state=streamlit.session_state,
                                header_key: str = EMAIL_HEADER,
                                session_state_key: str | int | None = None,
-                               set_email_on_failure: str = None):
+                               set_email_on_failure: str = None,
+                               headers=None,
+                               assertion_verifier: identity_assertion.AssertionVerifier | None = None,
+                               canonicalizer: canonicalize_email.Canonicalizer | None = None):
     """Extract the email from the http header.
 
     Parameters
@@ -40,8 +67,9 @@ def extract_email_from_headers(session_state=streamlit.session_state,
     Args:
         session_state (SessionStateProxy, optional): 
             Streamlit's session_state. Defaults to streamlit.session_state.
-        header_key (str, optional): 
+        header_key (str | list | tuple, optional): 
             The key in the http header that is associated with the email. Defaults to \"X-Email\".
+            If a list or a tuple of keys is supplied, then the keys are looked up as in extract_email_from_any_header().
         session_state_key (str | int | None, optional): 
             The session_state key to use to store the extacted email. 
             If no email is found in the http header, and if there is an email to set on failure, then this session_state key 
@@ -49,20 +77,45 @@ def extract_email_from_headers(session_state=streamlit.session_state,
             not be stored in the session_state. We can still use the returned results to get the email (if any). Defaults to None.
         set_email_on_failure (str, optional): 
             The email to use in the event when we fail to extract an email from the http header. Defaults to None.
+        headers (Mapping[str, str], optional): 
+            The headers of the Request. If None is supplied, then the websocket headers of the current Streamlit 
+            session are used. Defaults to None.
+        assertion_verifier (AssertionVerifier | None, optional): 
+            If supplied, then the header holds a signed identity assertion (JWT) instead of the email. The 
+            assertion is verified, and the email is taken from its claims. See identity_assertion. Defaults to None.
+        canonicalizer (Canonicalizer | None, optional): 
+            If supplied, then the extracted email, if it is a valid email, is replaced by its canonical form, which 
+            is interned so that the sessions of the same user share one string. Any other value of the header is 
+            left as it is. See canonicalize_email. Defaults to None.
 
     Returns
     -------
     Returns:
-        Tuple: A Tuple containing the result code, the remarks, and the email.
+        EmailOutput: The result code, the remarks, and the email. It unpacks and indexes as a Tuple.
     """
 
+    # Check if we are given several keys to look for.
+    if isinstance(header_key, (list, tuple)):
+
+        # Look for all the given keys in one pass. We drop the key that matched, to keep the
+        # output the same as for a single key.
+        any_header_output = extract_email_from_any_header(session_state,
+                                                          header_keys=header_key,
+                                                          session_state_key=session_state_key,
+                                                          set_email_on_failure=set_email_on_failure,
+                                                          headers=headers,
+                                                          assertion_verifier=assertion_verifier,
+                                                          canonicalizer=canonicalizer)
+        return output.EmailOutput(any_header_output.result, any_header_output.remarks, any_header_output.email)
+
     # Initialize the return values.
     email = EMAIL_UNDEFINED
     result = RESULT_UNDEFINED
     remarks = REMARKS_UNDEFINED
 
     # Get the headers.
-    headers = _get_websocket_headers()
+    if headers is None:
+        headers = _get_websocket_headers()
 
     # Validate the given header for email.
     if header_key is None:
@@ -87,13 +140,23 @@ def extract_email_from_headers(session_state=streamlit.session_state,
             # Get the value of the email matching the key.
             email = headers.get(header_key)
 
-            # Set the email in the given session state.
-            if session_state is not None:
-                session_state[session_state_key] = email
+            # Verify the assertion, if the header holds one, and take the email from it.
+            if assertion_verifier is not None:
+                result, remarks, email = _verify_assertion(assertion_verifier, email)
 
-            # Set the return values.
-            result = RESULT_SUCCESS
-            remarks = REMARKS_SUCCESS
+            if result != RESULT_ASSERTION_IS_INVALID:
+
+                # Canonicalize the email.
+                if canonicalizer is not None:
+                    email = _canonicalize_valid_email(canonicalizer, email)
+
+                # Set the email in the given session state.
+                if session_state is not None:
+                    session_state[session_state_key] = email
+
+                # Set the return values.
+                result = RESULT_SUCCESS
+                remarks = REMARKS_SUCCESS
 
         else:
 
@@ -109,7 +172,8 @@ def extract_email_from_headers(session_state=streamlit.session_state,
                   RESULT_FAILURE_UNSPECIFIED,
                   RESULT_NO_EMAIL_HEADER_IN_REQUEST,
                   RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NONE,
-                  RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING}:
+                  RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING,
+                  RESULT_ASSERTION_IS_INVALID}:
 
         # Result is not a success.
 
@@ -148,4 +212,190 @@ def extract_email_from_headers(session_state=streamlit.session_state,
                 remarks = remarks + " " + REMARKS_UNABLE_TO_SET_DEFAULT_ON_FAILURE
 
     # Return the result.
-    return result, remarks, email
+    return output.EmailOutput(result, remarks, email)
+
+
+def extract_email_from_any_header(session_state=streamlit.session_state,
+                                  header_keys: list | tuple = EMAIL_HEADERS,
+                                  session_state_key: str | int | None = None,
+                                  set_email_on_failure: str = None,
+                                  headers=None,
+                                  assertion_verifier: identity_assertion.AssertionVerifier | None = None,
+                                  canonicalizer: canonicalize_email.Canonicalizer | None = None):
+    """Extract the email from the first of the given http headers that is in the Request.
+
+    The header keys are compared without regard to case, and the headers of the Request are 
+    only scanned once, whatever the number of given keys.
+
+    Parameters
+    ----------
+    Args:
+        session_state (SessionStateProxy, optional): 
+            Streamlit's session_state. Defaults to streamlit.session_state.
+        header_keys (list | tuple, optional): 
+            The keys in the http header that may be associated with the email, in order of priority. 
+            Defaults to EMAIL_HEADERS.
+        session_state_key (str | int | None, optional): 
+            The session_state key to use to store the extacted email. See extract_email_from_headers(). 
+            Defaults to None.
+        set_email_on_failure (str, optional): 
+            The email to use in the event when we fail to extract an email from the http header. Defaults to None.
+        headers (Mapping[str, str], optional): 
+            The headers of the Request. If None is supplied, then the websocket headers of the current Streamlit 
+            session are used. Defaults to None.
+        assertion_verifier (AssertionVerifier | None, optional): 
+            If supplied, then the header that matched holds a signed identity assertion. See 
+            extract_email_from_headers(). Defaults to None.
+        canonicalizer (Canonicalizer | None, optional): 
+            If supplied, then the extracted email is replaced by its canonical form. See 
+            extract_email_from_headers(). Defaults to None.
+
+    Returns
+    -------
+    Returns:
+        HeaderOutput: The result code, the remarks, the email, and the given header key that matched (or 
+        None if no header matched). It unpacks and indexes as a Tuple.
+    """
+
+    # Initialize the return values.
+    email = EMAIL_UNDEFINED
+    result = RESULT_UNDEFINED
+    remarks = REMARKS_UNDEFINED
+    matched_header_key = None
+
+    # Validate the given headers for email.
+    if header_keys is None or any(header_key is None for header_key in header_keys):
+
+        # One of the given header keys is the null value "None". We cannot do anything about this.
+        result = RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NONE
+        remarks = REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NONE
+
+    elif not all(isinstance(header_key, str) for header_key in header_keys):
+
+        # One of the given header keys is not a string. We cannot proceed.
+        result = RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+        remarks = REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+
+    else:
+
+        # Find the header with the highest priority.
+        if headers is None:
+            headers = _get_websocket_headers()
+        matched_header_key, header_value = find_header(headers, header_keys)
+        if matched_header_key is not None:
+
+            # Verify the assertion, if the header holds one, and take the email from it.
+            if assertion_verifier is not None:
+                result, remarks, header_value = _verify_assertion(assertion_verifier, header_value)
+
+            if result != RESULT_ASSERTION_IS_INVALID:
+
+                # Set the email in the given session state.
+                email = header_value if canonicalizer is None else _canonicalize_valid_email(canonicalizer, header_value)
+                if session_state_key is not None:
+                    session_state[session_state_key] = email
+
+                # Set the return values.
+                result = RESULT_SUCCESS
+                remarks = REMARKS_SUCCESS
+
+        else:
+
+            # There is no header for the email.
+            result = RESULT_NO_EMAIL_HEADER_IN_REQUEST
+            remarks = REMARKS_NO_EMAIL_HEADER_IN_REQUEST
+
+    # Additional process if the result is not a success. This is the same as in 
+    # extract_email_from_headers().
+    if result != RESULT_SUCCESS:
+
+        # We remove any existing value associated with the given key when this function fails.
+        session_state.pop(session_state_key, None)
+
+        # Check if we should set an email on failure.
+        if set_email_on_failure is not None:
+            if isinstance(set_email_on_failure, str):
+                email = set_email_on_failure
+                if session_state_key is not None:
+                    session_state[session_state_key] = email
+            else:
+                remarks = remarks + " " + REMARKS_UNABLE_TO_SET_DEFAULT_ON_FAILURE
+
+    # Return the result.
+    return output.HeaderOutput(result, remarks, email, matched_header_key)
+
+
+def _verify_assertion(assertion_verifier: identity_assertion.AssertionVerifier, assertion: str):
+    """Verify the given identity assertion. Return the result code, the remarks, and the email from
+    the assertion (or EMAIL_UNDEFINED if it could not be verified)."""
+
+    verification_output = assertion_verifier.verify(assertion)
+    if verification_output.result == identity_assertion.RESULT_SUCCESS:
+        return RESULT_SUCCESS, REMARKS_SUCCESS, verification_output.email
+    return RESULT_ASSERTION_IS_INVALID, REMARKS_ASSERTION_IS_INVALID + " " + verification_output.remarks, EMAIL_UNDEFINED
+
+
+def _canonicalize_valid_email(canonicalizer: canonicalize_email.Canonicalizer, email):
+    """Return the canonical, interned form of the given value of a header if it is a valid email, or
+    the value as it is otherwise. The value comes from the request, so it is validated as it is
+    given, and with the linear time scanner, before it can take a place in the intern table."""
+
+    if (isinstance(email, str) and validate_email.validate_email(email, engine=validate_email.ENGINE_SCANNER).result
+            is validate_email.RESULT_SUCCESS):
+        return canonicalizer.canonicalize(email)
+    return email
+
+
+def find_header(headers, header_keys):
+    """Find the first of the given header keys that is in the given headers, without regard to case.
+
+    The headers are scanned once. Each header is looked up in an index of the given keys, which is 
+    built once for every distinct set of keys.
+
+    Parameters
+    ----------
+    Args:
+        headers (Mapping[str, str] | None): 
+            The headers of the Request.
+        header_keys (list | tuple): 
+            The header keys to look for, in order of priority.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing the given header key that matched and the value of the header, or 
+        (None, None) if none of the keys is in the headers.
+    """
+
+    # There are no headers outside of a Request.
+    if not headers:
+        return None, None
+
+    # Scan the headers, keeping the one with the highest priority. We can stop early if we find
+    # the key with the highest priority.
+    index = _header_key_index(tuple(header_keys))
+    best_priority = len(header_keys)
+    best_value = None
+    for name, value in headers.items():
+        priority = index.get(name.lower())
+        if priority is not None and priority < best_priority:
+            best_priority = priority
+            best_value = value
+            if priority == 0:
+                break
+
+    # Check if we found any of the keys.
+    if best_priority == len(header_keys):
+        return None, None
+    return header_keys[best_priority], best_value
+
+
+@functools.lru_cache(maxsize=64)
+def _header_key_index(header_keys: tuple) -> dict:
+    """Map the lower case form of every given header key to its priority. If a key is given more 
+    than once, then its first position is used."""
+
+    index = {}
+    for priority, header_key in enumerate(header_keys):
+        index.setdefault(header_key.lower(), priority)
+    return index
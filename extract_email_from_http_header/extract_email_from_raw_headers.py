@@ -0,0 +1,221 @@
+import functools
+import re
+
+from . import output
+from . import validate_email
+
+# Constants.
+EMAIL_HEADER = "X-Email"
+EMAIL_UNDEFINED = "undefined"
+
+# HTTP header values are octets. They are decoded as ISO-8859-1 by default, as the RFCs say.
+DEFAULT_ENCODING = "latin-1"
+
+# The end of the header block: an empty line. Anything after it is the body.
+END_OF_HEADERS = re.compile(rb"\n\r?\n")
+
+# The line feed that ends a header line, the whitespace that starts a folded continuation line,
+# and the characters removed from the end of every line of a header value.
+LINE_FEED = b"\n"
+FOLDING_WHITESPACE = b" \t"
+TRAILING_WHITESPACE = b" \t\r"
+
+# Result codes. They are the members of validate_email.Result, as in middleware, so that the
+# result of the validation is passed on as it is.
+RESULT_UNDEFINED = validate_email.RESULT_UNDEFINED
+RESULT_SUCCESS = validate_email.RESULT_SUCCESS
+RESULT_FAILED_VALIDATION = validate_email.RESULT_FAILED_VALIDATION
+RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = validate_email.RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+RESULT_NO_EMAIL_HEADER_IN_REQUEST = validate_email.RESULT_NO_EMAIL_HEADER_IN_REQUEST
+RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = validate_email.RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = validate_email.RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+RESULT_GIVEN_HEADERS_ARE_NOT_BYTES = validate_email.RESULT_GIVEN_HEADERS_ARE_NOT_BYTES
+
+# Remarks.
+REMARKS_UNDEFINED = ""
+REMARKS_SUCCESS = "Success."
+REMARKS_NO_EMAIL_HEADER_IN_REQUEST = "No email header in the Request."
+REMARKS_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = "The Request has several email headers with different values."
+REMARKS_FAILED_VALIDATION = validate_email.REMARKS_FAILED_VALIDATION
+REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE = validate_email.REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE
+REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = validate_email.REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = "The given email header key to search for is not a string."
+REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_ASCII = "The given email header key to search for is not an ASCII string."
+REMARKS_GIVEN_HEADERS_ARE_NOT_BYTES = "The given headers are not bytes, bytearray or memoryview."
+
+# Outputs that do not depend on the inputs. They are built once and shared.
+OUTPUT_NO_EMAIL_HEADER_IN_REQUEST = output.EmailOutput(RESULT_NO_EMAIL_HEADER_IN_REQUEST,
+                                                       REMARKS_NO_EMAIL_HEADER_IN_REQUEST, EMAIL_UNDEFINED)
+OUTPUT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = output.EmailOutput(RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST,
+                                                                 REMARKS_CONFLICTING_EMAIL_HEADERS_IN_REQUEST,
+                                                                 EMAIL_UNDEFINED)
+OUTPUT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = output.EmailOutput(RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING,
+                                                                 REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING,
+                                                                 EMAIL_UNDEFINED)
+OUTPUT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_ASCII = output.EmailOutput(RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING,
+                                                                REMARKS_GIVEN_EMAIL_HEADER_KEY_IS_NOT_ASCII,
+                                                                EMAIL_UNDEFINED)
+OUTPUT_GIVEN_HEADERS_ARE_NOT_BYTES = output.EmailOutput(RESULT_GIVEN_HEADERS_ARE_NOT_BYTES,
+                                                        REMARKS_GIVEN_HEADERS_ARE_NOT_BYTES, EMAIL_UNDEFINED)
+
+# Output index.
+OUTPUT_INDEX_RESULT = 0
+OUTPUT_INDEX_REMARKS = 1
+OUTPUT_INDEX_EMAIL = 2
+
+
+@functools.lru_cache(maxsize=64)
+def header_line_patterns(header_key: str):
+    """Build the patterns that find the lines of the given header in a header block, without regard
+    to case, and capture its value with its folded continuation lines: one for a header on the
+    first line of the block, and one for a header on any other line. The patterns are compiled
+    once per header key.
+
+    Note:
+    The letters of the header key are spelled as character classes ("[Xx]-[Ee]...") instead of
+    using re.IGNORECASE, which is several times slower to search with. The pattern for the other
+    lines starts with a line feed, so the engine skips ahead from line to line.
+    """
+
+    header_name = b"".join(b"[" + bytes((character,)) + bytes((character,)).swapcase() + b"]"
+                           if bytes((character,)).isalpha() else re.escape(bytes((character,)))
+                           for character in header_key.encode("ascii"))
+    header_line = header_name + rb":[ \t]*([^\n]*(?:\n[ \t][^\n]*)*)"
+    return re.compile(header_line), re.compile(rb"\n" + header_line)
+
+
+def find_header_values(headers, header_key: str = EMAIL_HEADER):
+    """Find the value of every occurrence of the given header in a raw HTTP/1.1 header block.
+
+    The block is searched in place, without being copied, decoded or split into lines. Only the
+    values of the matched headers are copied out. Folded values (continuation lines starting with
+    a space or a tab) are joined with a single space.
+
+    Parameters
+    ----------
+    Args:
+        headers (bytes | bytearray | memoryview):
+            The header block, optionally starting with the request line, and optionally followed by
+            an empty line and the body.
+        header_key (str, optional):
+            The name of the header. Defaults to EMAIL_HEADER.
+
+    Returns
+    -------
+    Returns:
+        List[bytes]: The raw value of every occurrence of the header, in order.
+
+    Raises:
+        UnicodeEncodeError: If the header key is not an ASCII string, which no header name is.
+    """
+
+    # Only search the header block, not the body. The block ends at the line feed of its last
+    # line, which also keeps the line feed that starts the empty line out of the search.
+    end_of_headers = END_OF_HEADERS.search(headers)
+    end = end_of_headers.start() + 1 if end_of_headers is not None else len(headers)
+
+    # Find every line of the header. Only the folded values need more than removing the trailing
+    # whitespace.
+    first_line_pattern, other_line_pattern = header_line_patterns(header_key)
+    values = other_line_pattern.findall(headers, 0, end)
+    first_line_match = first_line_pattern.match(headers, 0, end)
+    if first_line_match is not None:
+        values.insert(0, first_line_match.group(1))
+    for index, value in enumerate(values):
+        if LINE_FEED in value:
+            lines = value.split(LINE_FEED)
+            parts = [lines[0].rstrip(TRAILING_WHITESPACE)]
+            parts += [line.lstrip(FOLDING_WHITESPACE).rstrip(TRAILING_WHITESPACE) for line in lines[1:]]
+            values[index] = b" ".join(part for part in parts if part)
+        else:
+            values[index] = value.rstrip(TRAILING_WHITESPACE)
+    return values
+
+
+def check_header_values(values: list):
+    """Check the values of every occurrence of the email header in a request. The middleware checks
+    them in the same way, so that a request gets the same result from both.
+
+    If the header appears more than once with the same value, then that value is used. If it
+    appears with different values, then the extraction fails, since we cannot tell which one the
+    proxy set.
+
+    Parameters
+    ----------
+    Args:
+        values (list):
+            The value of every occurrence of the header, in order.
+
+    Returns
+    -------
+    Returns:
+        EmailOutput | None: The output of the failure, or None if the first value is to be used.
+    """
+
+    if not values:
+        return OUTPUT_NO_EMAIL_HEADER_IN_REQUEST
+    if len(values) > 1 and values.count(values[0]) != len(values):
+        return OUTPUT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+    return None
+
+
+def extract_email_from_raw_headers(headers,
+                                   header_key: str = EMAIL_HEADER,
+                                   ends_with: str = None,
+                                   should_validate_email: bool = True,
+                                   engine: str = validate_email.ENGINE_SCANNER,
+                                   encoding: str = DEFAULT_ENCODING):
+    """Extract the email from a raw HTTP/1.1 header block, and validate it.
+
+    If the header appears more than once, then the values are checked by check_header_values().
+
+    Parameters
+    ----------
+    Args:
+        headers (bytes | bytearray | memoryview):
+            The header block.
+        header_key (str, optional):
+            The name of the header holding the email. Defaults to EMAIL_HEADER.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that the email must end with, or allowlist of domains. Defaults to None.
+        should_validate_email (bool, optional):
+            Whether to validate the email. Defaults to True.
+        engine (str, optional):
+            The engine used to check the syntax of the email. The header comes from the client, so
+            this defaults to the linear time validate_email.ENGINE_SCANNER.
+        encoding (str, optional):
+            The encoding used to decode the value of the header. Defaults to DEFAULT_ENCODING.
+
+    Returns
+    -------
+    Returns:
+        EmailOutput: The result code, the remarks, and the email. It unpacks and indexes as the
+        Tuple (result, remarks, email).
+    """
+
+    # Check the given arguments.
+    if not isinstance(headers, (bytes, bytearray, memoryview)):
+        return OUTPUT_GIVEN_HEADERS_ARE_NOT_BYTES
+    if not isinstance(header_key, str):
+        return OUTPUT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+
+    # Find the header.
+    try:
+        values = find_header_values(headers, header_key)
+    except UnicodeEncodeError:
+        return OUTPUT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_ASCII
+    failure_output = check_header_values(values)
+    if failure_output is not None:
+        return failure_output
+
+    # Decode only the value of the header.
+    email = values[0].decode(encoding, errors="replace")
+
+    # Check if we should validate the email.
+    if not should_validate_email:
+        return output.EmailOutput(RESULT_SUCCESS, REMARKS_SUCCESS, email)
+
+    # Validate the email.
+    result, remarks = validate_email.validate_email(email, ends_with=ends_with, engine=engine)
+    return output.EmailOutput(result, remarks, email)
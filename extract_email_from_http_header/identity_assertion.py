@@ -0,0 +1,522 @@
+"""
+Verification of the signed identity assertions that authentication proxies send along with the
+request, as a JSON Web Token (JWT) in a header, such as "X-Goog-IAP-JWT-Assertion" or
+"Cf-Access-Jwt-Assertion".
+
+A plain email header can be trusted only if no request can reach the app without going through
+the proxy. An assertion is signed by the proxy, so its email can be trusted as long as the keys
+are. The keys are loaded from a local JSON Web Key Set (JWKS) file.
+
+Verifying a signature is expensive, and the same assertion is sent on every rerun of a session.
+The verified assertions are therefore cached until they expire, so that a rerun only costs a
+dictionary lookup. The key set file is checked for changes at most once per check_interval,
+and the cache is cleared when the keys change.
+
+Example:
+    verifier = identity_assertion.AssertionVerifier("/etc/proxy/jwks.json", audience="my-app")
+    extract_email_from_headers.extract_email_from_headers(header_key="X-Goog-IAP-JWT-Assertion",
+                                                          assertion_verifier=verifier)
+"""
+
+import base64
+import binascii
+import collections
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from enum import IntEnum
+
+from . import output
+
+# Optional dependency. cryptography is only needed to verify the RS256 and ES256 signatures, so
+# it is only imported when a key set holds an RSA or an elliptic curve key.
+cryptography = None
+
+# Constants.
+DEFAULT_EMAIL_CLAIM = "email"
+DEFAULT_MAX_SIZE = 4096
+
+# How far the clock of the proxy may be off, in seconds, when checking the times of an assertion.
+DEFAULT_LEEWAY = 30.0
+
+# How often the key set file is checked for changes, in seconds.
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# Assertions longer than this are rejected before being decoded. The header is decoded before the
+# signature is checked, so it has a much smaller limit of its own, which still leaves room for any
+# header a proxy sends. The payload is only decoded once the signature is checked, and is bounded
+# by the limit of the whole assertion.
+MAX_ASSERTION_LENGTH = 16384
+MAX_HEADER_LENGTH = 1024
+
+# Algorithms.
+ALGORITHM_HS256 = "HS256"
+ALGORITHM_RS256 = "RS256"
+ALGORITHM_ES256 = "ES256"
+ALGORITHMS = (ALGORITHM_HS256, ALGORITHM_RS256, ALGORITHM_ES256)
+
+# The algorithm of each type of key. A key is only ever used with the algorithm of its type, so
+# that an assertion cannot, for example, be signed with HS256 using a public RSA key as secret.
+KEY_TYPE_ALGORITHMS = {"oct": ALGORITHM_HS256, "RSA": ALGORITHM_RS256, "EC": ALGORITHM_ES256}
+EC_CURVE_P256 = "P-256"
+EC_COORDINATE_SIZE = 32
+KEY_USE_SIGNATURE = "sig"
+
+TOKEN_SEPARATOR = "."
+
+# The alphabet of the base64url encoding, without padding (RFC 7515, section 2).
+BASE64URL_PATTERN = re.compile(r"[A-Za-z0-9_-]*")
+
+
+# Result codes. They are members of an IntEnum, as in validate_email.
+class Result(IntEnum):
+    UNDEFINED = 0
+    SUCCESS = 1
+    ASSERTION_IS_MALFORMED = 2
+    ALGORITHM_IS_NOT_ALLOWED = 3
+    KEY_IS_UNKNOWN = 4
+    SIGNATURE_IS_INVALID = 5
+    ASSERTION_HAS_EXPIRED = 6
+    ASSERTION_IS_NOT_YET_VALID = 7
+    ISSUER_IS_WRONG = 8
+    AUDIENCE_IS_WRONG = 9
+    EMAIL_CLAIM_IS_MISSING = 10
+
+RESULT_UNDEFINED = Result.UNDEFINED
+RESULT_SUCCESS = Result.SUCCESS
+RESULT_ASSERTION_IS_MALFORMED = Result.ASSERTION_IS_MALFORMED
+RESULT_ALGORITHM_IS_NOT_ALLOWED = Result.ALGORITHM_IS_NOT_ALLOWED
+RESULT_KEY_IS_UNKNOWN = Result.KEY_IS_UNKNOWN
+RESULT_SIGNATURE_IS_INVALID = Result.SIGNATURE_IS_INVALID
+RESULT_ASSERTION_HAS_EXPIRED = Result.ASSERTION_HAS_EXPIRED
+RESULT_ASSERTION_IS_NOT_YET_VALID = Result.ASSERTION_IS_NOT_YET_VALID
+RESULT_ISSUER_IS_WRONG = Result.ISSUER_IS_WRONG
+RESULT_AUDIENCE_IS_WRONG = Result.AUDIENCE_IS_WRONG
+RESULT_EMAIL_CLAIM_IS_MISSING = Result.EMAIL_CLAIM_IS_MISSING
+
+# Remarks.
+REMARKS_SUCCESS = "Success."
+REMARKS_ASSERTION_IS_MALFORMED = "The assertion is not a well formed JWT with an expiry time."
+REMARKS_ALGORITHM_IS_NOT_ALLOWED = "The algorithm of the assertion is not allowed."
+REMARKS_KEY_IS_UNKNOWN = "The assertion is not signed with a key of the key set."
+REMARKS_SIGNATURE_IS_INVALID = "The signature of the assertion is invalid."
+REMARKS_ASSERTION_HAS_EXPIRED = "The assertion has expired."
+REMARKS_ASSERTION_IS_NOT_YET_VALID = "The assertion is not valid yet."
+REMARKS_ISSUER_IS_WRONG = "The assertion was not issued by the expected issuer."
+REMARKS_AUDIENCE_IS_WRONG = "The assertion is not meant for the expected audience."
+REMARKS_EMAIL_CLAIM_IS_MISSING = "The assertion does not hold an email."
+
+# The outputs of the failures. They are built once, and shared by every call.
+OUTPUT_ASSERTION_IS_MALFORMED = output.EmailOutput(RESULT_ASSERTION_IS_MALFORMED, REMARKS_ASSERTION_IS_MALFORMED, None)
+OUTPUT_ALGORITHM_IS_NOT_ALLOWED = output.EmailOutput(RESULT_ALGORITHM_IS_NOT_ALLOWED, REMARKS_ALGORITHM_IS_NOT_ALLOWED,
+                                                     None)
+OUTPUT_KEY_IS_UNKNOWN = output.EmailOutput(RESULT_KEY_IS_UNKNOWN, REMARKS_KEY_IS_UNKNOWN, None)
+OUTPUT_SIGNATURE_IS_INVALID = output.EmailOutput(RESULT_SIGNATURE_IS_INVALID, REMARKS_SIGNATURE_IS_INVALID, None)
+OUTPUT_ASSERTION_HAS_EXPIRED = output.EmailOutput(RESULT_ASSERTION_HAS_EXPIRED, REMARKS_ASSERTION_HAS_EXPIRED, None)
+OUTPUT_ASSERTION_IS_NOT_YET_VALID = output.EmailOutput(RESULT_ASSERTION_IS_NOT_YET_VALID,
+                                                       REMARKS_ASSERTION_IS_NOT_YET_VALID, None)
+OUTPUT_ISSUER_IS_WRONG = output.EmailOutput(RESULT_ISSUER_IS_WRONG, REMARKS_ISSUER_IS_WRONG, None)
+OUTPUT_AUDIENCE_IS_WRONG = output.EmailOutput(RESULT_AUDIENCE_IS_WRONG, REMARKS_AUDIENCE_IS_WRONG, None)
+OUTPUT_EMAIL_CLAIM_IS_MISSING = output.EmailOutput(RESULT_EMAIL_CLAIM_IS_MISSING, REMARKS_EMAIL_CLAIM_IS_MISSING, None)
+
+# Output index.
+OUTPUT_INDEX_RESULT = 0
+OUTPUT_INDEX_REMARKS = 1
+OUTPUT_INDEX_EMAIL = 2
+
+# A verification key: its identifier (or None), its algorithm, and the function that checks a
+# signature of the given data with it.
+Key = collections.namedtuple("Key", ["kid", "algorithm", "verify"])
+
+# Cache statistics, as returned by AssertionVerifier.info().
+AssertionCacheInfo = collections.namedtuple("AssertionCacheInfo", ["hits", "misses", "evictions", "reloads",
+                                                                   "max_size", "size"])
+
+
+class KeySet:
+    """The verification keys of a JSON Web Key Set file, reloaded when the file changes.
+
+    The supported keys are the symmetric keys ("oct", for HS256), the RSA keys (for RS256) and
+    the P-256 elliptic curve keys (for ES256). The other keys, and the keys that are not meant
+    for signatures, are ignored. If the file cannot be loaded after it changed, including when it
+    holds an RSA or an elliptic curve key and cryptography is not installed, then the keys loaded
+    before are kept, and the assertions signed with the new keys fail with KEY_IS_UNKNOWN.
+    """
+
+    def __init__(self, path: str, check_interval: float = DEFAULT_CHECK_INTERVAL, clock=time.monotonic):
+        """Load the keys of the given file. Raises OSError or ValueError if they cannot be loaded, and
+        ImportError if the file holds an RSA or an elliptic curve key and cryptography is not
+        installed."""
+
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._file_signature = _file_signature(path)
+        self._keys_by_kid, self._keys_by_algorithm = _load_keys(path)
+        self._next_check = clock() + check_interval
+
+    def refresh(self) -> bool:
+        """Reload the keys if the file changed since they were loaded. The file is checked at most
+        once per check_interval. Return True if the keys were reloaded."""
+
+        if self._clock() < self._next_check:
+            return False
+
+        with self._lock:
+            now = self._clock()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            try:
+                file_signature = _file_signature(self.path)
+                if file_signature == self._file_signature:
+                    return False
+                self._keys_by_kid, self._keys_by_algorithm = _load_keys(self.path)
+            except (OSError, ValueError, ImportError):
+                return False
+            self._file_signature = file_signature
+            return True
+
+    def find(self, kid, algorithm: str) -> list:
+        """Return the keys of the given algorithm that may have signed an assertion with the given
+        key identifier. An assertion without an identifier may have been signed by any of them."""
+
+        if kid is None:
+            return self._keys_by_algorithm.get(algorithm, [])
+        return [key for key in self._keys_by_kid.get(kid, []) if key.algorithm == algorithm]
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._keys_by_algorithm.values())
+
+    def __repr__(self) -> str:
+        return "KeySet(" + repr(self.path) + ", " + str(len(self)) + " keys)"
+
+
+class AssertionVerifier:
+    """Verifies the identity assertions signed with the keys of a key set, and takes the email
+    from their claims.
+
+    The assertions that pass are cached, with least recently used eviction, until they expire.
+    The failures are not cached, so that a flood of forged assertions cannot evict the valid
+    ones. It is safe to share between threads and between sessions.
+    """
+
+    def __init__(self, key_set: KeySet | str, algorithms=ALGORITHMS, issuer: str | None = None,
+                 audience: str | None = None, email_claim: str = DEFAULT_EMAIL_CLAIM,
+                 leeway: float = DEFAULT_LEEWAY, max_size: int = DEFAULT_MAX_SIZE, clock=time.time):
+        """Build a verifier.
+
+        Parameters
+        ----------
+        Args:
+            key_set (KeySet | str):
+                The key set, or the path of a JSON Web Key Set file.
+            algorithms (Iterable[str], optional):
+                The algorithms that the assertions may be signed with. Defaults to ALGORITHMS.
+            issuer (str | None, optional):
+                The issuer ("iss" claim) that the assertions must have, or None to accept any. Defaults to None.
+            audience (str | None, optional):
+                The audience ("aud" claim) that the assertions must be meant for, or None to accept any.
+                Defaults to None.
+            email_claim (str, optional):
+                The claim holding the email. Defaults to "email".
+            leeway (float, optional):
+                How far the clock of the proxy may be off, in seconds. Defaults to DEFAULT_LEEWAY.
+            max_size (int, optional):
+                The maximum number of verified assertions kept in the cache. Defaults to DEFAULT_MAX_SIZE.
+            clock (Callable[[], float], optional):
+                The function giving the current time, in seconds since the epoch. Defaults to time.time.
+        """
+
+        if max_size < 0:
+            raise ValueError("The maximum size of the cache cannot be negative.")
+        for algorithm in algorithms:
+            if algorithm not in ALGORITHMS:
+                raise ValueError("Unknown algorithm [" + str(algorithm) + "].")
+
+        self.key_set = KeySet(key_set) if isinstance(key_set, str) else key_set
+        self.algorithms = frozenset(algorithms)
+        self.issuer = issuer
+        self.audience = audience
+        self.email_claim = email_claim
+        self.leeway = leeway
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._reloads = 0
+
+    def verify(self, assertion: str) -> output.EmailOutput:
+        """Verify the given assertion, and take the email from its claims.
+
+        Returns
+        -------
+        Returns:
+            EmailOutput: The result code, the remarks, and the email (None if the verification failed).
+            It unpacks and indexes as a Tuple.
+        """
+
+        # Forget the verified assertions if the keys changed, since their key may be gone.
+        if self.key_set.refresh():
+            with self._lock:
+                self._entries.clear()
+                self._reloads += 1
+
+        # Look up the cache.
+        with self._lock:
+            entry = self._entries.get(assertion)
+            if entry is not None:
+                if self._clock() < entry[0]:
+                    self._entries.move_to_end(assertion)
+                    self._hits += 1
+                    return entry[1]
+                del self._entries[assertion]
+            self._misses += 1
+
+        # Verify the assertion outside of the lock, so that other threads are not held up.
+        expires_at, verification_output = self._verify(assertion)
+
+        # Add the verified assertion to the cache, evicting the least recently used ones.
+        if verification_output.result == RESULT_SUCCESS and self._max_size > 0:
+            with self._lock:
+                self._entries[assertion] = (expires_at, verification_output)
+                self._entries.move_to_end(assertion)
+                while len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+        return verification_output
+
+    def info(self) -> AssertionCacheInfo:
+        """Return the statistics of the cache."""
+
+        with self._lock:
+            return AssertionCacheInfo(self._hits, self._misses, self._evictions, self._reloads, self._max_size,
+                                      len(self._entries))
+
+    def clear(self):
+        """Remove every verified assertion from the cache, and reset the statistics."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._reloads = 0
+
+    def _verify(self, assertion):
+        """Verify the given assertion. Return the time until which it is valid, and the output."""
+
+        # Split and decode the assertion.
+        if not isinstance(assertion, str) or len(assertion) > MAX_ASSERTION_LENGTH:
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+        parts = assertion.split(TOKEN_SEPARATOR)
+        if len(parts) != 3 or len(parts[0]) > MAX_HEADER_LENGTH:
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+
+        # The header is not verified yet. Deeply nested JSON makes the parser raise RecursionError.
+        try:
+            header = json.loads(_decode_base64url(parts[0]))
+            signature = _decode_base64url(parts[2])
+        except (ValueError, RecursionError):
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+
+        # Any critical extension of the header is unknown to us, so it must be rejected (RFC 7515,
+        # section 4.1.11).
+        if not isinstance(header, dict) or "crit" in header:
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+
+        # Check the algorithm, and find the keys.
+        algorithm = header.get("alg")
+        if algorithm not in self.algorithms:
+            return None, OUTPUT_ALGORITHM_IS_NOT_ALLOWED
+        keys = self.key_set.find(header.get("kid"), algorithm)
+        if not keys:
+            return None, OUTPUT_KEY_IS_UNKNOWN
+
+        # Check the signature.
+        signing_input = (parts[0] + TOKEN_SEPARATOR + parts[1]).encode("ascii", "replace")
+        if not any(key.verify(signing_input, signature) for key in keys):
+            return None, OUTPUT_SIGNATURE_IS_INVALID
+
+        # The claims can only be trusted now.
+        try:
+            claims = json.loads(_decode_base64url(parts[1]))
+        except (ValueError, RecursionError):
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+        if not isinstance(claims, dict) or not _is_number(claims.get("exp")):
+            return None, OUTPUT_ASSERTION_IS_MALFORMED
+
+        # Check the times.
+        now = self._clock()
+        expires_at = claims["exp"] + self.leeway
+        if now >= expires_at:
+            return None, OUTPUT_ASSERTION_HAS_EXPIRED
+        not_before = claims.get("nbf")
+        if not_before is not None and (not _is_number(not_before) or now + self.leeway < not_before):
+            return None, OUTPUT_ASSERTION_IS_NOT_YET_VALID
+
+        # Check the issuer and the audience.
+        if self.issuer is not None and claims.get("iss") != self.issuer:
+            return None, OUTPUT_ISSUER_IS_WRONG
+        if self.audience is not None:
+            audience = claims.get("aud")
+            if not (audience == self.audience or (isinstance(audience, list) and self.audience in audience)):
+                return None, OUTPUT_AUDIENCE_IS_WRONG
+
+        # Take the email.
+        email = claims.get(self.email_claim)
+        if not isinstance(email, str) or not email:
+            return None, OUTPUT_EMAIL_CLAIM_IS_MISSING
+        return expires_at, output.EmailOutput(RESULT_SUCCESS, REMARKS_SUCCESS, email)
+
+
+def _load_keys(path: str):
+    """Load the supported keys of a JSON Web Key Set file, and index them by identifier and by
+    algorithm."""
+
+    with open(path, "rb") as file:
+        document = json.load(file)
+    if not isinstance(document, dict) or not isinstance(document.get("keys"), list):
+        raise ValueError("The file [" + path + "] is not a JSON Web Key Set.")
+
+    keys_by_kid = {}
+    keys_by_algorithm = {}
+    for jwk in document["keys"]:
+        key = _parse_key(jwk)
+        if key is None:
+            continue
+        keys_by_kid.setdefault(key.kid, []).append(key)
+        keys_by_algorithm.setdefault(key.algorithm, []).append(key)
+    return keys_by_kid, keys_by_algorithm
+
+
+def _parse_key(jwk) -> Key | None:
+    """Return the verification key of the given JSON Web Key, or None if it is not supported."""
+
+    if not isinstance(jwk, dict):
+        return None
+    algorithm = KEY_TYPE_ALGORITHMS.get(jwk.get("kty"))
+    if algorithm is None or jwk.get("alg", algorithm) != algorithm or jwk.get("use", KEY_USE_SIGNATURE) != KEY_USE_SIGNATURE:
+        return None
+
+    try:
+        if algorithm == ALGORITHM_HS256:
+            verify = _hmac_verifier(_decode_base64url(jwk["k"]))
+        elif algorithm == ALGORITHM_RS256:
+            verify = _rsa_verifier(_decode_base64url_integer(jwk["n"]), _decode_base64url_integer(jwk["e"]))
+        elif jwk.get("crv") == EC_CURVE_P256:
+            verify = _ec_verifier(_decode_base64url_integer(jwk["x"]), _decode_base64url_integer(jwk["y"]))
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    return Key(jwk.get("kid"), algorithm, verify)
+
+
+def _hmac_verifier(secret: bytes):
+
+    def verify(data: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(hmac.new(secret, data, hashlib.sha256).digest(), signature)
+
+    return verify
+
+
+def _rsa_verifier(modulus: int, exponent: int):
+
+    _import_cryptography()
+    public_key = cryptography.hazmat.primitives.asymmetric.rsa.RSAPublicNumbers(exponent, modulus).public_key()
+    padding = cryptography.hazmat.primitives.asymmetric.padding.PKCS1v15()
+    algorithm = cryptography.hazmat.primitives.hashes.SHA256()
+
+    def verify(data: bytes, signature: bytes) -> bool:
+        try:
+            public_key.verify(signature, data, padding, algorithm)
+        except cryptography.exceptions.InvalidSignature:
+            return False
+        return True
+
+    return verify
+
+
+def _ec_verifier(x: int, y: int):
+
+    _import_cryptography()
+    ec = cryptography.hazmat.primitives.asymmetric.ec
+    public_key = ec.EllipticCurvePublicNumbers(x, y, ec.SECP256R1()).public_key()
+    algorithm = ec.ECDSA(cryptography.hazmat.primitives.hashes.SHA256())
+    encode_signature = cryptography.hazmat.primitives.asymmetric.utils.encode_dss_signature
+
+    def verify(data: bytes, signature: bytes) -> bool:
+
+        # A JWS signature is the two integers one after the other, where cryptography expects them
+        # DER encoded (RFC 7518, section 3.4).
+        if len(signature) != 2 * EC_COORDINATE_SIZE:
+            return False
+        signature = encode_signature(int.from_bytes(signature[:EC_COORDINATE_SIZE], "big"),
+                                     int.from_bytes(signature[EC_COORDINATE_SIZE:], "big"))
+        try:
+            public_key.verify(signature, data, algorithm)
+        except cryptography.exceptions.InvalidSignature:
+            return False
+        return True
+
+    return verify
+
+
+def _decode_base64url(value: str) -> bytes:
+    """Decode the unpadded base64url encoding used by JWTs. Raises ValueError if it is invalid.
+
+    Only the canonical encoding of a value is accepted: base64.urlsafe_b64decode() skips the
+    characters outside of the alphabet, and ignores the unused bits of the last character, so that
+    many texts decode to the same signature.
+    """
+
+    if not isinstance(value, str) or not BASE64URL_PATTERN.fullmatch(value):
+        raise ValueError("The value is not base64url encoded.")
+    try:
+        decoded = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except binascii.Error as error:
+        raise ValueError(str(error)) from error
+    if base64.urlsafe_b64encode(decoded).rstrip(b"=") != value.encode("ascii"):
+        raise ValueError("The value is not canonically base64url encoded.")
+    return decoded
+
+
+def _decode_base64url_integer(value: str) -> int:
+    return int.from_bytes(_decode_base64url(value), "big")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _file_signature(path: str):
+    """Return what changes when the file is replaced or modified."""
+
+    status = os.stat(path)
+    return status.st_mtime_ns, status.st_size, status.st_ino
+
+
+def _import_cryptography():
+    """Import cryptography, if it has not been imported yet."""
+
+    global cryptography
+    if cryptography is None:
+        try:
+            import cryptography.exceptions
+            import cryptography.hazmat.primitives.asymmetric.ec
+            import cryptography.hazmat.primitives.asymmetric.padding
+            import cryptography.hazmat.primitives.asymmetric.rsa
+            import cryptography.hazmat.primitives.asymmetric.utils
+            import cryptography.hazmat.primitives.hashes
+        except ImportError as error:
+            raise ImportError("RS256 and ES256 keys need cryptography. Install it with: pip install cryptography") from error
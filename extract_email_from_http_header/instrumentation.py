@@ -0,0 +1,374 @@
+"""
+Opt-in instrumentation of the hot paths of the package.
+
+When enabled, the instrumented functions are replaced, in their modules, by wrappers that count
+the calls per result code, record the latency in a histogram, and call the hooks. When disabled,
+the original functions are put back, so the instrumentation costs nothing at all.
+
+Example:
+    from extract_email_from_http_header import instrumentation
+    instrumentation.enable()
+    ...
+    print(instrumentation.export_prometheus())
+
+Note:
+Only the calls made through the modules are seen. A function imported by name before enable()
+is called (as in "from ...validate_email import validate_email") keeps calling the original.
+"""
+
+import bisect
+import collections
+import functools
+import importlib
+import inspect
+import threading
+import time
+
+# Constants.
+PACKAGE = __name__.rpartition(".")[0]
+
+# The upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                           0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+# The names of the metrics in the Prometheus export.
+METRIC_CALLS = "extract_email_from_http_header_calls_total"
+METRIC_LATENCY = "extract_email_from_http_header_latency_seconds"
+
+# The result of a call that raised an exception.
+RESULT_EXCEPTION = "exception"
+
+# Where the result code of a function is found: in its output, or in the output it stores in the
+# session_state, for the Streamlit helper that returns the value of the widget instead.
+RESULT_SOURCE_OUTPUT = "output"
+RESULT_SOURCE_SESSION_STATE = "session_state"
+
+# The functions that can be instrumented, as "module.function", and where their result code is.
+Target = collections.namedtuple("Target", ["module", "function", "result_source"])
+TARGETS = {
+    "validate_email.validate_email":
+        Target("validate_email", "validate_email", RESULT_SOURCE_OUTPUT),
+    "extract_email_from_headers.extract_email_from_headers":
+        Target("extract_email_from_headers", "extract_email_from_headers", RESULT_SOURCE_OUTPUT),
+    "extract_email_from_headers.extract_email_from_any_header":
+        Target("extract_email_from_headers", "extract_email_from_any_header", RESULT_SOURCE_OUTPUT),
+    "extract_email_from_raw_headers.extract_email_from_raw_headers":
+        Target("extract_email_from_raw_headers", "extract_email_from_raw_headers", RESULT_SOURCE_OUTPUT),
+    "middleware.identify":
+        Target("middleware", "identify", RESULT_SOURCE_OUTPUT),
+    "streamlit_helper_email_input.streamlit_helper_email_input":
+        Target("streamlit_helper_email_input", "streamlit_helper_email_input", RESULT_SOURCE_SESSION_STATE),
+}
+
+
+class Histogram:
+    """A latency histogram with fixed buckets."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Add a value to the histogram."""
+
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """Return the number of values less than or equal to each bucket, and then the total."""
+
+        total = 0
+        counts = []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class FunctionMetrics:
+    """The metrics of one instrumented function: the number of calls per result code, and the
+    latency histogram."""
+
+    __slots__ = ("counts", "histogram")
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+
+        self.counts = {}
+        self.histogram = Histogram(buckets)
+
+
+# The state of the instrumentation.
+_lock = threading.Lock()
+_enabled = False
+_buckets = DEFAULT_LATENCY_BUCKETS
+_originals = {}
+_metrics = {}
+
+# The hooks. The tuple is replaced, never changed, so that it can be read without the lock.
+_hooks = ()
+
+
+def enable(functions=None, buckets=DEFAULT_LATENCY_BUCKETS):
+    """Start instrumenting the given functions.
+
+    Parameters
+    ----------
+    Args:
+        functions (Iterable[str], optional):
+            The functions to instrument, as keys of TARGETS. Defaults to every function of TARGETS whose
+            module can be imported, so the Streamlit functions are skipped if Streamlit is not installed.
+        buckets (Iterable[float], optional):
+            The upper bounds of the latency histogram buckets, in seconds. Defaults to DEFAULT_LATENCY_BUCKETS.
+            The histogram of a function that was instrumented before with other buckets starts over.
+
+    Returns
+    -------
+    Returns:
+        List[str]: The functions that are instrumented.
+    """
+
+    global _enabled, _buckets
+
+    names = TARGETS if functions is None else functions
+    with _lock:
+        _buckets = tuple(sorted(buckets))
+        for name in names:
+            if name in _originals:
+                continue
+            target = TARGETS.get(name)
+            if target is None:
+                raise ValueError("Unknown function [" + str(name) + "].")
+
+            # Import the module. Modules whose dependencies are missing are skipped, unless they
+            # were asked for.
+            try:
+                module = importlib.import_module("." + target.module, PACKAGE)
+            except ImportError:
+                if functions is not None:
+                    raise
+                continue
+
+            # Replace the function by its wrapper.
+            original = getattr(module, target.function)
+            metrics = _metrics.get(name)
+            if metrics is None:
+                metrics = _metrics[name] = FunctionMetrics(_buckets)
+            elif metrics.histogram.buckets != _buckets:
+                metrics.histogram = Histogram(_buckets)
+            _originals[name] = (module, original)
+            setattr(module, target.function, _instrument(name, original, target.result_source, metrics))
+
+        _enabled = bool(_originals)
+        return sorted(_originals)
+
+
+def disable():
+    """Stop instrumenting, and put the original functions back. The metrics are kept."""
+
+    global _enabled
+
+    with _lock:
+        for name, (module, original) in _originals.items():
+            setattr(module, TARGETS[name].function, original)
+        _originals.clear()
+        _enabled = False
+
+
+def is_enabled() -> bool:
+    """Return True if any function is instrumented."""
+
+    return _enabled
+
+
+def reset():
+    """Remove every metric."""
+
+    with _lock:
+        for metrics in _metrics.values():
+            metrics.counts.clear()
+            metrics.histogram = Histogram(metrics.histogram.buckets)
+
+
+def add_hook(hook):
+    """Call the given function after every instrumented call, with the name of the function, its
+    result code (or RESULT_EXCEPTION), and its latency in seconds. The hook is called on the hot
+    path, so it should be quick and should not raise."""
+
+    global _hooks
+
+    with _lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook):
+    """Stop calling the given hook."""
+
+    global _hooks
+
+    with _lock:
+        hooks = list(_hooks)
+        hooks.remove(hook)
+        _hooks = tuple(hooks)
+
+
+def get_counters() -> dict:
+    """Return the number of calls per function and result code, as a dictionary keyed on
+    (function, result)."""
+
+    with _lock:
+        return {(name, result): count for name, metrics in _metrics.items() for result, count in metrics.counts.items()}
+
+
+def get_histograms() -> dict:
+    """Return a copy of the latency histogram of every function."""
+
+    with _lock:
+        histograms = {}
+        for name, metrics in _metrics.items():
+            histogram = metrics.histogram
+            if not histogram.count:
+                continue
+            copy = Histogram(histogram.buckets)
+            copy.counts = list(histogram.counts)
+            copy.sum = histogram.sum
+            copy.count = histogram.count
+            histograms[name] = copy
+        return histograms
+
+
+def export_prometheus() -> str:
+    """Return the metrics in the Prometheus text exposition format."""
+
+    counters = get_counters()
+    histograms = get_histograms()
+
+    lines = ["# HELP " + METRIC_CALLS + " Number of calls per function and result code.",
+             "# TYPE " + METRIC_CALLS + " counter"]
+    for (name, result), count in sorted(counters.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        result_code = str(int(result)) if isinstance(result, int) else str(result)
+        labels = 'function="' + name + '",result="' + result_code + '",result_name="' + _result_name(name, result) + '"'
+        lines.append(METRIC_CALLS + "{" + labels + "} " + str(count))
+
+    lines.append("# HELP " + METRIC_LATENCY + " Latency of the calls per function, in seconds.")
+    lines.append("# TYPE " + METRIC_LATENCY + " histogram")
+    for name, histogram in sorted(histograms.items()):
+        cumulative_counts = histogram.cumulative_counts()
+        for bucket, count in zip(histogram.buckets + (float("inf"),), cumulative_counts):
+            bucket = "+Inf" if bucket == float("inf") else repr(bucket)
+            lines.append(METRIC_LATENCY + '_bucket{function="' + name + '",le="' + bucket + '"} ' + str(count))
+        lines.append(METRIC_LATENCY + '_sum{function="' + name + '"} ' + repr(histogram.sum))
+        lines.append(METRIC_LATENCY + '_count{function="' + name + '"} ' + str(histogram.count))
+
+    return "\n".join(lines) + "\n"
+
+
+def _instrument(name: str, function, result_source: str, metrics: FunctionMetrics):
+    """Return the wrapper that instruments the given function, recording into the given metrics.
+    Everything the wrapper needs is bound to local names, since it runs on the hot path."""
+
+    get_result = _result_from_output if result_source == RESULT_SOURCE_OUTPUT else _result_getter_from_session_state(
+        function)
+    clock = time.perf_counter
+    lock = _lock
+    counts = metrics.counts
+    find_bucket = bisect.bisect_left
+
+    def record(result, elapsed):
+        with lock:
+            counts[result] = counts.get(result, 0) + 1
+            histogram = metrics.histogram
+            histogram.counts[find_bucket(histogram.buckets, elapsed)] += 1
+            histogram.sum += elapsed
+            histogram.count += 1
+        for hook in _hooks:
+            hook(name, result, elapsed)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+
+        started = clock()
+        try:
+            output = function(*args, **kwargs)
+        except BaseException:
+            record(RESULT_EXCEPTION, clock() - started)
+            raise
+        elapsed = clock() - started
+        record(get_result(output, args, kwargs), elapsed)
+        return output
+
+    return wrapper
+
+
+def _result_from_output(output, args, kwargs):
+    """Return the result code at the start of the output of a function."""
+
+    return output[0]
+
+
+def _result_getter_from_session_state(function):
+    """Return a function that finds the result code of the Streamlit helper in the output it stores
+    in the session_state. The result is None if the helper was not asked to store its output.
+
+    The parameters are looked up in the signature once, here, so that finding the arguments of a
+    call costs a few lookups instead of binding them to the signature on every call.
+    """
+
+    parameters = inspect.signature(function).parameters
+    get_session_state = _argument_getter(parameters, "session_state")
+    get_key = _argument_getter(parameters, "session_state_key_function_output")
+
+    def get_result(output, args, kwargs):
+        key = get_key(args, kwargs)
+        session_state = get_session_state(args, kwargs)
+        if key is None or session_state is None or key not in session_state:
+            return None
+        return session_state[key][0]
+
+    return get_result
+
+
+def _argument_getter(parameters, name: str):
+    """Return a function that finds the value of the given parameter in the arguments of a call, or
+    its default value (None if it has none)."""
+
+    parameter = parameters[name]
+    position = None
+    if parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD):
+        position = list(parameters).index(name)
+    default = None if parameter.default is inspect.Parameter.empty else parameter.default
+
+    def get_argument(args, kwargs):
+        if name in kwargs:
+            return kwargs[name]
+        if position is not None and position < len(args):
+            return args[position]
+        return default
+
+    return get_argument
+
+
+@functools.lru_cache(maxsize=None)
+def _result_names(module_name: str) -> dict:
+    """Return a dictionary mapping the result codes of the given module to their names, such as
+    "no_email_header_in_request" for RESULT_NO_EMAIL_HEADER_IN_REQUEST."""
+
+    module = importlib.import_module("." + module_name, PACKAGE)
+    names = {}
+    for attribute, value in vars(module).items():
+        if attribute.startswith("RESULT_") and isinstance(value, int) and value not in names:
+            names[value] = attribute[len("RESULT_"):].lower()
+    return names
+
+
+def _result_name(name: str, result) -> str:
+    """Return the name of the given result code of the given function."""
+
+    if result == RESULT_EXCEPTION:
+        return RESULT_EXCEPTION
+    return _result_names(TARGETS[name].module).get(result, "unknown")
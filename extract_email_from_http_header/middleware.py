@@ -0,0 +1,220 @@
+import abc
+
+from . import extract_email_from_raw_headers
+from . import output
+from . import validate_email
+
+# Constants.
+EMAIL_HEADER = "X-Email"
+EMAIL_UNDEFINED = "undefined"
+
+# The key under which the identity is attached to the request. ASGI applications find it in
+# scope["state"] (request.state.user_identity in Starlette and FastAPI), and WSGI applications
+# find it in the environ (request.environ["extract_email_from_http_header.identity"] in Flask).
+STATE_KEY_IDENTITY = "user_identity"
+ENVIRON_KEY_IDENTITY = "extract_email_from_http_header.identity"
+
+# The types of ASGI connections that carry headers.
+ASGI_SCOPE_TYPES_WITH_HEADERS = {"http", "websocket"}
+
+# Result codes. They are the members of validate_email.Result, so that the result of the
+# validation is passed on as it is, and a code means the same thing as in validate_email.
+RESULT_UNDEFINED = validate_email.RESULT_UNDEFINED
+RESULT_SUCCESS = validate_email.RESULT_SUCCESS
+RESULT_FAILED_VALIDATION = validate_email.RESULT_FAILED_VALIDATION
+RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = validate_email.RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+RESULT_NO_EMAIL_HEADER_IN_REQUEST = validate_email.RESULT_NO_EMAIL_HEADER_IN_REQUEST
+RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = validate_email.RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+
+# Remarks.
+REMARKS_UNDEFINED = ""
+REMARKS_SUCCESS = "Success."
+REMARKS_NO_EMAIL_HEADER_IN_REQUEST = extract_email_from_raw_headers.REMARKS_NO_EMAIL_HEADER_IN_REQUEST
+REMARKS_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = extract_email_from_raw_headers.REMARKS_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+REMARKS_FAILED_VALIDATION = validate_email.REMARKS_FAILED_VALIDATION
+REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE = validate_email.REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE
+REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = validate_email.REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+
+# Output index.
+OUTPUT_INDEX_RESULT = 0
+OUTPUT_INDEX_REMARKS = 1
+OUTPUT_INDEX_EMAIL = 2
+
+
+class HeaderProvider(abc.ABC):
+    """Gets the values of one header from the headers of a request, in whatever form a framework
+    gives them. Everything that depends only on the header key is worked out once, when the
+    provider is created, so that getting the header costs as little as possible per request."""
+
+    def __init__(self, header_key: str = EMAIL_HEADER):
+
+        if not isinstance(header_key, str):
+            raise TypeError("The header key [" + str(header_key) + "] is not a string.")
+        self.header_key = header_key
+
+    @abc.abstractmethod
+    def get_values(self, source) -> list:
+        """Return the value of every occurrence of the header in the given source, in order. The
+        list is empty if the header is not there."""
+
+
+class MappingHeaderProvider(HeaderProvider):
+    """Gets a header from a mapping of header names to values, such as the headers returned by
+    Streamlit. The exact key is tried first, and then the key without regard to case, in which
+    case every name that matches is an occurrence of the header."""
+
+    def __init__(self, header_key: str = EMAIL_HEADER):
+
+        super().__init__(header_key)
+        self._lower_header_key = header_key.lower()
+
+    def get_values(self, source) -> list:
+
+        if not source:
+            return []
+        value = source.get(self.header_key)
+        if value is not None:
+            return [value]
+        lower_header_key = self._lower_header_key
+        return [value for name, value in source.items() if name.lower() == lower_header_key]
+
+
+class ASGIHeaderProvider(HeaderProvider):
+    """Gets a header from an ASGI scope. The scope holds the headers as a list of (name, value)
+    byte pairs, with the names in lower case, so the list is scanned directly, without building a
+    dictionary. A header sent several times is in the list several times."""
+
+    def __init__(self, header_key: str = EMAIL_HEADER):
+
+        super().__init__(header_key)
+        self._header_name = header_key.lower().encode("latin-1")
+
+    def get_values(self, source) -> list:
+
+        header_name = self._header_name
+        return [value.decode("latin-1") for name, value in source.get("headers", ()) if name == header_name]
+
+
+class WSGIHeaderProvider(HeaderProvider):
+    """Gets a header from a WSGI environ, in which the header "X-Email" is the key "HTTP_X_EMAIL". The
+    server joins the values of a header sent several times into one value, which is then not a
+    valid email."""
+
+    def __init__(self, header_key: str = EMAIL_HEADER):
+
+        super().__init__(header_key)
+        self._environ_key = "HTTP_" + header_key.upper().replace("-", "_")
+
+    def get_values(self, source) -> list:
+
+        value = source.get(self._environ_key)
+        return [] if value is None else [value]
+
+
+def identify(source, header_provider: HeaderProvider, ends_with: str = None, should_validate_email: bool = True,
+             engine: str = validate_email.ENGINE_SCANNER) -> output.EmailOutput:
+    """Extract the email from the headers of a request, and validate it.
+
+    If the header appears more than once, then the values are checked as in
+    extract_email_from_raw_headers.check_header_values(), so a request gets the same result from
+    the middleware and from the raw header block.
+
+    Parameters
+    ----------
+    Args:
+        source:
+            The headers of the request, in the form the given header provider reads.
+        header_provider (HeaderProvider):
+            The provider that gets the email header from the source.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that the email must end with, or allowlist of domains. Defaults to None.
+        should_validate_email (bool, optional):
+            Whether to validate the email. Defaults to True.
+        engine (str, optional):
+            The engine used to check the syntax of the email. The header comes from the client, so
+            this defaults to the linear time validate_email.ENGINE_SCANNER.
+
+    Returns
+    -------
+    Returns:
+        EmailOutput: The result code, the remarks, and the email. It unpacks and indexes as the
+        Tuple (result, remarks, email).
+    """
+
+    # Get the email.
+    values = header_provider.get_values(source)
+    failure_output = extract_email_from_raw_headers.check_header_values(values)
+    if failure_output is not None:
+        return failure_output
+    email = values[0]
+
+    # Check if we should validate the email.
+    if not should_validate_email:
+        return output.EmailOutput(RESULT_SUCCESS, REMARKS_SUCCESS, email)
+
+    # Validate the email.
+    result, remarks = validate_email.validate_email(email, ends_with=ends_with, engine=engine)
+    return output.EmailOutput(result, remarks, email)
+
+
+class EmailIdentityASGIMiddleware:
+    """ASGI middleware that extracts and validates the email of every request once, and attaches
+    the resulting EmailOutput to scope["state"][state_key].
+
+    Example:
+        app = EmailIdentityASGIMiddleware(app, ends_with="@corp.com")
+    """
+
+    def __init__(self, app, header_key: str = EMAIL_HEADER, ends_with: str = None, should_validate_email: bool = True,
+                 engine: str = validate_email.ENGINE_SCANNER, state_key: str = STATE_KEY_IDENTITY):
+
+        self.app = app
+        self.header_provider = ASGIHeaderProvider(header_key)
+        self.ends_with = ends_with
+        self.should_validate_email = should_validate_email
+        self.engine = engine
+        self.state_key = state_key
+
+        # Check the engine once, instead of on every request.
+        validate_email.get_matcher(engine)
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] in ASGI_SCOPE_TYPES_WITH_HEADERS:
+            identity = identify(scope, self.header_provider, ends_with=self.ends_with,
+                                should_validate_email=self.should_validate_email, engine=self.engine)
+            state = scope.get("state")
+            if state is None:
+                state = scope["state"] = {}
+            state[self.state_key] = identity
+
+        await self.app(scope, receive, send)
+
+
+class EmailIdentityWSGIMiddleware:
+    """WSGI middleware that extracts and validates the email of every request once, and attaches
+    the resulting EmailOutput to environ[environ_key].
+
+    Example:
+        app.wsgi_app = EmailIdentityWSGIMiddleware(app.wsgi_app, ends_with="@corp.com")
+    """
+
+    def __init__(self, app, header_key: str = EMAIL_HEADER, ends_with: str = None, should_validate_email: bool = True,
+                 engine: str = validate_email.ENGINE_SCANNER, environ_key: str = ENVIRON_KEY_IDENTITY):
+
+        self.app = app
+        self.header_provider = WSGIHeaderProvider(header_key)
+        self.ends_with = ends_with
+        self.should_validate_email = should_validate_email
+        self.engine = engine
+        self.environ_key = environ_key
+
+        # Check the engine once, instead of on every request.
+        validate_email.get_matcher(engine)
+
+    def __call__(self, environ, start_response):
+
+        environ[self.environ_key] = identify(environ, self.header_provider, ends_with=self.ends_with,
+                                             should_validate_email=self.should_validate_email, engine=self.engine)
+        return self.app(environ, start_response)
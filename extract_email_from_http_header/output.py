@@ -0,0 +1,79 @@
+import operator
+
+
+class Output(tuple):
+    """The output of a function of the package: a result code and its remarks.
+
+    It is a Tuple, like the one the function used to return, so it unpacks, indexes (with the
+    OUTPUT_INDEX_* constants of the function), compares, hashes, pickles and serializes to JSON (as
+    a list) as before, and isinstance(output, tuple) holds. The values can also be read by name.
+
+    Outputs are read-only. The outputs that do not depend on the inputs are built once and shared.
+
+    Example:
+        result, remarks = validate_email.validate_email(email)
+        output = validate_email.validate_email(email)
+        output.result, output.remarks, output[validate_email.OUTPUT_INDEX_RESULT], output._asdict()
+    """
+
+    __slots__ = ()
+
+    # The names of the values, in the order of the Tuple.
+    _fields = ("result", "remarks")
+
+    def __new__(cls, result, remarks: str, remarks_arguments: tuple = None):
+        """Build an output. If remarks_arguments is given, then the remarks are a format string,
+        which is formatted with these arguments here, so the output only holds the formatted
+        remarks."""
+
+        if remarks_arguments is not None:
+            remarks = remarks.format(*remarks_arguments)
+        return tuple.__new__(cls, (result, remarks))
+
+    result = property(operator.itemgetter(0), doc="The result code.")
+    remarks = property(operator.itemgetter(1), doc="The remarks on the result.")
+
+    def _asdict(self) -> dict:
+        """Return the values by name."""
+
+        return dict(zip(self._fields, self))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + ", ".join(field + "=" + repr(value)
+                                                     for field, value in zip(self._fields, self)) + ")"
+
+
+class EmailOutput(Output):
+    """An Output that also holds an email: it is the Tuple (result, remarks, email)."""
+
+    __slots__ = ()
+
+    _fields = ("result", "remarks", "email")
+
+    def __new__(cls, result, remarks: str, email, remarks_arguments: tuple = None):
+
+        if remarks_arguments is not None:
+            remarks = remarks.format(*remarks_arguments)
+        return tuple.__new__(cls, (result, remarks, email))
+
+    email = property(operator.itemgetter(2), doc="The email.")
+
+
+class HeaderOutput(EmailOutput):
+    """An EmailOutput that also holds the header key that matched: it is the Tuple (result, remarks,
+    email, header_key)."""
+
+    __slots__ = ()
+
+    _fields = ("result", "remarks", "email", "header_key")
+
+    def __new__(cls, result, remarks: str, email, header_key, remarks_arguments: tuple = None):
+
+        if remarks_arguments is not None:
+            remarks = remarks.format(*remarks_arguments)
+        return tuple.__new__(cls, (result, remarks, email, header_key))
+
+    header_key = property(operator.itemgetter(3), doc="The header key that matched.")
@@ -0,0 +1,253 @@
+"""
+A cache of the mail server check of validate_email_async, shared by the processes of a host.
+
+Every Streamlit server process behind a load balancer looks up the mail servers of the same
+domains. Each lookup takes one or more round trips to the name server (milliseconds), so sharing
+the answers saves much more than it costs: a hit takes about 5 us, and a write about 25 us.
+
+Only work that expensive is worth sharing. Looking up the cache costs several times more than
+validating an email or extracting it from the headers (about 1 us and 5 us), so those results
+are not shared; session_cache and validate_email_cache cache them within a process. The verified
+identity assertions are not shared either: anyone who can write the file could then make every
+process accept an identity, whereas the answers shared here can at most make the check of a
+domain wrong.
+
+Example:
+    cache = shared_cache.SharedCache()
+    results, remarks = await validate_email_async.validate_emails_async(emails, cache=cache)
+"""
+
+import collections
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+from . import validate_email_async
+
+# Constants.
+#
+# The default database is in a directory of the current user in the temporary directory, so that
+# every process of the user that uses the default finds the same one, and no other user can read
+# or replace it.
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "extract_email_from_http_header-"
+                                 + str(os.geteuid() if hasattr(os, "geteuid") else "user"))
+DEFAULT_FILE_NAME = "shared_cache.sqlite3"
+DIRECTORY_MODE = 0o700
+FILE_MODE = 0o600
+DEFAULT_MAX_SIZE = validate_email_async.DEFAULT_CACHE_MAX_SIZE
+DEFAULT_TTL = validate_email_async.DEFAULT_TTL
+DEFAULT_NEGATIVE_TTL = validate_email_async.DEFAULT_NEGATIVE_TTL
+
+# How long to wait for another process that is writing, in seconds. The cache is used from the
+# event loop, and is only an optimization, so a lookup or a write that would wait longer is given
+# up instead. Setting up the database when it is opened is allowed to wait longer.
+DEFAULT_TIMEOUT = 0.05
+SETUP_TIMEOUT = 10.0
+
+# The expired and extra entries are removed every this many writes by a process, instead of on
+# every write, since counting the entries is not free.
+EVICTION_INTERVAL = 256
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS domains ("
+    "domain TEXT PRIMARY KEY, has_mail_server INTEGER NOT NULL, expires_at REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS domains_expires_at ON domains (expires_at)",
+)
+SELECT_DOMAIN = "SELECT has_mail_server FROM domains WHERE domain = ? AND expires_at > ?"
+INSERT_DOMAIN = "INSERT OR REPLACE INTO domains (domain, has_mail_server, expires_at) VALUES (?, ?, ?)"
+DELETE_EXPIRED_DOMAINS = "DELETE FROM domains WHERE expires_at <= ?"
+DELETE_OLDEST_DOMAINS = ("DELETE FROM domains WHERE domain IN "
+                         "(SELECT domain FROM domains ORDER BY expires_at LIMIT max(0, (SELECT count(*) FROM domains) - ?))")
+COUNT_DOMAINS = "SELECT count(*) FROM domains"
+DELETE_DOMAINS = "DELETE FROM domains"
+
+# Cache statistics of the current process, as returned by SharedCache.info().
+SharedCacheInfo = collections.namedtuple("SharedCacheInfo", ["hits", "misses", "errors", "max_size", "size"])
+
+
+class SharedCache:
+    """A cache of whether domains accept email, shared by every process of the host that opens
+    the same file. It can be given as the cache of validate_email_async.validate_emails_async(),
+    in place of a DomainCache.
+
+    The entries are kept in a SQLite database in WAL mode, in which readers never wait for the
+    writer. Every entry expires after ttl seconds (negative_ttl for the domains that do not accept
+    email), and the entries closest to their expiry are removed when there are more than max_size.
+    Every error of the database (such as a writer holding the lock for longer than the timeout) is
+    counted and treated as a cache miss, so the cache can never make a check fail.
+
+    The database file is created readable and writable by its owner only, and a file owned by
+    another user is refused, since whoever can write it decides the answers of every process.
+
+    It is safe to share between threads, and to use in a process forked after it was created.
+    """
+
+    def __init__(self, path: str | None = None, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL, timeout: float = DEFAULT_TIMEOUT):
+        """Open the cache, creating the database if needed.
+
+        Parameters
+        ----------
+        Args:
+            path (str | None, optional):
+                The path of the database file. Defaults to DEFAULT_FILE_NAME in DEFAULT_DIRECTORY, a
+                directory of the current user that is created with DIRECTORY_MODE.
+            max_size (int, optional):
+                The maximum number of domains. Defaults to DEFAULT_MAX_SIZE.
+            ttl (float, optional):
+                How long the answer for a domain with a mail server is kept, in seconds.
+            negative_ttl (float, optional):
+                How long the answer for a domain without a mail server is kept, in seconds.
+            timeout (float, optional):
+                How long to wait for another process that is writing, in seconds.
+
+        Raises:
+            PermissionError: If the database file, or the default directory, is owned by another
+            user, or if the default directory can be accessed by other users.
+        """
+
+        if max_size < 1:
+            raise ValueError("The maximum size of the cache must be at least 1.")
+        if path is None:
+            _make_private_directory(DEFAULT_DIRECTORY)
+            path = os.path.join(DEFAULT_DIRECTORY, DEFAULT_FILE_NAME)
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._writes = 0
+
+        # Create the database now, so that a wrong path fails here instead of on every lookup.
+        _open_private_file(path)
+        self._connection()
+
+    def get(self, domain: str):
+        """Return True or False if the answer for the domain is cached and has not expired, or
+        None otherwise."""
+
+        try:
+            row = self._connection().execute(SELECT_DOMAIN, (domain, time.time())).fetchone()
+        except sqlite3.Error:
+            self._count("_errors")
+            return None
+        if row is None:
+            self._count("_misses")
+            return None
+        self._count("_hits")
+        return bool(row[0])
+
+    def set(self, domain: str, has_mail_server: bool):
+        """Cache the answer for the domain, and evict entries if it is time to."""
+
+        ttl = self.ttl if has_mail_server else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % EVICTION_INTERVAL == 0
+        try:
+            self._connection().execute(INSERT_DOMAIN, (domain, int(has_mail_server), time.time() + ttl))
+            if should_evict:
+                self.evict()
+        except sqlite3.Error:
+            self._count("_errors")
+
+    def info(self) -> SharedCacheInfo:
+        """Return the statistics of the cache in the current process, and the number of domains
+        shared by every process."""
+
+        try:
+            size = self._connection().execute(COUNT_DOMAINS).fetchone()[0]
+        except sqlite3.Error:
+            self._count("_errors")
+            size = None
+        with self._lock:
+            return SharedCacheInfo(self._hits, self._misses, self._errors, self.max_size, size)
+
+    def clear(self):
+        """Remove every domain from the cache, for every process, and reset the statistics of the
+        current process."""
+
+        self._connection().execute(DELETE_DOMAINS)
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._errors = 0
+
+    def evict(self):
+        """Remove the expired domains, and then the domains closest to their expiry until there are
+        at most max_size. This runs on its own every EVICTION_INTERVAL writes."""
+
+        connection = self._connection()
+        connection.execute(DELETE_EXPIRED_DOMAINS, (time.time(),))
+        connection.execute(DELETE_OLDEST_DOMAINS, (self.max_size,))
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread, opening it if needed. A SQLite connection
+        cannot be used by another thread, or by a forked process."""
+
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        # Open the database in autocommit mode, since every statement is a transaction on its own.
+        # With WAL, "synchronous=NORMAL" does not sync on every commit, and cannot corrupt the
+        # database; the last writes may only be lost on a power failure, which a cache can afford.
+        # SQLite creates the WAL files with the permissions of the database file.
+        connection = sqlite3.connect(self.path, timeout=SETUP_TIMEOUT, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.execute("PRAGMA busy_timeout=" + str(int(self.timeout * 1000)))
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def _is_owned_by_current_user(status: os.stat_result) -> bool:
+    return not hasattr(os, "geteuid") or status.st_uid == os.geteuid()
+
+
+def _make_private_directory(path: str):
+    """Create the given directory, accessible by the current user only, or check that the existing
+    one is. Raise PermissionError if it is not."""
+
+    try:
+        os.mkdir(path, DIRECTORY_MODE)
+    except FileExistsError:
+        pass
+
+    # A symbolic link is not followed, since it may lead to a directory of another user.
+    status = os.lstat(path)
+    if (not stat.S_ISDIR(status.st_mode) or not _is_owned_by_current_user(status)
+            or (hasattr(os, "geteuid") and stat.S_IMODE(status.st_mode) & 0o077)):
+        raise PermissionError("The cache directory [" + path + "] is not a directory that only the current "
+                              "user can access.")
+
+
+def _open_private_file(path: str):
+    """Create the given file, readable and writable by the current user only, or check that the
+    existing one is owned by the current user. Raise PermissionError if it is not."""
+
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), FILE_MODE)
+    try:
+        status = os.fstat(descriptor)
+    finally:
+        os.close(descriptor)
+    if not stat.S_ISREG(status.st_mode) or not _is_owned_by_current_user(status):
+        raise PermissionError("The cache file [" + path + "] is not a file owned by the current user.")
@@ -1,19 +1,33 @@
 import typing
+from enum import IntEnum
+
 import streamlit
 
+from . import canonicalize_email
+from . import domain_allowlist
 from . import extract_email_from_headers
+from . import output
+from . import session_cache
 from . import validate_email
+from . import validate_email_cache
 
 # Constants.
 EMPTY_STRING = ""
 STRING_UNDEFINED = "undefined"
 
-# Result codes.
-RESULT_UNDEFINED = 0
-RESULT_SUCCESS = 1
-RESULT_FAIL = 2
-RESULT_FAIL_VALIDATION_INPUT_IS_NOT_VALID_EMAIL = 3
-RESULT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE = 4
+# Result codes. They are members of an IntEnum, as in validate_email.
+class Result(IntEnum):
+    UNDEFINED = 0
+    SUCCESS = 1
+    FAIL = 2
+    FAIL_VALIDATION_INPUT_IS_NOT_VALID_EMAIL = 3
+    FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE = 4
+
+RESULT_UNDEFINED = Result.UNDEFINED
+RESULT_SUCCESS = Result.SUCCESS
+RESULT_FAIL = Result.FAIL
+RESULT_FAIL_VALIDATION_INPUT_IS_NOT_VALID_EMAIL = Result.FAIL_VALIDATION_INPUT_IS_NOT_VALID_EMAIL
+RESULT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE = Result.FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE
 
 # Remarks.
 REMARKS_UNDEFINED = ""
@@ -22,6 +36,11 @@ REMARKS_FAIL = "Fail."
 REMARKS_FAIL_VALIDATION_INPUT_IS_NOT_VALID_EMAIL = "Fail at validation. The given input is not a valid email address."
 REMARKS_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE = "Fail at validation. The given input does not end with the specified value."
 
+# The remarks for an input that does not end with the specified value. They are formatted with 
+# the input and the specified value.
+REMARKS_FORMAT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE = REMARKS_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE + \
+    " Input [{0}], specified value for email to end with [{1}]"
+
 # Output index.
 OUTPUT_INDEX_RESULT = 0
 OUTPUT_INDEX_REMARKS = 1
@@ -47,10 +66,13 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
                                  disabled: bool = False,
                                  label_visibility: typing.Literal["visible",
                                                                   "hidden", "collapsed"] = "visible",
-                                 header_key: str = extract_email_from_headers.EMAIL_HEADER,
+                                 header_key: str | list | tuple = extract_email_from_headers.EMAIL_HEADER,
                                  set_email_on_failure: str | None = None,
                                  should_validate_email: bool = True,
-                                 email_ends_with: str | None = None) -> str | None:
+                                 email_ends_with: str | domain_allowlist.DomainAllowlist | None = None,
+                                 use_session_cache: bool = False,
+                                 use_validation_cache: bool = False,
+                                 canonicalizer: canonicalize_email.Canonicalizer | None = None) -> str | None:
     """A wrapper function that enhances the Streamlit.text_input function. 
 
     Optional functions invoked inside this wrapper function is 
@@ -135,13 +157,25 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
             "visible". Defaults to "visible".
         header_key (str, optional): 
             The key in the header of the http requests that is associated with the user's email address. Defaults to EMAIL_HEADER.
+            A list or a tuple of keys, in order of priority, can also be supplied. The keys are then compared without regard to case.
         set_email_on_failure (_type_, optional): 
             An optional string to use as the email in the event when the email extraction failes, or when validation fails. Defaults to None.
         should_validate_email (bool, optional): 
             Whether to validate the email. Defaults to True.
         email_ends_with (_type_, optional): 
             Optional string that will be used to check if the email ends with this given string. If None is supplied, then this check will not 
-            happen. Defaults to None.
+            happen. A DomainAllowlist can also be supplied, to check the domain of the email against it. Defaults to None.
+        use_session_cache (bool, optional): 
+            Whether to cache the result of the email extraction in the session_state, so that a rerun of the same session 
+            does not read the headers again. See session_cache. Defaults to False.
+        use_validation_cache (bool, optional): 
+            Whether to take the result of the email validation from the cache shared by every session of the process, so that 
+            the emails that the sessions enter again and again are only validated once. See validate_email_cache. Defaults to False.
+        canonicalizer (Canonicalizer | None, optional): 
+            If supplied, then the extracted email and the entered email are replaced by their canonical form in the 
+            output once they are valid. They are validated as entered. The canonical emails are interned, so that 
+            the sessions of the same user share one string. The value of the widget itself is left as entered. See 
+            canonicalize_email. Defaults to None.
 
     Returns
     -------
@@ -152,6 +186,7 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
     # Initialize the return values.
     result = RESULT_UNDEFINED
     remarks = REMARKS_UNDEFINED
+    remarks_arguments = None
     email = STRING_UNDEFINED
     text_input = EMPTY_STRING
 
@@ -173,8 +208,14 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
         # Note: 
         # We set the session_state_key to \"None\" because we do not want the extraction code 
         # to interfere with the session_state key used for the streamlit widget. 
-        results_extract_email_from_headers = extract_email_from_headers.extract_email_from_headers(
-            session_state, header_key=header_key, session_state_key=None, set_email_on_failure=set_email_on_failure)
+        if use_session_cache:
+            results_extract_email_from_headers = session_cache.cached_extract_email_from_headers(
+                session_state, header_key=header_key, session_state_key=None, set_email_on_failure=set_email_on_failure,
+                canonicalizer=canonicalizer)
+        else:
+            results_extract_email_from_headers = extract_email_from_headers.extract_email_from_headers(
+                session_state, header_key=header_key, session_state_key=None, set_email_on_failure=set_email_on_failure,
+                canonicalizer=canonicalizer)
 
         # Check the result of the email extraction.
         if results_extract_email_from_headers[extract_email_from_headers.OUTPUT_INDEX_RESULT] is extract_email_from_headers.RESULT_SUCCESS:
@@ -242,7 +283,9 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
                                           disabled=disabled,
                                           label_visibility=label_visibility)
 
-    # Assign the text_input as the email.
+    # Assign the text_input as the email. It is validated as it was entered, and only replaced by 
+    # its canonical form, which is interned, once it is valid, since most of the values of the 
+    # widget are emails being typed. 
     email = text_input
 
     # We will do validation checks if necessary. We do this here because this is
@@ -250,8 +293,12 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
     if should_validate_email:
 
         # We should validate the email.
-        result_validate_email = validate_email.validate_email(
-            email=email, ends_with=email_ends_with)
+        if use_validation_cache:
+            result_validate_email = validate_email_cache.validate_email_cached(
+                email=email, ends_with=email_ends_with)
+        else:
+            result_validate_email = validate_email.validate_email(
+                email=email, ends_with=email_ends_with)
 
         # Check the validation result.
         if result_validate_email[validate_email.OUTPUT_INDEX_RESULT] is validate_email.RESULT_SUCCESS:
@@ -259,6 +306,8 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
             # Validation is successful.
             result = RESULT_SUCCESS
             remarks = REMARKS_SUCCESS
+            if canonicalizer is not None:
+                email = canonicalizer.canonicalize(email)
 
         elif result_validate_email[validate_email.OUTPUT_INDEX_RESULT] is validate_email.REMARKS_FAILED_VALIDATION:
 
@@ -270,9 +319,8 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
 
             # Validation is not successful.
             result = RESULT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE
-            remarks = REMARKS_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE + \
-                str(" Input [") + str(email) + str("], specified value for email to end with [") + \
-                str(email_ends_with) + str("]")
+            remarks = REMARKS_FORMAT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE
+            remarks_arguments = (email, email_ends_with)
 
         else:
 
@@ -285,10 +333,28 @@ def streamlit_helper_email_input(session_state=streamlit.session_state,
         # No need to validate the email.
         pass
 
-    # Associate the output with the non-widget session state key
+    # Associate the output with the non-widget session state key. It unpacks and indexes as 
+    # [result, remarks, email].
+    #
+    # Note:
+    # On a rerun, the output is usually the same as the one already stored, so that one is kept 
+    # instead of building and storing a new one.
     if session_state_key_function_output is not None:
-        session_state[session_state_key_function_output] = [
-            result, remarks, email]
+        previous_output = session_state.get(session_state_key_function_output)
+        if not _is_same_output(previous_output, result, remarks, email, remarks_arguments):
+            session_state[session_state_key_function_output] = output.EmailOutput(
+                result, remarks, email, remarks_arguments)
 
     # Return the result.
     return text_input
+
+
+# Check if the given output holds the given values, without formatting the remarks. Remarks that
+# must be formatted are taken as different.
+def _is_same_output(previous_output, result, remarks, email, remarks_arguments):
+
+    return (type(previous_output) is output.EmailOutput
+            and remarks_arguments is None
+            and previous_output[0] is result
+            and previous_output[1] is remarks
+            and previous_output[2] == email)
@@ -0,0 +1,278 @@
+import typing
+from array import array
+
+import streamlit
+
+from . import domain_allowlist
+from . import extract_email_from_headers
+from . import session_cache
+from . import validate_email
+
+# Constants.
+EMPTY_STRING = ""
+
+# The entries of the text are separated by commas, semicolons, or any whitespace (including
+# newlines), so that lists pasted from spreadsheets and mail clients work as they are. None of
+# these characters can be part of a valid email.
+#
+# Note:
+# The commas and semicolons are replaced by spaces and the text is then split with str.split(),
+# which is several times faster than finding the entries with a regular expression.
+SEPARATORS = ",;"
+
+# The results of the emails that are no longer in the text are kept, in case they are entered
+# again, until there are this many of them plus twice the number of emails in the text.
+MIN_RESULTS_KEPT = 1024
+
+# The key of the entries of the cache of the session (see session_cache) used by this widget.
+# The key of the widget is appended, so that several widgets do not share their entries.
+CACHE_KEY_MULTI_EMAIL_INPUT = "multi_email_input"
+
+# Index of the parts of an entry of the cache. The results map every email entered since the
+# inputs last changed to its result code.
+ENTRY_INDEX_INPUTS = 0
+ENTRY_INDEX_TEXT = 1
+ENTRY_INDEX_RESULTS = 2
+ENTRY_INDEX_OUTPUT = 3
+
+# Output index.
+OUTPUT_INDEX_EMAILS = 0
+OUTPUT_INDEX_RESULTS = 1
+
+
+def streamlit_helper_multi_email_input(session_state=streamlit.session_state,
+                                       container: streamlit.container = None,
+                                       label: str = EMPTY_STRING,
+                                       value: str = EMPTY_STRING,
+                                       height: int | None = None,
+                                       max_chars: int | None = None,
+                                       session_state_key: str | int | None = None,
+                                       session_state_key_function_output: str | None = None,
+                                       help: str | None = None,
+                                       on_change=None,
+                                       args=None,
+                                       kwargs=None,
+                                       *,
+                                       placeholder: str | None = None,
+                                       disabled: bool = False,
+                                       label_visibility: typing.Literal["visible",
+                                                                        "hidden", "collapsed"] = "visible",
+                                       header_key: str | list | tuple = extract_email_from_headers.EMAIL_HEADER,
+                                       set_email_on_failure: str | None = None,
+                                       should_validate_email: bool = True,
+                                       email_ends_with: str | domain_allowlist.DomainAllowlist | None = None,
+                                       engine: str = validate_email.ENGINE_SCANNER,
+                                       use_session_cache: bool = False):
+    """A wrapper function around Streamlit.text_area for entering many emails at once, such as the
+    recipients of a sharing dialog.
+
+    The emails are separated by commas, semicolons, spaces or newlines. On the first run, the email
+    extracted from the http header is used as the first entry. Only the emails that were not
+    entered before are validated. If the text did not change, the previous emails are returned
+    without splitting the text again, and if text was only added at or removed from its end, only
+    the changed part is split and validated.
+
+    Note:
+    The cost of a rerun still grows with the length of the text, though slowly: comparing the text
+    to the previous one, and copying the emails and their result codes, take time proportional to
+    them. A rerun after typing takes about 10 us with 10 emails, and about 35 us with 1000.
+
+    Parameters
+    ----------
+    Args:
+        session_state (SessionStateProxy, optional):
+            Streamlit's session state. Defaults to streamlit.session_state.
+        container (streamlit.container, optional):
+            The streamlit container to insert the component into. If value is None, then this will insert the
+            component into wherever it this function is invoked. Defaults to None.
+        label, value, height, max_chars, help, on_change, args, kwargs, placeholder, disabled, label_visibility:
+            Passed on to Streamlit.text_area. See its documentation.
+        session_state_key (str | int | None, optional):
+            An optional string or integer to use as the unique key for the widget. The entries validated on
+            the previous run are remembered per key. Defaults to None.
+        session_state_key_function_output (str, optional):
+            An optional string or integer to use as unique key to store the output of this function.
+            Defaults to None.
+        header_key (str | list | tuple, optional):
+            The key, or the keys in order of priority, in the http header that is associated with the email.
+            Defaults to \"X-Email\".
+        set_email_on_failure (str | None, optional):
+            The email to use as the first entry if no email is found in the http header. Defaults to None.
+        should_validate_email (bool, optional):
+            Whether to validate the emails. If False, every result code is validate_email.RESULT_UNDEFINED.
+            Defaults to True.
+        email_ends_with (str | DomainAllowlist | None, optional):
+            Optional suffix that every email must end with, or allowlist of domains. Defaults to None.
+        engine (str, optional):
+            The engine used to check the syntax of the emails. The text comes from the user, so this
+            defaults to the linear time validate_email.ENGINE_SCANNER.
+        use_session_cache (bool, optional):
+            Whether to cache the result of the email extraction in the session_state. Defaults to False.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing the Tuple of the entered emails, in order, and an array of the result
+        codes of validate_email (one per email). The array is a copy, which the caller may modify.
+    """
+
+    # Get the value of the widget on the first run from the http header.
+    if session_state_key not in session_state:
+
+        # Extract the email from the header.
+        #
+        # Note:
+        # We set the session_state_key to \"None\" because we do not want the extraction code
+        # to interfere with the session_state key used for the streamlit widget.
+        if use_session_cache:
+            results_extract_email_from_headers = session_cache.cached_extract_email_from_headers(
+                session_state, header_key=header_key, session_state_key=None, set_email_on_failure=set_email_on_failure)
+        else:
+            results_extract_email_from_headers = extract_email_from_headers.extract_email_from_headers(
+                session_state, header_key=header_key, session_state_key=None, set_email_on_failure=set_email_on_failure)
+
+        # Use the extracted email as the first entry, before the given value.
+        email = results_extract_email_from_headers[extract_email_from_headers.OUTPUT_INDEX_EMAIL]
+        if (results_extract_email_from_headers[extract_email_from_headers.OUTPUT_INDEX_RESULT]
+                == extract_email_from_headers.RESULT_SUCCESS or isinstance(set_email_on_failure, str)):
+            value = email + "\n" + value if value else email
+
+    # Invoke the Streamlit method using the given parameters.
+    widget = container if container is not None else streamlit
+    text = widget.text_area(label=label,
+                            value=value,
+                            height=height,
+                            max_chars=max_chars,
+                            key=session_state_key,
+                            help=help,
+                            on_change=on_change,
+                            args=args,
+                            kwargs=kwargs,
+                            placeholder=placeholder,
+                            disabled=disabled,
+                            label_visibility=label_visibility)
+
+    # Split and validate the text.
+    output = validate_text(session_state, text, session_state_key=session_state_key,
+                           should_validate_email=should_validate_email, ends_with=email_ends_with, engine=engine)
+
+    # Associate the output with the non-widget session state key.
+    if session_state_key_function_output is not None:
+        session_state[session_state_key_function_output] = output
+
+    # Return the result.
+    return output
+
+
+def parse_emails(text: str | None) -> list:
+    """Split the given text into its entries. Empty entries are dropped."""
+
+    if not text:
+        return []
+    for separator in SEPARATORS:
+        text = text.replace(separator, " ")
+    return text.split()
+
+
+def validate_text(session_state, text: str | None, session_state_key=None, should_validate_email: bool = True,
+                  ends_with: str | domain_allowlist.DomainAllowlist = None,
+                  engine: str = validate_email.ENGINE_SCANNER):
+    """Split the given text into emails and validate them, reusing the results of the previous call
+    with the same key in the same session.
+
+    Parameters
+    ----------
+    Args:
+        session_state (SessionStateProxy):
+            Streamlit's session state, which holds the results of the previous call.
+        text (str | None):
+            The text holding the emails.
+        session_state_key (str | int | None, optional):
+            The key of the widget the text comes from. Defaults to None.
+        should_validate_email (bool, optional):
+            Whether to validate the emails. Defaults to True.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that every email must end with, or allowlist of domains. Defaults to None.
+        engine (str, optional):
+            The engine used to check the syntax of the emails. Defaults to validate_email.ENGINE_SCANNER.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing the Tuple of the emails, and an array of their result codes. The
+        emails and the result codes are kept for the next call, so the array is a copy, which the
+        caller may modify.
+    """
+
+    # Get the entry of the previous call. It only holds if it was made with the same arguments.
+    cache = session_cache.get_cache(session_state)
+    cache_key = (CACHE_KEY_MULTI_EMAIL_INPUT, session_state_key)
+    inputs = (should_validate_email, ends_with,
+              ends_with.version if isinstance(ends_with, domain_allowlist.DomainAllowlist) else None, engine)
+    entry = cache.get(cache_key)
+    if entry is not None and not session_cache.same_inputs(entry[ENTRY_INDEX_INPUTS], inputs):
+        entry = None
+
+    # The text did not change. This is the case for every rerun that is not caused by this widget.
+    if entry is not None and entry[ENTRY_INDEX_TEXT] == text:
+        emails, results = entry[ENTRY_INDEX_OUTPUT]
+        return emails, results[:]
+
+    # Split the text. If text was only added at or removed from the end of the previous text, as
+    # when typing, then only the changed part is split, together with the last entry of the text
+    # they have in common, which the change may extend or shorten. Otherwise the whole text is split.
+    results_by_email = entry[ENTRY_INDEX_RESULTS] if entry is not None else {}
+    previous_text = entry[ENTRY_INDEX_TEXT] if entry is not None else None
+    if previous_text and text and (text.startswith(previous_text) or previous_text.startswith(text)):
+        previous_emails, previous_results = entry[ENTRY_INDEX_OUTPUT]
+        common_text = text if len(text) < len(previous_text) else previous_text
+        last_segment = _last_segment(common_text)
+        kept = len(previous_emails) - len(parse_emails(last_segment + previous_text[len(common_text):]))
+        added_emails = parse_emails(last_segment + text[len(common_text):])
+        emails = previous_emails[:kept] + tuple(added_emails)
+        results = previous_results[:kept] + _validate_new_emails(added_emails, results_by_email, should_validate_email,
+                                                                 ends_with, engine)
+    else:
+        emails = tuple(parse_emails(text))
+        results = _validate_new_emails(emails, results_by_email, should_validate_email, ends_with, engine)
+
+    # Forget the results of the emails that are no longer in the text, once there are too many.
+    if len(results_by_email) > MIN_RESULTS_KEPT + 2 * len(emails):
+        results_by_email = {email: results_by_email[email] for email in emails}
+
+    # Keep the output for the next call. The emails are a Tuple, so they can be shared with the
+    # caller, but the result codes are copied.
+    cache[cache_key] = (inputs, text, results_by_email, (emails, results))
+    return emails, results[:]
+
+
+def _validate_new_emails(emails, results_by_email: dict, should_validate_email: bool, ends_with, engine: str):
+    """Validate the given emails that are not in the given results yet, add their results, and
+    return the array of the result codes of all the given emails.
+
+    Note:
+    Every step runs in C (the dictionary and set operations, and the map), except the validation of
+    the new emails, so the cost per email that was already validated is very small.
+    """
+
+    new_emails = list(dict.fromkeys(emails).keys() - results_by_email.keys())
+    if new_emails:
+        if should_validate_email:
+            new_results, _ = validate_email.validate_emails(new_emails, ends_with=ends_with, engine=engine)
+        else:
+            new_results = [validate_email.RESULT_UNDEFINED] * len(new_emails)
+        results_by_email.update(zip(new_emails, new_results))
+    return array(validate_email.RESULT_ARRAY_TYPECODE, map(results_by_email.__getitem__, emails))
+
+
+def _last_segment(text: str) -> str:
+    """Return the part of the given text after its last separator of entries, as parse_emails()
+    splits them. Only the end of the text is scanned."""
+
+    last = text[-1]
+    if last in SEPARATORS or last.isspace():
+        return EMPTY_STRING
+    segment = text.rsplit(None, 1)[-1]
+    for separator in SEPARATORS:
+        segment = segment.rpartition(separator)[2]
+    return segment
@@ -1,15 +1,80 @@
 import re
+from array import array
+from collections.abc import Sequence
+from enum import IntEnum
+from functools import partial
+from operator import is_not, methodcaller
+
+from . import canonicalize_email
+from . import domain_allowlist
+from . import domain_denylist
+from . import email_scanner
+from . import output
 
 # Constants.
 # Remember that in Python, the hyphen "-" needs to be escaped too. 
 REGULAR_EXPRESSION = r"^[\w\-\.]+@([\w\-]+\.)+[\w\-]{2,4}$" 
 
+# The regular expression compiled once at import time, so that the batch validation does
+# not have to go through the cache of the re module for every address.
+COMPILED_REGULAR_EXPRESSION = re.compile(REGULAR_EXPRESSION)
+
+# Type code of the array holding the result codes returned by the batch validation. A
+# signed char is enough to hold every result code.
+RESULT_ARRAY_TYPECODE = "b"
+
+# Engines.
+#
+# ENGINE_REGULAR_EXPRESSION uses REGULAR_EXPRESSION. ENGINE_SCANNER uses the linear time 
+# scanner, which accepts exactly the same emails. ENGINE_SCANNER_STRICT uses the linear time 
+# scanner and also enforces the length limits of the RFCs. The scanners are recommended when 
+# the email comes from an untrusted source, such as a header sent by the client.
+ENGINE_REGULAR_EXPRESSION = "regular_expression"
+ENGINE_SCANNER = "scanner"
+ENGINE_SCANNER_STRICT = "scanner_strict"
+MATCHERS = {
+    ENGINE_REGULAR_EXPRESSION: COMPILED_REGULAR_EXPRESSION.match,
+    ENGINE_SCANNER: partial(email_scanner.match_email, mode=email_scanner.MODE_REGEX_COMPATIBLE),
+    ENGINE_SCANNER_STRICT: partial(email_scanner.match_email, mode=email_scanner.MODE_STRICT),
+}
+
 # Result codes.
-RESULT_UNDEFINED = 0
-RESULT_SUCCESS = 1
-RESULT_FAILED_VALIDATION = 2
-RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = 3
-RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = 4
+#
+# Note:
+# The codes are members of an IntEnum, so they are integers and compare equal to the plain 
+# integer codes. The output of validate_email() holds these same members, so comparing its 
+# result code with "is" keeps working.
+#
+# This is also the result codes of the modules that both extract and validate the email outside 
+# of Streamlit (middleware and extract_email_from_raw_headers) and of the mail server check of 
+# validate_email_async, so that a code means the same thing in every one of them, and in 
+# the metrics of instrumentation. A new code is added here, with a value that is not used yet.
+class Result(IntEnum):
+    UNDEFINED = 0
+    SUCCESS = 1
+    FAILED_VALIDATION = 2
+    EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = 3
+    GIVEN_EMAIL_END_WITH_IS_NOT_STRING = 4
+    DOMAIN_HAS_NO_MAIL_SERVER = 5
+    DOMAIN_LOOKUP_FAILED = 6
+    EMAIL_IS_DENYLISTED = 7
+    NO_EMAIL_HEADER_IN_REQUEST = 8
+    CONFLICTING_EMAIL_HEADERS_IN_REQUEST = 9
+    GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = 10
+    GIVEN_HEADERS_ARE_NOT_BYTES = 11
+
+RESULT_UNDEFINED = Result.UNDEFINED
+RESULT_SUCCESS = Result.SUCCESS
+RESULT_FAILED_VALIDATION = Result.FAILED_VALIDATION
+RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = Result.EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = Result.GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+RESULT_DOMAIN_HAS_NO_MAIL_SERVER = Result.DOMAIN_HAS_NO_MAIL_SERVER
+RESULT_DOMAIN_LOOKUP_FAILED = Result.DOMAIN_LOOKUP_FAILED
+RESULT_EMAIL_IS_DENYLISTED = Result.EMAIL_IS_DENYLISTED
+RESULT_NO_EMAIL_HEADER_IN_REQUEST = Result.NO_EMAIL_HEADER_IN_REQUEST
+RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST = Result.CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING = Result.GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+RESULT_GIVEN_HEADERS_ARE_NOT_BYTES = Result.GIVEN_HEADERS_ARE_NOT_BYTES
 
 # Remarks.
 REMARKS_UNDEFINED = ""
@@ -17,31 +82,74 @@ REMARKS_SUCCESS = "Success."
 REMARKS_FAILED_VALIDATION = "Email failed the validation checks."
 REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE = "Email does not end with the specified value."
 REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = "The given argument to check if the email ends with a suffix is not an instance of a String. Unable to validate."
+REMARKS_EMAIL_IS_DENYLISTED = "Email or its domain is in the denylist."
+
+# The remarks for an email that does not end with the given suffix. They are formatted with the 
+# email and the suffix.
+REMARKS_FORMAT_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE = REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE + " [{0}] does not end with [{1}]"
+
+# The outputs that do not depend on the email. They are built once, and shared by every call.
+OUTPUT_UNDEFINED = output.Output(RESULT_UNDEFINED, REMARKS_UNDEFINED)
+OUTPUT_SUCCESS = output.Output(RESULT_SUCCESS, REMARKS_SUCCESS)
+OUTPUT_FAILED_VALIDATION = output.Output(RESULT_FAILED_VALIDATION, REMARKS_FAILED_VALIDATION)
+OUTPUT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = output.Output(RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING, 
+                                                          REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING)
+OUTPUT_EMAIL_IS_DENYLISTED = output.Output(RESULT_EMAIL_IS_DENYLISTED, REMARKS_EMAIL_IS_DENYLISTED)
 
 # Output index.
 OUTPUT_INDEX_RESULT = 0
 OUTPUT_INDEX_REMARKS = 1
 
-# Check if the email is valid. 
-def validate_email(email : str, ends_with : str = None):
+# Get the function used to check the syntax of an email for the given engine. The function
+# returns a truthy value if the email has a valid syntax.
+def get_matcher(engine : str = ENGINE_REGULAR_EXPRESSION):
+
+    matcher = MATCHERS.get(engine)
+    if matcher is None:
+        raise ValueError("Unknown engine [" + str(engine) + "].")
+    return matcher
+
+# Get the function used to check if an email ends with the given suffix, or with one of the 
+# domains of the given allowlist. Returns None if the given suffix cannot be used.
+def get_ends_with_matcher(ends_with):
+
+    if isinstance(ends_with, str):
+        return methodcaller("endswith", ends_with)
+    if isinstance(ends_with, domain_allowlist.DomainAllowlist):
+        return ends_with.matches
+    return None
+
+# Check if the email is valid. The output unpacks and indexes as a Tuple of the result code 
+# and the remarks. If a denylist is given, the emails that pass every other check are also 
+# looked up in it. If a canonicalizer is given, the email is validated as it is given, and its 
+# canonical form is then checked against the suffix and the denylist (see canonicalize_email).
+def validate_email(email : str, ends_with : str | domain_allowlist.DomainAllowlist = None, engine : str = ENGINE_REGULAR_EXPRESSION, 
+                   denylist : domain_denylist.DomainDenylist = None, 
+                   canonicalizer : canonicalize_email.Canonicalizer = None):
+
+    # Initialize the return value.
+    validation_output = OUTPUT_UNDEFINED
 
-    # Initialize the return values.
-    result = RESULT_UNDEFINED
-    remarks = REMARKS_UNDEFINED
-    
     # Use regular expression to check. 
     # 
     # Note: 
     # This is a basic check. It does not validate if the email is deliverable, or 
     # any other considerations such as if it is a trash email etc. 
-    match = re.match(REGULAR_EXPRESSION, email)
+    match = get_matcher(engine)(email)
     
     # Check if there is a match.
     if bool(match):
 
         # Set the result. 
-        result = RESULT_SUCCESS
-        remarks = REMARKS_SUCCESS
+        validation_output = OUTPUT_SUCCESS
+
+        # Canonicalize the valid email, so that "Alice@Corp.COM" is checked against the suffix 
+        # and the denylist as "Alice@corp.com". The domain part of the suffix is canonicalized 
+        # too, so that the canonicalization does not change which emails end with it. 
+        if canonicalizer is not None: 
+            email = canonicalizer.canonicalize(email)
+            if isinstance(ends_with, str): 
+                ends_with = canonicalize_email.canonicalize_suffix(ends_with)
 
         # The email matches the regular expression.
         # Check if there is a specified suffix to validate. 
@@ -56,27 +164,174 @@ def validate_email(email : str, ends_with : str = None):
                 if bool(email.endswith(ends_with)):
 
                     # The given email ends with the specified suffix. 
-                    result = RESULT_SUCCESS 
-                    remarks = REMARKS_SUCCESS
+                    validation_output = OUTPUT_SUCCESS
 
                 else:
 
                     # The given email does not end with the specified suffix. 
-                    result = RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
-                    remarks = REMARKS_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE + " [" + email + "] does not end with [" + ends_with + "]"
+                    validation_output = output.Output(RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE, 
+                                                      REMARKS_FORMAT_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE, 
+                                                      (email, ends_with))
+
+            elif isinstance(ends_with, domain_allowlist.DomainAllowlist):
+
+                # The specified suffix is an allowlist of domains. Check the domain of the 
+                # given email against it. 
+                if ends_with.matches(email):
+
+                    # The domain of the given email is in the allowlist. 
+                    validation_output = OUTPUT_SUCCESS
+
+                else:
+
+                    # The domain of the given email is not in the allowlist. 
+                    validation_output = output.Output(RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE, 
+                                                      REMARKS_FORMAT_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE, 
+                                                      (email, ends_with))
             
             else:
 
                 # The given arugment for checking if the email ends with a certain suffix is 
                 # itself not an instance of a String. We are unable to use this. 
-                result = RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
-                remarks = REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+                validation_output = OUTPUT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
 
     else: 
 
         # The email does not match the regular expression. 
-        result = RESULT_FAILED_VALIDATION
-        remarks = REMARKS_FAILED_VALIDATION
+        validation_output = OUTPUT_FAILED_VALIDATION
+
+    # Check if the valid email, or its domain, is denied. 
+    if denylist is not None and validation_output is OUTPUT_SUCCESS and denylist.matches(email): 
+        validation_output = OUTPUT_EMAIL_IS_DENYLISTED
+
+    # Return the result. It unpacks as the result code and the remarks.
+    return validation_output
+
+
+# Check if each email in the given iterable is valid.
+def validate_emails(emails, ends_with : str | domain_allowlist.DomainAllowlist = None, 
+                    include_remarks : bool = False, engine : str = ENGINE_REGULAR_EXPRESSION, 
+                    denylist : domain_denylist.DomainDenylist = None, 
+                    canonicalizer : canonicalize_email.Canonicalizer = None):
+    """Validate many emails in one call.
+
+    This gives the same result codes as calling validate_email() on every email, but the 
+    regular expression is only looked up once, no output is built per email, and the remarks 
+    are only built when asked for.
+
+    Note:
+    Matching the emails is most of the cost, so this is only about 1.5 to 2 times faster than 
+    calling validate_email() in a loop (about 0.8 us against 1.3 us per email with a suffix, on 
+    the benchmark suite). Joining the emails and matching them in a single pass was measured and 
+    is no faster. With ENGINE_SCANNER the scanner runs in Python, and a batch is about 2 times 
+    slower than with ENGINE_REGULAR_EXPRESSION; use it for untrusted input, not for speed.
+
+    Parameters
+    ----------
+    Args:
+        emails (Iterable[str]): 
+            The emails to validate.
+        ends_with (str | DomainAllowlist, optional): 
+            Optional suffix that every email must end with, or allowlist of domains. Defaults to None.
+        include_remarks (bool, optional): 
+            Whether to build the remarks for the emails that failed the validation. Defaults to False.
+        engine (str, optional): 
+            The engine used to check the syntax of the emails. Defaults to ENGINE_REGULAR_EXPRESSION.
+        denylist (DomainDenylist, optional): 
+            Optional denylist of domains and addresses that the valid emails are looked up in. 
+            Defaults to None.
+        canonicalizer (Canonicalizer, optional): 
+            Optional canonicalizer that the valid emails are canonicalized with before they are checked 
+            against the suffix and the denylist. The emails are validated as they are given. The 
+            remarks then hold the canonical emails. Defaults to None.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing an array of result codes (one per email, in the given order), and a 
+        dictionary mapping the position of every failed email to its remarks. The dictionary is empty 
+        if include_remarks is False.
+    """
+
+    # Initialize the return values.
+    results = array(RESULT_ARRAY_TYPECODE)
+    remarks = {}
+
+    # Validate the emails as they are given, and canonicalize the valid ones, which are then 
+    # checked against the suffix and the denylist. The invalid ones are replaced by None, which 
+    # the loops below take as invalid. 
+    match = get_matcher(engine)
+    if canonicalizer is not None: 
+        canonicalize = canonicalizer.canonicalize
+        emails = [canonicalize(email) if match(email) else None for email in emails]
+        match = partial(is_not, None)
+        if isinstance(ends_with, str): 
+            ends_with = canonicalize_email.canonicalize_suffix(ends_with)
+
+    # The emails are needed a second time to look them up in the denylist or to build the 
+    # remarks, so a one-shot iterable (such as a generator) has to be kept around in this case.
+    if (include_remarks or denylist is not None) and not isinstance(emails, Sequence):
+        emails = list(emails)
+
+    # Work out once what the result is for an email that matches the regular expression,
+    # instead of checking the given suffix for every email.
+    ends_with_matches = get_ends_with_matcher(ends_with)
+    if ends_with is None:
+        result_on_match = RESULT_SUCCESS
+    elif ends_with_matches is not None:
+        result_on_match = None
+    else:
+        result_on_match = RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+
+    # Bind the methods to local names to keep the loop tight.
+    append = results.append
+
+    # Validate the emails.
+    if result_on_match is not None:
+
+        # The result does not depend on the suffix.
+        for email in emails:
+            append(result_on_match if match(email) else RESULT_FAILED_VALIDATION)
+
+    else:
+
+        # The result depends on the suffix.
+        for email in emails:
+            if not match(email):
+                append(RESULT_FAILED_VALIDATION)
+            elif ends_with_matches(email):
+                append(RESULT_SUCCESS)
+            else:
+                append(RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE)
+
+    # Look up the valid emails in the denylist.
+    if denylist is not None:
+        denylist_matches = denylist.matches
+        for index, result in enumerate(results):
+            if result == RESULT_SUCCESS and denylist_matches(emails[index]):
+                results[index] = RESULT_EMAIL_IS_DENYLISTED
+
+    # Build the remarks for the failures only if the caller asks for them.
+    if include_remarks:
+        for index, result in enumerate(results):
+            if result != RESULT_SUCCESS:
+                remarks[index] = _remarks_for_result(result, emails[index], ends_with)
 
     # Return the result.
-    return result, remarks
\ No newline at end of file
+    return results, remarks
+
+
+# Build the remarks for the given result code, exactly as validate_email() does.
+def _remarks_for_result(result : int, email : str, ends_with : str = None):
+
+    if result == RESULT_SUCCESS:
+        return REMARKS_SUCCESS
+    if result == RESULT_FAILED_VALIDATION:
+        return REMARKS_FAILED_VALIDATION
+    if result == RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE:
+        return REMARKS_FORMAT_EMAIL_DOES_NOT_END_WITH_SPECIFIED_VALUE.format(email, ends_with)
+    if result == RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING:
+        return REMARKS_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+    if result == RESULT_EMAIL_IS_DENYLISTED:
+        return REMARKS_EMAIL_IS_DENYLISTED
+    return REMARKS_UNDEFINED
@@ -0,0 +1,352 @@
+import asyncio
+import collections
+import threading
+import time
+
+from . import domain_allowlist
+from . import validate_email
+
+# Optional dependency. dnspython is only needed by DNSPythonResolver, the default resolver. Any
+# other resolver can be used without it. It takes longer to import than the rest of the package,
+# so it is only imported when a DNSPythonResolver is created.
+dns = None
+
+# Constants.
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CACHE_MAX_SIZE = 65536
+
+# How long the answer for a domain is kept, in seconds. A domain without a mail server is kept
+# for less time than a domain with one, so that a newly set up domain is not rejected for long.
+DEFAULT_TTL = 3600.0
+DEFAULT_NEGATIVE_TTL = 300.0
+
+# The exchange of a "null MX" record, which states that the domain does not accept email
+# (RFC 7505).
+NULL_MX_EXCHANGE = "."
+
+# Result codes. They are the members of validate_email.Result, which holds the codes of the mail
+# server check too.
+RESULT_UNDEFINED = validate_email.RESULT_UNDEFINED
+RESULT_SUCCESS = validate_email.RESULT_SUCCESS
+RESULT_FAILED_VALIDATION = validate_email.RESULT_FAILED_VALIDATION
+RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE = validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING = validate_email.RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+RESULT_DOMAIN_HAS_NO_MAIL_SERVER = validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER
+RESULT_DOMAIN_LOOKUP_FAILED = validate_email.RESULT_DOMAIN_LOOKUP_FAILED
+
+# Remarks.
+REMARKS_DOMAIN_HAS_NO_MAIL_SERVER = "The domain of the email does not accept email."
+REMARKS_DOMAIN_LOOKUP_FAILED = "The domain of the email could not be looked up. Unable to check if it accepts email."
+
+# Output index.
+OUTPUT_INDEX_RESULT = 0
+OUTPUT_INDEX_REMARKS = 1
+
+# Cache statistics, as returned by DomainCache.info().
+DomainCacheInfo = collections.namedtuple("DomainCacheInfo", ["hits", "misses", "evictions", "expirations",
+                                                             "max_size", "size"])
+
+
+class DomainLookupError(Exception):
+    """Raised by a resolver when it cannot tell whether a domain accepts email, for example when
+    the lookup times out or the name server fails. Such answers are never cached."""
+
+
+class Resolver:
+    """Tells whether a domain accepts email. Subclass it, or pass any object with the same
+    coroutine method, to use another source of answers, such as a fake name server in tests."""
+
+    async def has_mail_server(self, domain: str) -> bool:
+        """Return True if the domain accepts email, False if it does not, and raise
+        DomainLookupError if this cannot be told."""
+
+        raise NotImplementedError
+
+
+class DNSPythonResolver(Resolver):
+    """Looks up the MX records of a domain with dnspython.
+
+    A domain accepts email if it has an MX record other than a null MX. A domain without any MX
+    record accepts email if it has an address record, which is then its implicit mail server
+    (RFC 5321, section 5.1).
+    """
+
+    def __init__(self, nameservers=None, port: int = 53, timeout: float = DEFAULT_TIMEOUT,
+                 check_implicit_mx: bool = True):
+
+        _import_dnspython()
+        self.check_implicit_mx = check_implicit_mx
+        self._resolver = dns.asyncresolver.Resolver(configure=nameservers is None)
+        if nameservers is not None:
+            self._resolver.nameservers = list(nameservers)
+        self._resolver.port = port
+        self._resolver.lifetime = timeout
+
+    async def has_mail_server(self, domain: str) -> bool:
+
+        # Look up the MX records.
+        answer = await self._resolve(domain, "MX")
+        if answer is not None:
+            return any(record.exchange.to_text(omit_final_dot=False) != NULL_MX_EXCHANGE for record in answer)
+        if not self.check_implicit_mx:
+            return False
+
+        # There is no MX record. Look up the address records.
+        for record_type in ("A", "AAAA"):
+            if await self._resolve(domain, record_type) is not None:
+                return True
+        return False
+
+    async def _resolve(self, domain: str, record_type: str):
+        """Return the answer of the lookup, or None if the domain or the record does not exist."""
+
+        try:
+            return await self._resolver.resolve(domain, record_type, search=False)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return None
+        except dns.exception.DNSException as error:
+            raise DomainLookupError("Unable to look up [" + domain + "]: " + str(error)) from error
+
+
+class DomainCache:
+    """A bounded cache of whether domains accept email, with a time to live per entry and least
+    recently used eviction. Domains that do not accept email are cached too, with their own time
+    to live. It is safe to share between threads and between event loops."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_MAX_SIZE, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL, clock=time.monotonic):
+
+        if max_size < 0:
+            raise ValueError("The maximum size of the cache cannot be negative.")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, domain: str):
+        """Return True or False if the answer for the domain is cached and has not expired, or
+        None otherwise."""
+
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is not None:
+                has_mail_server, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(domain)
+                    self._hits += 1
+                    return has_mail_server
+                del self._entries[domain]
+                self._expirations += 1
+            self._misses += 1
+            return None
+
+    def set(self, domain: str, has_mail_server: bool):
+        """Cache the answer for the domain."""
+
+        ttl = self.ttl if has_mail_server else self.negative_ttl
+        with self._lock:
+            if self._max_size > 0 and ttl > 0:
+                self._entries[domain] = (has_mail_server, self._clock() + ttl)
+                self._entries.move_to_end(domain)
+                while len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+    def info(self) -> DomainCacheInfo:
+        """Return the statistics of the cache."""
+
+        with self._lock:
+            return DomainCacheInfo(self._hits, self._misses, self._evictions, self._expirations, self._max_size,
+                                   len(self._entries))
+
+    def clear(self):
+        """Remove every entry of the cache, and reset its statistics."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._expirations = 0
+
+
+# The resolver and the cache used when none is given. The resolver is only created when it is
+# first needed, so that this module can be imported without dnspython.
+_default_resolver = None
+_default_cache = DomainCache()
+
+
+def get_default_resolver() -> Resolver:
+    """Return the resolver used when none is given, which is a DNSPythonResolver using the name
+    servers of the system."""
+
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = DNSPythonResolver()
+    return _default_resolver
+
+
+def get_default_cache() -> DomainCache:
+    """Return the cache used when none is given."""
+
+    return _default_cache
+
+
+async def validate_emails_async(emails, ends_with: str | domain_allowlist.DomainAllowlist = None,
+                                check_mail_server: bool = True, include_remarks: bool = False,
+                                resolver: Resolver = None, cache: DomainCache = None,
+                                max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                engine: str = validate_email.ENGINE_SCANNER):
+    """Validate many emails in one call, and check that their domains accept email.
+
+    The syntax and the suffix are checked first, without waiting, exactly as by
+    validate_email.validate_emails(). The domains of the emails that pass are then looked up,
+    each domain only once per call, with at most max_concurrency lookups at the same time. The
+    answers are cached, so that a domain is not looked up again until its answer expires.
+
+    Parameters
+    ----------
+    Args:
+        emails (Iterable[str]):
+            The emails to validate.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that every email must end with, or allowlist of domains. Defaults to None.
+        check_mail_server (bool, optional):
+            Whether to check that the domains accept email. Defaults to True.
+        include_remarks (bool, optional):
+            Whether to build the remarks for the emails that failed the validation. Defaults to False.
+        resolver (Resolver, optional):
+            The resolver used to look up the domains. Defaults to get_default_resolver().
+        cache (DomainCache, optional):
+            The cache of the answers of the resolver. Defaults to get_default_cache(). A
+            shared_cache.SharedCache shares the answers with the other processes of the host.
+        max_concurrency (int, optional):
+            The maximum number of lookups at the same time. Defaults to DEFAULT_MAX_CONCURRENCY.
+        engine (str, optional):
+            The engine used to check the syntax of the emails. Defaults to validate_email.ENGINE_SCANNER.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing an array of result codes (one per email, in the given order), and a
+        dictionary mapping the position of every failed email to its remarks. The dictionary is empty
+        if include_remarks is False.
+    """
+
+    if max_concurrency < 1:
+        raise ValueError("The maximum number of lookups at the same time must be at least 1.")
+
+    # Check the syntax and the suffix.
+    emails = list(emails)
+    results, remarks = validate_email.validate_emails(emails, ends_with=ends_with, include_remarks=include_remarks,
+                                                      engine=engine)
+    if not check_mail_server:
+        return results, remarks
+
+    # Find the domains to look up, each only once.
+    domains_by_index = {}
+    for index, result in enumerate(results):
+        if result == RESULT_SUCCESS:
+            domains_by_index[index] = _get_domain(emails[index])
+    if not domains_by_index:
+        return results, remarks
+
+    # Look up the domains.
+    if resolver is None:
+        resolver = get_default_resolver()
+    if cache is None:
+        cache = _default_cache
+    answers = await _look_up_domains(set(domains_by_index.values()), resolver, cache, max_concurrency)
+
+    # Update the results of the emails whose domain does not accept email, or could not be looked up.
+    for index, domain in domains_by_index.items():
+        answer = answers[domain]
+        if answer is True:
+            continue
+        if answer is False:
+            results[index] = RESULT_DOMAIN_HAS_NO_MAIL_SERVER
+            if include_remarks:
+                remarks[index] = REMARKS_DOMAIN_HAS_NO_MAIL_SERVER + " [" + domain + "]"
+        else:
+            results[index] = RESULT_DOMAIN_LOOKUP_FAILED
+            if include_remarks:
+                remarks[index] = REMARKS_DOMAIN_LOOKUP_FAILED + " [" + domain + "]"
+
+    # Return the result.
+    return results, remarks
+
+
+async def validate_email_async(email: str, ends_with: str | domain_allowlist.DomainAllowlist = None,
+                               check_mail_server: bool = True, resolver: Resolver = None, cache: DomainCache = None,
+                               engine: str = validate_email.ENGINE_SCANNER):
+    """Same as validate_emails_async(), for a single email.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing the result code and the remarks.
+    """
+
+    results, remarks = await validate_emails_async((email,), ends_with=ends_with,
+                                                   check_mail_server=check_mail_server, include_remarks=True,
+                                                   resolver=resolver, cache=cache, engine=engine)
+    return results[0], remarks.get(0, validate_email.REMARKS_SUCCESS)
+
+
+async def _look_up_domains(domains, resolver: Resolver, cache: DomainCache, max_concurrency: int) -> dict:
+    """Return a dictionary mapping every given domain to True if it accepts email, False if it does
+    not, or None if it could not be looked up."""
+
+    # Take the answers from the cache where possible.
+    answers = {}
+    missing = []
+    for domain in domains:
+        answer = cache.get(domain)
+        if answer is None:
+            missing.append(domain)
+        else:
+            answers[domain] = answer
+
+    # Look up the other domains, with a limited number of lookups at the same time.
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def look_up(domain):
+        async with semaphore:
+            try:
+                answer = bool(await resolver.has_mail_server(domain))
+            except DomainLookupError:
+                return None
+        cache.set(domain, answer)
+        return answer
+
+    for domain, answer in zip(missing, await asyncio.gather(*(look_up(domain) for domain in missing))):
+        answers[domain] = answer
+
+    return answers
+
+
+def _get_domain(email: str) -> str:
+    """Return the domain of an email that passed the validation, in lower case, since domains are
+    not case sensitive. The trailing newline that the regular expression accepts is removed."""
+
+    return email.rpartition("@")[2].rstrip("\n").lower()
+
+
+def _import_dnspython():
+    """Import dnspython, if it has not been imported yet."""
+
+    global dns
+    if dns is None:
+        try:
+            import dns.asyncresolver
+            import dns.exception
+            import dns.resolver
+        except ImportError as error:
+            raise ImportError("DNSPythonResolver needs dnspython. Install it with: pip install dnspython") from error
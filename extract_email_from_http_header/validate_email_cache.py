@@ -0,0 +1,156 @@
+import collections
+import threading
+
+from . import domain_allowlist
+from . import validate_email
+
+# Constants.
+DEFAULT_MAX_SIZE = 4096
+
+# Emails longer than this are validated without going through the cache. No valid email is this
+# long, so they are junk, and caching them would only evict the useful entries.
+MAX_CACHED_EMAIL_LENGTH = 320
+
+# Cache statistics, as returned by ValidationCache.info().
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "evictions", "bypasses", "max_size", "size"])
+
+
+class ValidationCache:
+    """A bounded cache of the results of validate_email.validate_email(), keyed on the email, the
+    suffix and the engine, with least recently used eviction.
+
+    An allowlist given as the suffix can still change. The key holds its version along with it, so
+    that the results cached before a change are not used anymore; they are evicted in turn.
+
+    The cache never holds more than max_size entries, so a flood of distinct emails cannot make it
+    grow. It is safe to share between threads.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+
+        if max_size < 0:
+            raise ValueError("The maximum size of the cache cannot be negative.")
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bypasses = 0
+
+    def validate_email(self, email: str, ends_with: str = None,
+                       engine: str = validate_email.ENGINE_REGULAR_EXPRESSION):
+        """Same as validate_email.validate_email(), but the result is taken from the cache if it is
+        there, and added to the cache if it is not."""
+
+        # Check if the inputs can be cached.
+        if not _is_cacheable(email, ends_with):
+            with self._lock:
+                self._bypasses += 1
+            return validate_email.validate_email(email, ends_with=ends_with, engine=engine)
+
+        # Look up the cache.
+        key = (email, ends_with, ends_with.version if isinstance(ends_with, domain_allowlist.DomainAllowlist) else None,
+               engine)
+        with self._lock:
+            output = self._entries.get(key)
+            if output is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return output
+            self._misses += 1
+
+        # Validate the email outside of the lock, so that other threads are not held up.
+        output = validate_email.validate_email(email, ends_with=ends_with, engine=engine)
+
+        # Add the result to the cache, evicting the least recently used entries if it is full.
+        with self._lock:
+            if self._max_size > 0:
+                self._entries[key] = output
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+        # Return the result.
+        return output
+
+    def info(self) -> CacheInfo:
+        """Return the statistics of the cache."""
+
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._bypasses, self._max_size,
+                             len(self._entries))
+
+    def clear(self):
+        """Remove every entry of the cache, and reset its statistics."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._bypasses = 0
+
+    def resize(self, max_size: int):
+        """Change the maximum size of the cache, evicting the least recently used entries if needed."""
+
+        if max_size < 0:
+            raise ValueError("The maximum size of the cache cannot be negative.")
+        with self._lock:
+            self._max_size = max_size
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+
+def _is_cacheable(email, ends_with) -> bool:
+    """Check if the given inputs can be used as a key of the cache."""
+
+    return (isinstance(email, str)
+            and len(email) <= MAX_CACHED_EMAIL_LENGTH
+            and (ends_with is None or isinstance(ends_with, (str, domain_allowlist.DomainAllowlist))))
+
+
+# The cache shared by the module level functions.
+_default_cache = ValidationCache()
+
+
+def validate_email_cached(email: str, ends_with: str = None, engine: str = validate_email.ENGINE_REGULAR_EXPRESSION):
+    """Same as validate_email.validate_email(), through the cache shared by the module.
+
+    Parameters
+    ----------
+    Args:
+        email (str):
+            The email to validate.
+        ends_with (str, optional):
+            Optional suffix that the email must end with. Defaults to None.
+        engine (str, optional):
+            The engine used to check the syntax of the email. Defaults to validate_email.ENGINE_REGULAR_EXPRESSION.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing the result code and the remarks.
+    """
+
+    return _default_cache.validate_email(email, ends_with=ends_with, engine=engine)
+
+
+def cache_info() -> CacheInfo:
+    """Return the statistics of the cache shared by the module."""
+
+    return _default_cache.info()
+
+
+def cache_clear():
+    """Remove every entry of the cache shared by the module, and reset its statistics."""
+
+    _default_cache.clear()
+
+
+def set_cache_max_size(max_size: int):
+    """Change the maximum size of the cache shared by the module."""
+
+    _default_cache.resize(max_size)
@@ -0,0 +1,115 @@
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from . import validate_email
+
+# Constants.
+DEFAULT_CHUNK_SIZE = 50000
+
+# Inputs with fewer emails than this are validated in the current process, because starting
+# the worker processes would cost more than the validation itself.
+DEFAULT_MIN_PARALLEL_SIZE = 200000
+
+# The number of chunks per worker that are submitted but not yet collected.
+MAX_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def validate_emails_parallel(emails,
+                             ends_with: str = None,
+                             workers: int | None = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             min_parallel_size: int = DEFAULT_MIN_PARALLEL_SIZE,
+                             engine: str = validate_email.ENGINE_REGULAR_EXPRESSION):
+    """Validate many emails across a pool of worker processes.
+
+    This gives the same result codes, in the same order, as validate_email.validate_emails().
+    The emails are sent to the workers in chunks, and each worker compiles its matcher only once,
+    when it starts.
+
+    Parameters
+    ----------
+    Args:
+        emails (Iterable[str]):
+            The emails to validate.
+        ends_with (str, optional):
+            Optional suffix that every email must end with. Defaults to None.
+        workers (int | None, optional):
+            The number of worker processes. If None is supplied, then the number of CPUs is used.
+            Defaults to None.
+        chunk_size (int, optional):
+            The number of emails sent to a worker at a time. Defaults to DEFAULT_CHUNK_SIZE.
+        min_parallel_size (int, optional):
+            Inputs with fewer emails than this are validated in the current process.
+            Defaults to DEFAULT_MIN_PARALLEL_SIZE.
+        engine (str, optional):
+            The engine used to check the syntax of the emails.
+            Defaults to validate_email.ENGINE_REGULAR_EXPRESSION.
+
+    Returns
+    -------
+    Returns:
+        array: An array of result codes, one per email, in the given order.
+    """
+
+    # Check the given arguments.
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be at least 1.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Read just enough emails to decide whether to use the worker processes. This works for any
+    # iterable, including those without a length, and never reads the whole input up front.
+    iterator = iter(emails)
+    head = list(islice(iterator, min_parallel_size))
+
+    # Check if the input is small, or if there is only one worker.
+    if len(head) < min_parallel_size or workers < 2:
+
+        # Validate in the current process.
+        results, _ = validate_email.validate_emails(head, ends_with=ends_with, engine=engine)
+        if len(head) == min_parallel_size:
+            results.extend(validate_email.validate_emails(iterator, ends_with=ends_with, engine=engine)[0])
+        return results
+
+    # Validate in the worker processes. The results are collected in the order the chunks were
+    # submitted, so the order of the emails is kept. Only a few chunks per worker are in flight
+    # at a time, so a large input is never read into memory all at once.
+    results = array(validate_email.RESULT_ARRAY_TYPECODE)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(engine,)) as executor:
+        pending = deque()
+        for chunk in _chunks(head, iterator, chunk_size):
+            pending.append(executor.submit(_validate_chunk, chunk, ends_with, engine))
+            if len(pending) >= workers * MAX_CHUNKS_IN_FLIGHT_PER_WORKER:
+                results.extend(pending.popleft().result())
+        while pending:
+            results.extend(pending.popleft().result())
+
+    # Return the result.
+    return results
+
+
+def _initialize_worker(engine: str):
+    """Import the validation module and look up the matcher once, when the worker process starts."""
+
+    validate_email.get_matcher(engine)
+
+
+def _validate_chunk(chunk, ends_with, engine: str):
+    """Validate one chunk of emails in a worker process."""
+
+    return validate_email.validate_emails(chunk, ends_with=ends_with, engine=engine)[0]
+
+
+def _chunks(head, iterator, chunk_size: int):
+    """Yield the emails in lists of at most the given size, starting with the ones already read."""
+
+    for start in range(0, len(head), chunk_size):
+        yield head[start:start + chunk_size]
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
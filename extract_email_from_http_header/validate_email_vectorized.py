@@ -0,0 +1,132 @@
+from . import domain_allowlist
+from . import validate_email
+
+# Optional dependencies. NumPy and pyarrow are required to use this module, and pandas is only
+# needed to pass a pandas Series. The emails are matched by the Arrow compute kernels, without any
+# Python-level work per row; there is deliberately no fallback that loops over the rows in Python,
+# since validate_email.validate_emails() already does that.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.compute
+except ImportError:
+    pyarrow = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+# Constants.
+#
+# validate_email.REGULAR_EXPRESSION rewritten for the RE2 engine used by Arrow.
+#
+# Note:
+# In Python, "\w" matches any character for which str.isalnum() is True, and the underscore. The
+# RE2 equivalent is "[\p{L}\p{N}_]", since "\w" only matches ASCII characters in RE2. In RE2, "$"
+# only matches at the very end of the input, so the trailing newline that Python's "$" allows is
+# spelled out with "\n?".
+ARROW_REGULAR_EXPRESSION = r"^[\p{L}\p{N}_\-\.]+@(?:[\p{L}\p{N}_\-]+\.)+[\p{L}\p{N}_\-]{2,4}\n?$"
+
+# Type of the array holding the result codes.
+RESULT_DTYPE = "int8"
+
+# Output index.
+OUTPUT_INDEX_RESULT = 0
+OUTPUT_INDEX_ENDS_WITH_MASK = 1
+
+
+def validate_emails_vectorized(values, ends_with: str | domain_allowlist.DomainAllowlist = None):
+    """Validate a column of emails in one call.
+
+    This gives the same result codes as calling validate_email.validate_email() on every email.
+    Missing values (None, NaN or Arrow nulls) fail the validation instead of raising an error.
+
+    Note:
+    NumPy and pyarrow must be installed. Only an allowlist of domains is checked row by row in
+    Python; the syntax and a string suffix are checked by Arrow.
+
+    Parameters
+    ----------
+    Args:
+        values (numpy.ndarray | pandas.Series | pyarrow.Array | pyarrow.ChunkedArray):
+            The emails to validate. NumPy arrays may be of object or string dtype.
+        ends_with (str | DomainAllowlist, optional):
+            Optional suffix that every email must end with, or allowlist of domains. An allowlist is
+            checked row by row. Defaults to None.
+
+    Returns
+    -------
+    Returns:
+        Tuple: A Tuple containing a NumPy array of result codes, and a NumPy boolean array that
+        is True for every email ending with the given suffix. The mask is all True if no suffix is
+        given, and all False if the given suffix is not a string.
+    """
+
+    if numpy is None or pyarrow is None:
+        raise ImportError("NumPy and pyarrow are required for the vectorized validation. "
+                          "Install them with \"pip install extract-email-from-http-header[vectorized]\", "
+                          "or use validate_email.validate_emails().")
+
+    # Check the syntax of every email, and if every email ends with the given suffix.
+    matches, ends_with_mask = _match_arrow(_to_arrow(values), ends_with)
+
+    # Turn the masks into result codes.
+    results = numpy.full(len(matches), validate_email.RESULT_FAILED_VALIDATION, dtype=RESULT_DTYPE)
+    if ends_with is None:
+        results[matches] = validate_email.RESULT_SUCCESS
+    elif isinstance(ends_with, (str, domain_allowlist.DomainAllowlist)):
+        results[matches & ends_with_mask] = validate_email.RESULT_SUCCESS
+        results[matches & ~ends_with_mask] = validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+    else:
+        results[matches] = validate_email.RESULT_GIVEN_EMAIL_END_WITH_IS_NOT_STRING
+
+    # Return the result.
+    return results, ends_with_mask
+
+
+def _to_arrow(values):
+    """Convert the given column to an Arrow string array, without copying Arrow input."""
+
+    if isinstance(values, (pyarrow.Array, pyarrow.ChunkedArray)):
+        return values
+    if pandas is not None and isinstance(values, pandas.Series):
+        return pyarrow.array(values, type=pyarrow.string(), from_pandas=True)
+    return pyarrow.array(numpy.asarray(values, dtype=object), type=pyarrow.string(), from_pandas=True)
+
+
+def _to_numpy_mask(array):
+    """Convert an Arrow boolean array to a NumPy boolean array, with nulls as False."""
+
+    return numpy.asarray(pyarrow.compute.fill_null(array, False).to_numpy(zero_copy_only=False), dtype=bool)
+
+
+def _match_arrow(array, ends_with):
+    """Match the emails with the Arrow compute kernels."""
+
+    matches = _to_numpy_mask(pyarrow.compute.match_substring_regex(array, pattern=ARROW_REGULAR_EXPRESSION))
+    if ends_with is None:
+        ends_with_mask = numpy.ones(len(matches), dtype=bool)
+    elif isinstance(ends_with, str):
+        ends_with_mask = _to_numpy_mask(pyarrow.compute.ends_with(array, pattern=ends_with))
+    elif isinstance(ends_with, domain_allowlist.DomainAllowlist):
+        ends_with_mask = _ends_with_mask_python(array.to_pylist(), ends_with)
+    else:
+        ends_with_mask = numpy.zeros(len(matches), dtype=bool)
+    return matches, ends_with_mask
+
+
+def _ends_with_mask_python(values: list, ends_with):
+    """Check if every email ends with the given suffix, or with a domain of the given allowlist."""
+
+    ends_with_matches = validate_email.get_ends_with_matcher(ends_with)
+    if ends_with is None:
+        return numpy.ones(len(values), dtype=bool)
+    if ends_with_matches is None:
+        return numpy.zeros(len(values), dtype=bool)
+    return numpy.fromiter((isinstance(value, str) and ends_with_matches(value) for value in values),
+                          dtype=bool, count=len(values))
@@ -12,4 +12,13 @@ setup(
     include_package_data=True,
     install_requires=['streamlit',                   
                       ],
+    extras_require={'dns': ['dnspython',
+                            ],
+                    'jwt': ['cryptography',
+                            ],
+                    'vectorized': ['numpy',
+                                   'pandas',
+                                   'pyarrow',
+                                   ],
+                    },
 )
\ No newline at end of file
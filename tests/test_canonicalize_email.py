@@ -0,0 +1,83 @@
+"""Tests of the canonicalization of the emails, and of where it runs."""
+
+import pytest
+
+from extract_email_from_http_header import canonicalize_email
+from extract_email_from_http_header import domain_allowlist
+from extract_email_from_http_header import validate_email
+
+
+@pytest.fixture
+def canonicalizer():
+    return canonicalize_email.Canonicalizer(intern_table=canonicalize_email.InternTable())
+
+
+def test_canonical_forms():
+
+    assert canonicalize_email.canonicalize_email("Alice@Corp.COM.") == "Alice@corp.com"
+    assert canonicalize_email.canonicalize_email("alice+news@corp.com", strip_plus_tag=True) == "alice@corp.com"
+    assert canonicalize_email.canonicalize_email("Alice@Bücher.Example") == "Alice@bücher.example"
+    assert canonicalize_email.canonicalize_email("no domain") is None
+    assert domain_allowlist.normalize_domain(" Corp.COM. ") == "corp.com"
+
+
+def test_punycode_and_unicode_domains_are_one_email(canonicalizer):
+
+    assert (canonicalize_email.canonicalize_email("alice@xn--bcher-kva.example")
+            == canonicalize_email.canonicalize_email("alice@Bücher.Example.") == "alice@bücher.example")
+    assert canonicalizer.canonicalize("alice@XN--BCHER-KVA.example") is canonicalizer.canonicalize("alice@bücher.example")
+    assert canonicalizer.intern_table.info().size == 1
+
+    # A label that is not valid punycode is kept.
+    assert canonicalize_email.canonicalize_email("alice@xn--.example") == "alice@xn--.example"
+
+
+def test_distinct_domains_are_not_merged():
+
+    assert canonicalize_email.canonicalize_email("a@straße.de") != canonicalize_email.canonicalize_email("a@strasse.de")
+
+
+def test_validation_runs_on_the_email_as_given(canonicalizer):
+
+    for email in ("a@пример.рф", "a@straße.de"):
+        expected = validate_email.validate_email(email).result
+        assert validate_email.validate_email(email, canonicalizer=canonicalizer).result is expected
+        assert list(validate_email.validate_emails([email], canonicalizer=canonicalizer)[0]) == [expected]
+
+    # The suffix and the denylist are checked against the canonical form of a valid email, and the
+    # suffix is canonicalized too.
+    assert validate_email.validate_email("Alice@Corp.COM", ends_with="@Corp.COM").result is validate_email.RESULT_SUCCESS
+    for ends_with in ("@Corp.COM", "@corp.com", "Corp.COM", "@CORP.com."):
+        assert validate_email.validate_email("Alice@Corp.COM", ends_with=ends_with,
+                                             canonicalizer=canonicalizer).result is validate_email.RESULT_SUCCESS
+        assert list(validate_email.validate_emails(["Alice@Corp.COM"], ends_with=ends_with, canonicalizer=canonicalizer)[0]) == [
+            validate_email.RESULT_SUCCESS]
+    assert validate_email.validate_email("Alice@Corp.COM", ends_with="@corp.com",
+                                         canonicalizer=canonicalizer).result is validate_email.RESULT_SUCCESS
+    assert validate_email.validate_email("alice@xn--bcher-kva.de", ends_with="@Bücher.DE",
+                                         canonicalizer=canonicalizer).result is validate_email.RESULT_SUCCESS
+    results, remarks = validate_email.validate_emails(["Alice@Corp.COM", "Bob@Other.org", " Carol@Corp.COM"],
+                                                      ends_with="@corp.com", include_remarks=True,
+                                                      canonicalizer=canonicalizer)
+    assert list(results) == [validate_email.RESULT_SUCCESS, validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE,
+                             validate_email.RESULT_FAILED_VALIDATION]
+    assert "Bob@other.org" in remarks[1]
+
+
+def test_invalid_emails_are_not_interned(canonicalizer):
+
+    validate_email.validate_emails(["not an email", "Alice@Corp.COM"], canonicalizer=canonicalizer)
+    assert canonicalizer.intern_table.info().size == 1
+
+
+def test_extraction_only_interns_valid_emails(canonicalizer):
+
+    pytest.importorskip("streamlit")
+    from extract_email_from_http_header import extract_email_from_headers
+
+    for value in ("<script>@@", "Alice@Corp.COM"):
+        extraction_output = extract_email_from_headers.extract_email_from_headers(
+            {}, header_key="X-Email", session_state_key="email", headers={"X-Email": value}, canonicalizer=canonicalizer)
+        assert extraction_output.result is extract_email_from_headers.RESULT_SUCCESS
+    assert extraction_output.email == "Alice@corp.com"
+    assert canonicalizer.intern_table.info().size == 1
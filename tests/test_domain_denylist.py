@@ -0,0 +1,118 @@
+"""Tests of the compiled, memory-mapped denylist of domains and addresses."""
+
+import pickle
+
+import pytest
+
+from extract_email_from_http_header import domain_denylist
+from extract_email_from_http_header import validate_email
+
+ENTRIES = ["Mailinator.com", "*.temp-mail.org", ".trash.net", "Spam@Corp.com", "", "# a comment", "mailinator.com"]
+
+
+@pytest.fixture
+def denylist(tmp_path):
+
+    path = str(tmp_path / "denylist.bin")
+    assert domain_denylist.compile_denylist(ENTRIES, path) == 4
+    denylist = domain_denylist.DomainDenylist(path)
+    yield denylist
+    denylist.close()
+
+
+def test_entries_are_matched_without_regard_to_case(denylist):
+
+    assert len(denylist) == 4
+    assert denylist.matches_domain("MAILINATOR.COM")
+    assert denylist.matches("bob@mailinator.com")
+    assert "Mailinator.Com" in denylist
+    assert "spam@corp.com" in denylist
+    assert "SPAM@CORP.COM" in denylist
+    assert "alice@corp.com" not in denylist
+    assert "corp.com" not in denylist
+    assert 42 not in denylist
+
+    # A domain entry does not deny its subdomains.
+    assert not denylist.matches_domain("sub.mailinator.com")
+    assert not denylist.matches("not an email")
+
+
+def test_wildcards_only_deny_subdomains(denylist):
+
+    for parent in ("temp-mail.org", "trash.net"):
+        assert denylist.matches_domain("a." + parent)
+        assert denylist.matches("bob@a.b." + parent)
+        assert not denylist.matches_domain(parent)
+        assert not denylist.matches_domain("other" + parent)
+
+
+def test_pickle_reopens_the_file(denylist):
+
+    copy = pickle.loads(pickle.dumps(denylist))
+    try:
+        assert "bob@mailinator.com" in copy
+        assert len(copy) == len(denylist)
+    finally:
+        copy.close()
+
+
+def test_bad_files(tmp_path):
+
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    garbage = tmp_path / "garbage.bin"
+    garbage.write_bytes(b"NOPE" + bytes(100))
+    for path in (empty, garbage):
+        with pytest.raises(ValueError):
+            domain_denylist.DomainDenylist(str(path))
+
+    with pytest.raises(TypeError):
+        domain_denylist.compile_denylist(["mailinator.com", None], str(tmp_path / "denylist.bin"))
+
+
+def test_large_denylist(tmp_path):
+
+    path = str(tmp_path / "denylist.bin")
+    domains = ["domain-" + str(index) + ".com" for index in range(5000)]
+    assert domain_denylist.compile_denylist(domains, path) == len(domains)
+    denylist = domain_denylist.DomainDenylist(path)
+    try:
+        assert all(domain in denylist for domain in domains)
+        assert not any(("other-" + str(index) + ".com") in denylist for index in range(5000))
+    finally:
+        denylist.close()
+
+
+def test_compile_files_and_command_line(tmp_path, capsys):
+
+    first = tmp_path / "first.txt"
+    first.write_text("# Disposable providers.\nmailinator.com\n\n*.temp-mail.org\n")
+    second = tmp_path / "second.txt"
+    second.write_text("spam@corp.com\nmailinator.com\n")
+    path = str(tmp_path / "denylist.bin")
+
+    assert domain_denylist.compile_denylist_files([str(first), str(second)], path) == 3
+    assert domain_denylist.main([path, str(first), str(second)]) == 0
+    assert "3 entries written to " + path in capsys.readouterr().err
+
+    denylist = domain_denylist.DomainDenylist(path)
+    try:
+        assert "bob@a.temp-mail.org" in denylist
+        assert "spam@corp.com" in denylist
+    finally:
+        denylist.close()
+
+
+def test_validate_email_with_a_denylist(denylist):
+
+    assert validate_email.validate_email("bob@mailinator.com", denylist=denylist) is (
+        validate_email.OUTPUT_EMAIL_IS_DENYLISTED)
+    assert validate_email.validate_email("spam@corp.com", ends_with="@corp.com", denylist=denylist).result is (
+        validate_email.RESULT_EMAIL_IS_DENYLISTED)
+    assert validate_email.validate_email("alice@corp.com", denylist=denylist) is validate_email.OUTPUT_SUCCESS
+
+    # Only the valid emails are looked up.
+    assert validate_email.validate_email("bob@mailinator", denylist=denylist).result is (
+        validate_email.RESULT_FAILED_VALIDATION)
+    assert validate_email.validate_email("bob@mailinator.com", ends_with="@corp.com", denylist=denylist).result is (
+        validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE)
@@ -0,0 +1,86 @@
+"""Tests of the linear time scanner of the syntax of emails."""
+
+import time
+
+import pytest
+
+from extract_email_from_http_header import email_scanner
+from extract_email_from_http_header import validate_email
+
+EMAILS = [
+    "alice@corp.com",
+    "alice.smith-jones_1@mail.corp.co.uk",
+    "alice@corp.com\n",
+    "alice@corp.com\n\n",
+    "alice@corp.c",
+    "alice@corp.comms",
+    "alice@corp",
+    "alice@.corp.com",
+    "alice@corp..com",
+    "alice@corp.com.",
+    "alice@@corp.com",
+    "alice@bob@corp.com",
+    "@corp.com",
+    "alice@",
+    "al ice@corp.com",
+    "alice+tag@corp.com",
+    "élise@corp.com",
+    "alice@corp.c-m",
+    "",
+    "@",
+]
+
+
+@pytest.mark.parametrize("email", EMAILS)
+def test_regex_compatible_mode_agrees_with_the_regular_expression(email):
+
+    expected = validate_email.COMPILED_REGULAR_EXPRESSION.match(email) is not None
+    assert email_scanner.match_email(email) is expected
+
+
+def test_strict_mode_checks_the_lengths():
+
+    domain = "corp.com"
+    assert email_scanner.match_email("a" * 64 + "@" + domain, mode=email_scanner.MODE_STRICT)
+    assert not email_scanner.match_email("a" * 65 + "@" + domain, mode=email_scanner.MODE_STRICT)
+    assert email_scanner.match_email("a" * 65 + "@" + domain)
+
+    # A domain over 255 characters, and an email over 254 characters with both parts in range.
+    long_domain = ".".join(["a" * 60] * 5) + ".com"
+    assert len(long_domain) > email_scanner.MAX_LENGTH_DOMAIN
+    assert not email_scanner.match_email("a@" + long_domain, mode=email_scanner.MODE_STRICT)
+    email = "a" * 64 + "@" + "b" * 62 + "." + "b" * 61 + "." + "b" * 61 + ".com"
+    assert len(email) == email_scanner.MAX_LENGTH_EMAIL + 1
+    assert email_scanner.match_email(email)
+    assert not email_scanner.match_email(email, mode=email_scanner.MODE_STRICT)
+
+    # The trailing newline is only accepted for compatibility with the regular expression.
+    assert not email_scanner.match_email("alice@corp.com\n", mode=email_scanner.MODE_STRICT)
+
+    with pytest.raises(ValueError):
+        email_scanner.match_email("alice@corp.com", mode="unknown")
+
+
+def test_adversarial_input_is_linear():
+
+    # Inputs that make the regular expression backtrack.
+    for email in ("a@" + "a." * 20000 + "!", "a@" + "a" * 50000 + "." * 50000, "a" * 100000 + "@"):
+        start = time.perf_counter()
+        assert not email_scanner.match_email(email)
+        assert time.perf_counter() - start < 1.0
+
+
+def test_engines_of_validate_email():
+
+    for engine in (validate_email.ENGINE_SCANNER, validate_email.ENGINE_SCANNER_STRICT):
+        assert validate_email.validate_email("alice@corp.com", engine=engine) is validate_email.OUTPUT_SUCCESS
+        assert validate_email.validate_email("alice@corp", engine=engine).result is (
+            validate_email.RESULT_FAILED_VALIDATION)
+        assert validate_email.validate_email("alice@corp.com", ends_with="@other.org", engine=engine).result is (
+            validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE)
+
+    email = "a" * 65 + "@corp.com"
+    assert validate_email.validate_email(email, engine=validate_email.ENGINE_SCANNER).result is (
+        validate_email.RESULT_SUCCESS)
+    assert validate_email.validate_email(email, engine=validate_email.ENGINE_SCANNER_STRICT).result is (
+        validate_email.RESULT_FAILED_VALIDATION)
@@ -0,0 +1,74 @@
+"""Tests of the extraction of the email from a raw HTTP/1.1 header block."""
+
+from extract_email_from_http_header import extract_email_from_raw_headers
+from extract_email_from_http_header import output
+from extract_email_from_http_header import validate_email
+
+REQUEST_LINE = b"GET / HTTP/1.1\r\n"
+
+
+def extract(block, **kwargs):
+    return extract_email_from_raw_headers.extract_email_from_raw_headers(block, **kwargs)
+
+
+def test_header_is_found_without_regard_to_case():
+
+    block = REQUEST_LINE + b"Host: corp.com\r\nx-EMAIL:  alice@corp.com \r\n\r\n"
+    for headers in (block, bytearray(block), memoryview(block)):
+        result = extract(headers)
+        assert isinstance(result, output.EmailOutput)
+        assert result == (validate_email.RESULT_SUCCESS, validate_email.REMARKS_SUCCESS, "alice@corp.com")
+        assert result.email == "alice@corp.com"
+
+    # The header on the first line of a block without a request line.
+    assert extract(b"X-Email: alice@corp.com\r\n").email == "alice@corp.com"
+
+
+def test_folded_header():
+
+    block = REQUEST_LINE + b"X-Other: a\r\n\tb\r\nX-Email: alice@\r\n corp.com\r\n\r\n"
+    assert extract_email_from_raw_headers.find_header_values(block) == [b"alice@ corp.com"]
+    assert extract_email_from_raw_headers.find_header_values(block, "X-Other") == [b"a b"]
+    assert extract(block).result is validate_email.RESULT_FAILED_VALIDATION
+
+
+def test_duplicate_headers():
+
+    same = REQUEST_LINE + b"X-Email: alice@corp.com\r\nx-email: alice@corp.com\r\n\r\n"
+    assert extract(same).email == "alice@corp.com"
+
+    different = REQUEST_LINE + b"X-Email: alice@corp.com\r\nX-Email: mallory@corp.com\r\n\r\n"
+    result = extract(different)
+    assert result is extract_email_from_raw_headers.OUTPUT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+    assert result.result is validate_email.RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
+
+
+def test_bad_arguments():
+
+    block = REQUEST_LINE + b"X-Email: alice@corp.com\r\n\r\n"
+    assert extract("X-Email: alice@corp.com").result is validate_email.RESULT_GIVEN_HEADERS_ARE_NOT_BYTES
+    assert extract(block, header_key=None).result is validate_email.RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+    assert extract(block, header_key=b"X-Email").result is validate_email.RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+
+    # No header name has other characters than ASCII ones.
+    result = extract(block, header_key="X-Émail")
+    assert result is extract_email_from_raw_headers.OUTPUT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_ASCII
+    assert result.result is validate_email.RESULT_GIVEN_EMAIL_HEADER_KEY_IS_NOT_STRING
+
+
+def test_only_the_header_block_is_searched():
+
+    block = REQUEST_LINE + b"Host: corp.com\r\n\r\nX-Email: alice@corp.com\r\n"
+    assert extract(block) is extract_email_from_raw_headers.OUTPUT_NO_EMAIL_HEADER_IN_REQUEST
+
+
+def test_oversize_input():
+
+    # A large block, and a large body with the header in it.
+    filler = b"".join(b"X-Filler-%d: %s\r\n" % (index, b"a" * 100) for index in range(10000))
+    block = REQUEST_LINE + filler + b"X-Email: alice@corp.com\r\n\r\n" + b"X-Email: mallory@corp.com\r\n" * 10000
+    assert extract(block).email == "alice@corp.com"
+
+    # A value longer than any email is not one, with the engine that checks the lengths.
+    block = REQUEST_LINE + b"X-Email: " + b"a" * 100000 + b"@corp.com\r\n\r\n"
+    assert extract(block, engine=validate_email.ENGINE_SCANNER_STRICT).result is validate_email.RESULT_FAILED_VALIDATION
@@ -0,0 +1,233 @@
+"""Tests of the verification of the identity assertions."""
+
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from extract_email_from_http_header import identity_assertion
+
+SECRET = b"0123456789abcdef0123456789abcdef"
+NOW = 1_700_000_000.0
+EMAIL = "alice@corp.com"
+
+
+def encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+def encode_json(value) -> str:
+    return encode(json.dumps(value).encode("utf-8"))
+
+
+def sign_hs256(header: str, payload: str, secret: bytes = SECRET) -> str:
+    signing_input = (header + "." + payload).encode("ascii")
+    return header + "." + payload + "." + encode(hmac.new(secret, signing_input, hashlib.sha256).digest())
+
+
+def assertion(claims=None, header=None, secret: bytes = SECRET) -> str:
+    header = {"alg": "HS256", "kid": "hs", "typ": "JWT"} if header is None else header
+    claims = {"email": EMAIL, "exp": NOW + 3600, "iss": "proxy", "aud": "app"} if claims is None else claims
+    return sign_hs256(encode_json(header), encode_json(claims), secret)
+
+
+@pytest.fixture
+def clock():
+    return [NOW]
+
+
+@pytest.fixture
+def jwks_path(tmp_path):
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{"kty": "oct", "kid": "hs", "k": encode(SECRET)}]}))
+    return str(path)
+
+
+@pytest.fixture
+def verifier(jwks_path, clock):
+    return identity_assertion.AssertionVerifier(jwks_path, issuer="proxy", audience="app", leeway=0,
+                                                clock=lambda: clock[0])
+
+
+def test_valid_assertion(verifier):
+
+    assert tuple(verifier.verify(assertion())) == (identity_assertion.RESULT_SUCCESS, identity_assertion.REMARKS_SUCCESS,
+                                                   EMAIL)
+
+
+def test_bad_signature(verifier):
+
+    assert verifier.verify(assertion(secret=b"another secret")).result is identity_assertion.RESULT_SIGNATURE_IS_INVALID
+
+    # The claims are changed after signing.
+    header, _, signature = assertion().split(".")
+    forged = header + "." + encode_json({"email": "mallory@corp.com", "exp": NOW + 3600}) + "." + signature
+    assert verifier.verify(forged).result is identity_assertion.RESULT_SIGNATURE_IS_INVALID
+
+
+def test_algorithms(verifier, jwks_path):
+
+    header, payload, _ = assertion(header={"alg": "none", "kid": "hs"}).split(".")
+    assert verifier.verify(header + "." + payload + ".").result is identity_assertion.RESULT_ALGORITHM_IS_NOT_ALLOWED
+
+    # The symmetric key is only ever used with HS256.
+    assert (verifier.verify(assertion(header={"alg": "RS256", "kid": "hs"})).result
+            is identity_assertion.RESULT_KEY_IS_UNKNOWN)
+
+    only_rs256 = identity_assertion.AssertionVerifier(jwks_path, algorithms=[identity_assertion.ALGORITHM_RS256])
+    assert only_rs256.verify(assertion()).result is identity_assertion.RESULT_ALGORITHM_IS_NOT_ALLOWED
+
+
+@pytest.mark.parametrize("claims, result", [
+    ({"email": EMAIL, "exp": NOW - 1, "iss": "proxy", "aud": "app"}, identity_assertion.RESULT_ASSERTION_HAS_EXPIRED),
+    ({"email": EMAIL, "exp": NOW + 3600, "nbf": NOW + 60, "iss": "proxy", "aud": "app"},
+     identity_assertion.RESULT_ASSERTION_IS_NOT_YET_VALID),
+    ({"email": EMAIL, "exp": NOW + 3600, "iss": "other", "aud": "app"}, identity_assertion.RESULT_ISSUER_IS_WRONG),
+    ({"email": EMAIL, "exp": NOW + 3600, "iss": "proxy", "aud": ["other"]}, identity_assertion.RESULT_AUDIENCE_IS_WRONG),
+    ({"email": EMAIL, "exp": NOW + 3600, "iss": "proxy"}, identity_assertion.RESULT_AUDIENCE_IS_WRONG),
+    ({"email": EMAIL, "iss": "proxy", "aud": "app"}, identity_assertion.RESULT_ASSERTION_IS_MALFORMED),
+    ({"exp": NOW + 3600, "iss": "proxy", "aud": ["other", "app"]}, identity_assertion.RESULT_EMAIL_CLAIM_IS_MISSING),
+])
+def test_claims(verifier, claims, result):
+
+    assert verifier.verify(assertion(claims)).result is result
+
+
+def test_malformed_base64(verifier):
+
+    header, payload, signature = assertion().split(".")
+    malformed = [
+        "not an assertion",
+        header + "." + payload,
+        header + "." + payload + "." + signature + "!!!",
+        header + "." + payload + "." + signature[:10] + "!!!" + signature[10:],
+        header + "." + payload + "." + signature + "=",
+        header + "." + payload + "." + signature.replace("-", "+").replace("_", "/"),
+        header + "." + payload + "." + signature + "AB",
+        "=" + header + "." + payload + "." + signature,
+    ]
+    for value in malformed:
+        assert verifier.verify(value).result is identity_assertion.RESULT_ASSERTION_IS_MALFORMED, value
+
+
+def test_non_canonical_base64(verifier):
+
+    # A signature of 32 bytes leaves 2 bits of its last character unused. Setting them decodes to
+    # the same bytes, but is another encoding.
+    header, payload, signature = assertion().split(".")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    last = alphabet[alphabet.index(signature[-1]) | 0b11]
+    assert last != signature[-1]
+    assert base64.urlsafe_b64decode(signature[:-1] + last + "=") == base64.urlsafe_b64decode(signature + "=")
+    result = verifier.verify(header + "." + payload + "." + signature[:-1] + last).result
+    assert result is identity_assertion.RESULT_ASSERTION_IS_MALFORMED
+
+
+def test_oversized_and_nested_header(verifier):
+
+    nested = encode(b"[" * 5000 + b"]" * 5000)
+    assert verifier.verify(sign_hs256(nested, encode_json({}))).result is identity_assertion.RESULT_ASSERTION_IS_MALFORMED
+    long_header = encode_json({"alg": "HS256", "kid": "hs", "pad": "x" * identity_assertion.MAX_HEADER_LENGTH})
+    assert (verifier.verify(sign_hs256(long_header, encode_json({}))).result
+            is identity_assertion.RESULT_ASSERTION_IS_MALFORMED)
+    assert verifier.verify("a" * (identity_assertion.MAX_ASSERTION_LENGTH + 1)).result is (
+        identity_assertion.RESULT_ASSERTION_IS_MALFORMED)
+
+    # Nesting that fits in the header is rejected too.
+    nested = encode(b"[" * 380 + b"]" * 380)
+    assert len(nested) < identity_assertion.MAX_HEADER_LENGTH
+    assert verifier.verify(sign_hs256(nested, encode_json({}))).result is identity_assertion.RESULT_ASSERTION_IS_MALFORMED
+
+
+def test_nested_payload(verifier):
+
+    nested = encode(b"[" * 5000 + b"]" * 5000)
+    result = verifier.verify(sign_hs256(encode_json({"alg": "HS256", "kid": "hs"}), nested)).result
+    assert result is identity_assertion.RESULT_ASSERTION_IS_MALFORMED
+
+
+def test_cache_hits_check_the_expiry(verifier, clock):
+
+    value = assertion({"email": EMAIL, "exp": NOW + 60, "iss": "proxy", "aud": "app"})
+    assert verifier.verify(value).result is identity_assertion.RESULT_SUCCESS
+    assert verifier.verify(value).result is identity_assertion.RESULT_SUCCESS
+    assert verifier.info().hits == 1
+
+    clock[0] = NOW + 61
+    assert verifier.verify(value).result is identity_assertion.RESULT_ASSERTION_HAS_EXPIRED
+    assert verifier.info().size == 0
+
+
+def test_failures_are_not_cached(verifier):
+
+    for _ in range(3):
+        verifier.verify(assertion(secret=b"another secret"))
+    assert verifier.info().size == 0
+
+
+def test_asymmetric_keys(tmp_path, clock):
+
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.asymmetric import utils
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    rsa_numbers = rsa_key.public_key().public_numbers()
+    ec_numbers = ec_key.public_key().public_numbers()
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [
+        {"kty": "RSA", "kid": "rs", "n": encode(rsa_numbers.n.to_bytes(256, "big")),
+         "e": encode(rsa_numbers.e.to_bytes(3, "big"))},
+        {"kty": "EC", "kid": "es", "crv": "P-256", "x": encode(ec_numbers.x.to_bytes(32, "big")),
+         "y": encode(ec_numbers.y.to_bytes(32, "big"))},
+    ]}))
+    verifier = identity_assertion.AssertionVerifier(str(path), clock=lambda: clock[0])
+
+    def sign(algorithm, kid, key):
+        signing_input = encode_json({"alg": algorithm, "kid": kid}) + "." + encode_json({"email": EMAIL, "exp": NOW + 60})
+        if algorithm == "RS256":
+            signature = key.sign(signing_input.encode("ascii"), padding.PKCS1v15(), hashes.SHA256())
+        else:
+            r, s = utils.decode_dss_signature(key.sign(signing_input.encode("ascii"), ec.ECDSA(hashes.SHA256())))
+            signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return signing_input + "." + encode(signature)
+
+    for algorithm, kid, key, other_key in (("RS256", "rs", rsa_key, ec_key), ("ES256", "es", ec_key, rsa_key)):
+        value = sign(algorithm, kid, key)
+        assert verifier.verify(value).email == EMAIL
+        header, payload, signature = value.split(".")
+        tampered = header + "." + encode_json({"email": "mallory@corp.com", "exp": NOW + 60}) + "." + signature
+        assert verifier.verify(tampered).result is identity_assertion.RESULT_SIGNATURE_IS_INVALID
+        # The key of the other algorithm is never used.
+        other = sign(algorithm, "es" if kid == "rs" else "rs", key)
+        assert verifier.verify(other).result is identity_assertion.RESULT_KEY_IS_UNKNOWN
+
+
+def test_asymmetric_keys_without_cryptography(jwks_path, clock, monkeypatch):
+
+    def missing():
+        raise ImportError("RS256 and ES256 keys need cryptography.")
+
+    monkeypatch.setattr(identity_assertion, "_import_cryptography", missing)
+    verifier = identity_assertion.AssertionVerifier(identity_assertion.KeySet(jwks_path, check_interval=0.0),
+                                                    clock=lambda: clock[0])
+    with open(jwks_path, "w") as file:
+        json.dump({"keys": [{"kty": "oct", "kid": "hs", "k": encode(SECRET)},
+                            {"kty": "RSA", "kid": "rs", "n": encode(b"\x01" * 256), "e": encode(b"\x01\x00\x01")}]},
+                  file)
+
+    # The new key set cannot be loaded, so the keys loaded before are kept, and the assertions
+    # signed with the new key fail instead of raising.
+    assert verifier.verify(assertion()).email == EMAIL
+    rs256 = assertion(header={"alg": "RS256", "kid": "rs"})
+    assert verifier.verify(rs256).result is identity_assertion.RESULT_KEY_IS_UNKNOWN
+    assert verifier.info().reloads == 0
+
+    with pytest.raises(ImportError):
+        identity_assertion.KeySet(jwks_path)
@@ -0,0 +1,49 @@
+"""Checks that the modules that do not need Streamlit can be imported without importing it."""
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import extract_email_from_http_header
+
+# Constants.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = extract_email_from_http_header.__name__
+
+# The submodules that need Streamlit. Every other one, and the package, must not import it.
+STREAMLIT_MODULES = {
+    "extract_email_from_headers",
+    "session_cache",
+    "streamlit_helper_email_input",
+    "streamlit_helper_multi_email_input",
+}
+STREAMLIT_FREE_MODULES = [PACKAGE] + [PACKAGE + "." + name for name in extract_email_from_http_header.__all__
+                                      if name not in STREAMLIT_MODULES]
+
+# The message of an import that failed because a module is not installed.
+MISSING_MODULE = re.compile(r"ModuleNotFoundError: No module named '([^']+)'")
+
+PROBE = "import sys, {module}; print('streamlit' in sys.modules)"
+
+
+def imports_streamlit(module: str) -> bool:
+    """Import the given module in a fresh interpreter, and return whether Streamlit was imported.
+    Skip the test if a dependency of the module is not installed."""
+
+    completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=ROOT, capture_output=True,
+                               text=True)
+    if completed.returncode != 0:
+        missing = MISSING_MODULE.search(completed.stderr)
+        if missing is not None and not missing.group(1).startswith(PACKAGE):
+            pytest.skip(missing.group(1) + " is not installed")
+        raise AssertionError("Importing " + module + " failed:\n" + completed.stderr)
+    return completed.stdout.strip() == "True"
+
+
+@pytest.mark.parametrize("module", STREAMLIT_FREE_MODULES)
+def test_module_does_not_import_streamlit(module):
+
+    assert not imports_streamlit(module)
@@ -0,0 +1,133 @@
+"""Tests of the opt-in instrumentation of the hot paths."""
+
+import pytest
+
+from extract_email_from_http_header import instrumentation
+from extract_email_from_http_header import validate_email
+
+FUNCTION = "validate_email.validate_email"
+
+
+@pytest.fixture(autouse=True)
+def clean_instrumentation():
+
+    instrumentation.disable()
+    instrumentation.reset()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_enable_and_disable():
+
+    original = validate_email.validate_email
+    assert instrumentation.enable([FUNCTION]) == [FUNCTION]
+    assert instrumentation.is_enabled()
+    assert validate_email.validate_email is not original
+    assert validate_email.validate_email.__wrapped__ is original
+
+    instrumentation.disable()
+    assert not instrumentation.is_enabled()
+    assert validate_email.validate_email is original
+
+    with pytest.raises(ValueError):
+        instrumentation.enable(["validate_email.unknown"])
+
+
+def test_counters_and_hooks():
+
+    calls = []
+
+    def hook(name, result, elapsed):
+        calls.append((name, result))
+
+    instrumentation.enable([FUNCTION])
+    instrumentation.add_hook(hook)
+    try:
+        validate_email.validate_email("a@corp.com")
+        validate_email.validate_email("b@corp.com", ends_with="@corp.com")
+        validate_email.validate_email("not an email")
+        with pytest.raises(TypeError):
+            validate_email.validate_email(None)
+    finally:
+        instrumentation.remove_hook(hook)
+
+    assert instrumentation.get_counters() == {
+        (FUNCTION, validate_email.RESULT_SUCCESS): 2,
+        (FUNCTION, validate_email.RESULT_FAILED_VALIDATION): 1,
+        (FUNCTION, instrumentation.RESULT_EXCEPTION): 1,
+    }
+    assert calls[0] == (FUNCTION, validate_email.RESULT_SUCCESS)
+    assert calls[-1] == (FUNCTION, instrumentation.RESULT_EXCEPTION)
+
+    # The metrics are kept when the instrumentation is disabled, and removed by reset().
+    instrumentation.disable()
+    validate_email.validate_email("a@corp.com")
+    assert sum(instrumentation.get_counters().values()) == 4
+    instrumentation.reset()
+    assert instrumentation.get_counters() == {}
+
+
+def test_histograms():
+
+    buckets = (0.5, 0.001, 1000.0)
+    instrumentation.enable([FUNCTION], buckets=buckets)
+    for _ in range(3):
+        validate_email.validate_email("a@corp.com")
+    histogram = instrumentation.get_histograms()[FUNCTION]
+    assert histogram.buckets == (0.001, 0.5, 1000.0)
+    assert histogram.count == 3
+    assert 0.0 < histogram.sum < 3000.0
+    assert histogram.cumulative_counts()[-2:] == [3, 3]
+
+    # The histogram returned is a copy.
+    histogram.count = 0
+    assert instrumentation.get_histograms()[FUNCTION].count == 3
+
+    histogram = instrumentation.Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative_counts() == [2, 3, 4]
+
+
+def test_export_prometheus():
+
+    instrumentation.enable([FUNCTION], buckets=(1000.0,))
+    validate_email.validate_email("a@corp.com")
+    validate_email.validate_email("a@corp.com")
+    validate_email.validate_email("not an email")
+    lines = instrumentation.export_prometheus().splitlines()
+
+    assert "# TYPE " + instrumentation.METRIC_CALLS + " counter" in lines
+    assert "# TYPE " + instrumentation.METRIC_LATENCY + " histogram" in lines
+    assert (instrumentation.METRIC_CALLS + '{function="' + FUNCTION + '",result="1",result_name="success"} 2') in lines
+    assert (instrumentation.METRIC_CALLS + '{function="' + FUNCTION
+            + '",result="2",result_name="failed_validation"} 1') in lines
+    assert instrumentation.METRIC_LATENCY + '_bucket{function="' + FUNCTION + '",le="1000.0"} 3' in lines
+    assert instrumentation.METRIC_LATENCY + '_bucket{function="' + FUNCTION + '",le="+Inf"} 3' in lines
+    assert instrumentation.METRIC_LATENCY + '_count{function="' + FUNCTION + '"} 3' in lines
+
+
+def test_result_of_the_streamlit_helper():
+
+    pytest.importorskip("streamlit")
+    from extract_email_from_http_header import streamlit_helper_email_input
+
+    class Container:
+        def text_input(self, label, value="", key=None, **kwargs):
+            return "a@corp.com"
+
+    name = "streamlit_helper_email_input.streamlit_helper_email_input"
+    instrumentation.enable([name])
+    session_state = {"email": "a@corp.com"}
+
+    # The session_state and the key of the output are found whether they are given by position or
+    # by name, and the result is None when the output is not stored.
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state, Container(), "", "", None, "email",
+                                                              "output")
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state=session_state, container=Container(),
+                                                              session_state_key="email",
+                                                              session_state_key_function_output="output")
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state, Container(), session_state_key="email")
+    assert instrumentation.get_counters() == {(name, streamlit_helper_email_input.RESULT_SUCCESS): 2, (name, None): 1}
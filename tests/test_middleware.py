@@ -0,0 +1,107 @@
+"""Tests of the ASGI and WSGI identity middleware."""
+
+import asyncio
+
+import pytest
+
+from extract_email_from_http_header import extract_email_from_raw_headers
+from extract_email_from_http_header import middleware
+from extract_email_from_http_header import output
+from extract_email_from_http_header import validate_email
+
+
+def call_asgi(headers, scope_type="http", **kwargs):
+    """Send a request with the given headers through the ASGI middleware, and return the scope the
+    application got."""
+
+    scopes = []
+
+    async def application(scope, receive, send):
+        scopes.append(scope)
+
+    asgi_middleware = middleware.EmailIdentityASGIMiddleware(application, **kwargs)
+    asyncio.run(asgi_middleware({"type": scope_type, "headers": headers}, None, None))
+    return scopes[0]
+
+
+def call_wsgi(environ, **kwargs):
+    """Send a request with the given environ through the WSGI middleware, and return the environ the
+    application got."""
+
+    environs = []
+
+    def application(environ, start_response):
+        environs.append(environ)
+        return []
+
+    middleware.EmailIdentityWSGIMiddleware(application, **kwargs)(environ, None)
+    return environs[0]
+
+
+def test_header_provider_is_abstract():
+
+    with pytest.raises(TypeError):
+        middleware.HeaderProvider()
+
+    class Incomplete(middleware.HeaderProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_asgi():
+
+    scope = call_asgi([(b"host", b"api.corp.com"), (b"x-email", b"alice@corp.com")], ends_with="@corp.com")
+    identity = scope["state"][middleware.STATE_KEY_IDENTITY]
+    assert isinstance(identity, output.EmailOutput)
+    assert identity == (validate_email.RESULT_SUCCESS, validate_email.REMARKS_SUCCESS, "alice@corp.com")
+
+    scope = call_asgi([(b"x-email", b"alice@other.org")], ends_with="@corp.com")
+    identity = scope["state"][middleware.STATE_KEY_IDENTITY]
+    assert identity.result is validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+    assert identity.email == "alice@other.org"
+
+    scope = call_asgi([(b"host", b"api.corp.com")])
+    assert scope["state"][middleware.STATE_KEY_IDENTITY].result is validate_email.RESULT_NO_EMAIL_HEADER_IN_REQUEST
+
+    # Only the connections with headers are identified.
+    assert "state" not in call_asgi([], scope_type="lifespan")
+
+
+def test_wsgi():
+
+    environ = call_wsgi({"HTTP_HOST": "api.corp.com", "HTTP_X_EMAIL": "alice@corp.com"}, ends_with="@corp.com")
+    identity = environ[middleware.ENVIRON_KEY_IDENTITY]
+    assert isinstance(identity, output.EmailOutput)
+    assert identity == (validate_email.RESULT_SUCCESS, validate_email.REMARKS_SUCCESS, "alice@corp.com")
+
+    environ = call_wsgi({"HTTP_X_AUTH_EMAIL": "alice@corp.com"}, header_key="X-Auth-Email",
+                        should_validate_email=False)
+    assert environ[middleware.ENVIRON_KEY_IDENTITY].email == "alice@corp.com"
+
+    environ = call_wsgi({"HTTP_X_EMAIL": "not an email"})
+    assert environ[middleware.ENVIRON_KEY_IDENTITY].result is validate_email.RESULT_FAILED_VALIDATION
+
+
+def test_duplicate_headers_as_in_the_raw_header_block():
+
+    cases = [([b"alice@corp.com", b"alice@corp.com"], validate_email.RESULT_SUCCESS),
+             ([b"alice@corp.com", b"mallory@corp.com"], validate_email.RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST)]
+    for values, result in cases:
+        scope = call_asgi([(b"x-email", value) for value in values])
+        block = b"GET / HTTP/1.1\r\n" + b"".join(b"X-Email: " + value + b"\r\n" for value in values) + b"\r\n"
+        assert scope["state"][middleware.STATE_KEY_IDENTITY] == (
+            extract_email_from_raw_headers.extract_email_from_raw_headers(block))
+        assert scope["state"][middleware.STATE_KEY_IDENTITY].result is result
+
+
+def test_mapping_header_provider():
+
+    header_provider = middleware.MappingHeaderProvider()
+    assert header_provider.get_values({"X-Email": "alice@corp.com"}) == ["alice@corp.com"]
+    assert header_provider.get_values({"x-email": "alice@corp.com", "X-EMAIL": "bob@corp.com"}) == [
+        "alice@corp.com", "bob@corp.com"]
+    assert header_provider.get_values(None) == []
+    identity = middleware.identify({"x-email": "alice@corp.com", "X-EMAIL": "bob@corp.com"}, header_provider)
+    assert identity.result is validate_email.RESULT_CONFLICTING_EMAIL_HEADERS_IN_REQUEST
@@ -0,0 +1,29 @@
+"""Tests of the outputs of the package, which must keep behaving as the Tuples they replace."""
+
+import json
+import pickle
+
+from extract_email_from_http_header import output
+from extract_email_from_http_header import validate_email
+
+
+def test_outputs_are_tuples():
+
+    header_output = output.HeaderOutput(validate_email.RESULT_SUCCESS, "Success.", "a@corp.com", "X-Email")
+    assert isinstance(header_output, tuple)
+    assert header_output == (1, "Success.", "a@corp.com", "X-Email")
+    assert header_output.email == "a@corp.com" and header_output.header_key == "X-Email"
+    assert header_output._asdict() == {"result": 1, "remarks": "Success.", "email": "a@corp.com",
+                                       "header_key": "X-Email"}
+    assert json.loads(json.dumps(header_output)) == [1, "Success.", "a@corp.com", "X-Email"]
+    assert pickle.loads(pickle.dumps(header_output)) == header_output
+
+
+def test_validate_email_output():
+
+    result, remarks = validation_output = validate_email.validate_email("a@corp.com", ends_with="@example.com")
+    assert isinstance(validation_output, tuple)
+    assert result is validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+    assert "a@corp.com" in remarks and "@example.com" in remarks
+    assert json.loads(json.dumps(validation_output)) == [3, remarks]
+    assert repr(validation_output).startswith("Output(result=")
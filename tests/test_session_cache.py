@@ -0,0 +1,79 @@
+"""Tests of the cache of the extraction in the session_state."""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from extract_email_from_http_header import extract_email_from_headers  # noqa: E402
+from extract_email_from_http_header import session_cache  # noqa: E402
+
+
+class Connection:
+    """Stands in for the websocket connection of a session."""
+
+    def __init__(self, headers):
+        self.headers = headers
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Return the holder of the connection of a fake session, and the list of the headers read."""
+
+    holder = {"connection": Connection({"X-Email": "alice@corp.com"})}
+    reads = []
+
+    def get_websocket_headers():
+        reads.append(holder["connection"].headers)
+        return holder["connection"].headers
+
+    monkeypatch.setattr(session_cache, "_get_connection", lambda: holder["connection"])
+    monkeypatch.setattr(extract_email_from_headers, "_get_websocket_headers", get_websocket_headers)
+    return holder, reads
+
+
+def test_hit_does_not_read_the_headers(session):
+
+    holder, reads = session
+    session_state = {}
+    first = session_cache.cached_extract_email_from_headers(session_state, session_state_key="email")
+    del session_state["email"]
+    second = session_cache.cached_extract_email_from_headers(session_state, session_state_key="email")
+    assert second is first
+    assert first[extract_email_from_headers.OUTPUT_INDEX_RESULT] is extract_email_from_headers.RESULT_SUCCESS
+    assert len(reads) == 1
+
+    # The session_state is updated as the extraction would have.
+    assert session_state["email"] == "alice@corp.com"
+
+
+def test_new_connection_or_arguments_miss(session):
+
+    holder, reads = session
+    session_state = {}
+    session_cache.cached_extract_email_from_headers(session_state, session_state_key="email")
+
+    # The browser reconnects with other headers.
+    holder["connection"] = Connection({"X-Email": "bob@corp.com"})
+    output = session_cache.cached_extract_email_from_headers(session_state, session_state_key="email")
+    assert output[extract_email_from_headers.OUTPUT_INDEX_EMAIL] == "bob@corp.com"
+    assert session_state["email"] == "bob@corp.com"
+    assert len(reads) == 2
+
+    # Another header key.
+    output = session_cache.cached_extract_email_from_headers(session_state, header_key="X-Other",
+                                                             session_state_key="email",
+                                                             set_email_on_failure="nobody@corp.com")
+    assert output[extract_email_from_headers.OUTPUT_INDEX_RESULT] is (
+        extract_email_from_headers.RESULT_NO_EMAIL_HEADER_IN_REQUEST)
+    assert session_state["email"] == "nobody@corp.com"
+    assert len(reads) == 3
+
+
+def test_no_session_is_not_cached(monkeypatch):
+
+    monkeypatch.setattr(session_cache, "_get_connection", lambda: None)
+    monkeypatch.setattr(extract_email_from_headers, "_get_websocket_headers", dict)
+    session_state = {}
+    output = session_cache.cached_extract_email_from_headers(session_state)
+    assert output[extract_email_from_headers.OUTPUT_INDEX_RESULT] is not extract_email_from_headers.RESULT_SUCCESS
+    assert session_cache.SESSION_STATE_KEY_CACHE not in session_state
@@ -0,0 +1,114 @@
+"""Tests of the cache of the mail server check shared by the processes of a host."""
+
+import asyncio
+import multiprocessing
+import os
+import stat
+
+import pytest
+
+from extract_email_from_http_header import shared_cache
+from extract_email_from_http_header import validate_email
+from extract_email_from_http_header import validate_email_async
+
+WORKERS = 4
+DOMAINS_PER_WORKER = 300
+
+
+def has_mail_server(domain: str) -> bool:
+    return sum(map(ord, domain)) % 3 != 0
+
+
+def worker(path: str, index: int, barrier) -> tuple:
+    """Write the domains of this worker, wait for the other workers to write theirs, and then read
+    every domain. Return the number of domains missing and of wrong answers."""
+
+    cache = shared_cache.SharedCache(path, timeout=1.0)
+    for number in range(DOMAINS_PER_WORKER):
+        domain = "worker%d-domain%d.com" % (index, number)
+        cache.set(domain, has_mail_server(domain))
+    barrier.wait()
+    missing = wrong = 0
+    for other in range(WORKERS):
+        for number in range(DOMAINS_PER_WORKER):
+            domain = "worker%d-domain%d.com" % (other, number)
+            answer = cache.get(domain)
+            if answer is None:
+                missing += 1
+            elif answer is not has_mail_server(domain):
+                wrong += 1
+    return missing, wrong
+
+
+def test_processes_share_the_answers(tmp_path):
+
+    path = str(tmp_path / "cache.sqlite3")
+    shared_cache.SharedCache(path)
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, context.Pool(WORKERS) as pool:
+        barrier = manager.Barrier(WORKERS)
+        outcomes = pool.starmap(worker, [(path, index, barrier) for index in range(WORKERS)])
+    assert outcomes == [(0, 0)] * WORKERS
+    assert shared_cache.SharedCache(path).info().size == WORKERS * DOMAINS_PER_WORKER
+
+
+def test_cache_of_validate_emails_async(tmp_path):
+
+    class Resolver(validate_email_async.Resolver):
+        lookups = 0
+
+        async def has_mail_server(self, domain):
+            Resolver.lookups += 1
+            return domain == "corp.com"
+
+    path = str(tmp_path / "cache.sqlite3")
+    emails = ["a@corp.com", "b@nomx.org"]
+    expected = [validate_email.RESULT_SUCCESS, validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER]
+    for _ in range(2):
+        results, _ = asyncio.run(validate_email_async.validate_emails_async(
+            emails, resolver=Resolver(), cache=shared_cache.SharedCache(path)))
+        assert list(results) == expected
+    assert Resolver.lookups == 2
+
+
+def test_expiry_and_bounds(tmp_path):
+
+    cache = shared_cache.SharedCache(str(tmp_path / "cache.sqlite3"), max_size=10, negative_ttl=0)
+    cache.set("nomx.org", False)
+    assert cache.get("nomx.org") is None
+    for number in range(20):
+        cache.set("domain%d.com" % number, True)
+    cache.evict()
+    assert cache.info().size == 10
+    assert cache.get("domain19.com") is True and cache.get("domain0.com") is None
+
+
+def test_default_path_is_private(tmp_path, monkeypatch):
+
+    directory = tmp_path / "private"
+    monkeypatch.setattr(shared_cache, "DEFAULT_DIRECTORY", str(directory))
+    cache = shared_cache.SharedCache()
+    cache.set("corp.com", True)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == shared_cache.DIRECTORY_MODE
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == shared_cache.FILE_MODE
+
+    os.chmod(directory, 0o755)
+    with pytest.raises(PermissionError):
+        shared_cache.SharedCache()
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="Changing the owner requires root.")
+def test_file_of_another_user_is_refused(tmp_path):
+
+    path = tmp_path / "cache.sqlite3"
+    path.touch()
+    os.chown(path, 12345, 12345)
+    with pytest.raises(PermissionError):
+        shared_cache.SharedCache(str(path))
+
+
+def test_symbolic_link_is_refused(tmp_path):
+
+    (tmp_path / "cache.sqlite3").symlink_to(tmp_path / "elsewhere.sqlite3")
+    with pytest.raises(OSError):
+        shared_cache.SharedCache(str(tmp_path / "cache.sqlite3"))
@@ -0,0 +1,61 @@
+"""Tests of the email input helper, with a fake container."""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from extract_email_from_http_header import domain_allowlist  # noqa: E402
+from extract_email_from_http_header import streamlit_helper_email_input  # noqa: E402
+from extract_email_from_http_header import validate_email_cache  # noqa: E402
+
+WIDGET_KEY = "email"
+OUTPUT_KEY = "email_output"
+
+
+class FakeContainer:
+    """Stands in for a Streamlit container. Like a real widget, the text input returns the value
+    stored under its key in the session_state if there is one."""
+
+    def __init__(self, session_state):
+        self.session_state = session_state
+
+    def text_input(self, label, value="", key=None, **kwargs):
+        if key is not None:
+            value = self.session_state.setdefault(key, value)
+        return value
+
+
+def run_helper(text: str, **kwargs):
+    """Run the helper with the given text in the widget, and return its output."""
+
+    session_state = {WIDGET_KEY: text}
+    streamlit_helper_email_input.streamlit_helper_email_input(session_state, container=FakeContainer(session_state),
+                                                              session_state_key=WIDGET_KEY,
+                                                              session_state_key_function_output=OUTPUT_KEY,
+                                                              **kwargs)
+    return session_state[OUTPUT_KEY]
+
+
+def test_validation_cache_gives_the_same_output():
+
+    validate_email_cache.cache_clear()
+    allowlist = domain_allowlist.DomainAllowlist(["corp.com"])
+    for text in ("alice@corp.com", "alice@other.org", "not an email", "alice@corp.com"):
+        for ends_with in ("@corp.com", allowlist, None):
+            assert run_helper(text, email_ends_with=ends_with, use_validation_cache=True) == run_helper(
+                text, email_ends_with=ends_with)
+    info = validate_email_cache.cache_info()
+    assert info.misses == 9
+    assert info.hits == 3
+
+
+def test_validation_cache_sees_allowlist_changes():
+
+    validate_email_cache.cache_clear()
+    allowlist = domain_allowlist.DomainAllowlist(["corp.com"])
+    output = run_helper("alice@other.org", email_ends_with=allowlist, use_validation_cache=True)
+    assert output.result is streamlit_helper_email_input.RESULT_FAIL_VALIDATION_INPUT_DOES_NOT_END_WITH_SPECIFIC_VALUE
+
+    allowlist.add("other.org")
+    output = run_helper("alice@other.org", email_ends_with=allowlist, use_validation_cache=True)
+    assert output.result is streamlit_helper_email_input.RESULT_SUCCESS
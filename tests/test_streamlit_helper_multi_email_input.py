@@ -0,0 +1,47 @@
+"""Tests of the splitting and validation of the text of the multi email helper."""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from extract_email_from_http_header import domain_allowlist  # noqa: E402
+from extract_email_from_http_header import streamlit_helper_multi_email_input  # noqa: E402
+from extract_email_from_http_header import validate_email  # noqa: E402
+
+
+def test_output_is_not_shared_with_the_next_call():
+
+    session_state = {}
+    emails, results = streamlit_helper_multi_email_input.validate_text(session_state, "a@corp.com, not an email")
+    assert emails == ("a@corp.com", "not", "an", "email")
+    results[0] = validate_email.RESULT_UNDEFINED
+
+    # Neither the same text, nor text added at its end, sees the modified result.
+    for text in ("a@corp.com, not an email", "a@corp.com, not an email, b@corp.com"):
+        emails, results = streamlit_helper_multi_email_input.validate_text(session_state, text)
+        assert emails[0] == "a@corp.com"
+        assert results[0] == validate_email.RESULT_SUCCESS
+        assert list(results[1:4]) == [validate_email.RESULT_FAILED_VALIDATION] * 3
+
+
+def test_text_removed_at_the_end():
+
+    session_state = {}
+    streamlit_helper_multi_email_input.validate_text(session_state, "a@corp.com b@corp.com")
+    emails, results = streamlit_helper_multi_email_input.validate_text(session_state, "a@corp.com b@c")
+    assert emails == ("a@corp.com", "b@c")
+    assert list(results) == [validate_email.RESULT_SUCCESS, validate_email.RESULT_FAILED_VALIDATION]
+
+
+def test_allowlist_change_is_seen():
+
+    session_state = {}
+    allowlist = domain_allowlist.DomainAllowlist(["corp.com"])
+    emails, results = streamlit_helper_multi_email_input.validate_text(session_state, "a@corp.com b@other.org",
+                                                                       ends_with=allowlist)
+    assert results[1] == validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE
+
+    allowlist.add("other.org")
+    emails, results = streamlit_helper_multi_email_input.validate_text(session_state, "a@corp.com b@other.org",
+                                                                       ends_with=allowlist)
+    assert list(results) == [validate_email.RESULT_SUCCESS] * 2
@@ -0,0 +1,113 @@
+"""Tests of validate_email_async, with fake resolvers."""
+
+import asyncio
+
+import pytest
+
+from extract_email_from_http_header import validate_email
+from extract_email_from_http_header import validate_email_async
+
+
+class FakeResolver(validate_email_async.Resolver):
+    """Answers from a dictionary of domains. A domain mapped to None fails the lookup. Records the
+    lookups, and the largest number of lookups at the same time."""
+
+    def __init__(self, answers: dict, delay: float = 0.0):
+
+        self.answers = answers
+        self.delay = delay
+        self.lookups = []
+        self.running = 0
+        self.max_running = 0
+
+    async def has_mail_server(self, domain: str) -> bool:
+
+        self.lookups.append(domain)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        answer = self.answers[domain]
+        if answer is None:
+            raise validate_email_async.DomainLookupError("Unable to look up [" + domain + "].")
+        return answer
+
+
+def validate(emails, resolver, **kwargs):
+    kwargs.setdefault("cache", validate_email_async.DomainCache())
+    return asyncio.run(validate_email_async.validate_emails_async(emails, resolver=resolver, **kwargs))
+
+
+def test_result_codes_are_members_of_validate_email_result():
+
+    assert validate_email_async.RESULT_DOMAIN_HAS_NO_MAIL_SERVER is validate_email.Result.DOMAIN_HAS_NO_MAIL_SERVER
+    assert validate_email_async.RESULT_DOMAIN_LOOKUP_FAILED is validate_email.Result.DOMAIN_LOOKUP_FAILED
+    assert len({int(member) for member in validate_email.Result}) == len(validate_email.Result)
+
+
+def test_mail_server_check():
+
+    resolver = FakeResolver({"corp.com": True, "nomx.org": False, "broken.net": None})
+    results, remarks = validate(["a@corp.com", "b@nomx.org", "c@broken.net", "not an email"], resolver,
+                                include_remarks=True)
+    assert list(results) == [validate_email.RESULT_SUCCESS,
+                             validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER,
+                             validate_email.RESULT_DOMAIN_LOOKUP_FAILED,
+                             validate_email.RESULT_FAILED_VALIDATION]
+    assert remarks[1].startswith(validate_email_async.REMARKS_DOMAIN_HAS_NO_MAIL_SERVER)
+    assert remarks[2].startswith(validate_email_async.REMARKS_DOMAIN_LOOKUP_FAILED)
+
+
+def test_domains_are_looked_up_once_and_cached():
+
+    resolver = FakeResolver({"corp.com": True, "nomx.org": False, "broken.net": None})
+    cache = validate_email_async.DomainCache()
+    emails = ["a@corp.com", "b@Corp.com", "c@nomx.org", "d@nomx.org", "e@broken.net"]
+    validate(emails, resolver, cache=cache)
+    assert sorted(resolver.lookups) == ["broken.net", "corp.com", "nomx.org"]
+
+    # The answers are cached, including the negative one, but not the failed lookup.
+    validate(emails, resolver, cache=cache)
+    assert sorted(resolver.lookups) == ["broken.net", "broken.net", "corp.com", "nomx.org"]
+
+
+def test_negative_answers_expire_first():
+
+    now = [0.0]
+    cache = validate_email_async.DomainCache(ttl=100.0, negative_ttl=10.0, clock=lambda: now[0])
+    cache.set("corp.com", True)
+    cache.set("nomx.org", False)
+    now[0] = 50.0
+    assert cache.get("corp.com") is True
+    assert cache.get("nomx.org") is None
+
+
+def test_lookups_are_bounded_by_max_concurrency():
+
+    domains = ["domain%d.com" % index for index in range(40)]
+    resolver = FakeResolver(dict.fromkeys(domains, True), delay=0.01)
+    results, _ = validate(["user@" + domain for domain in domains], resolver, max_concurrency=4)
+    assert list(results) == [validate_email.RESULT_SUCCESS] * len(domains)
+    assert resolver.max_running == 4
+
+
+def test_cancellation_cancels_the_lookups_and_caches_nothing():
+
+    resolver = FakeResolver({"slow%d.com" % index: True for index in range(3)}, delay=60.0)
+    cache = validate_email_async.DomainCache()
+
+    async def run():
+        task = asyncio.ensure_future(validate_email_async.validate_emails_async(
+            ["user@slow%d.com" % index for index in range(3)], resolver=resolver, cache=cache))
+        while resolver.running < 3:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert resolver.running == 0
+    assert cache.info().size == 0
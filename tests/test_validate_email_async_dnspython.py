@@ -0,0 +1,79 @@
+"""Tests of DNSPythonResolver, against an in-process fake name server. They need dnspython."""
+
+import asyncio
+
+import pytest
+
+dns = pytest.importorskip("dns")
+import dns.message  # noqa: E402
+import dns.rcode  # noqa: E402
+import dns.rdatatype  # noqa: E402
+import dns.rrset  # noqa: E402
+
+from extract_email_from_http_header import validate_email  # noqa: E402
+from extract_email_from_http_header import validate_email_async  # noqa: E402
+
+# The zone of the fake name server: the records of every domain. A domain that is not in the zone
+# does not exist, and the name server never answers for the domains in SILENT_DOMAINS.
+ZONE = {
+    "corp.com.": {"MX": ["10 mail.corp.com."]},
+    "nullmx.org.": {"MX": ["0 ."]},
+    "implicit.net.": {"A": ["192.0.2.1"]},
+    "nothing.net.": {"TXT": ['"v=spf1 -all"']},
+}
+SILENT_DOMAINS = {"silent.com."}
+
+
+class FakeNameServer(asyncio.DatagramProtocol):
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+
+        query = dns.message.from_wire(data)
+        question = query.question[0]
+        name = question.name.to_text()
+        if name in SILENT_DOMAINS:
+            return
+        response = dns.message.make_response(query)
+        records = ZONE.get(name)
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        else:
+            record_type = dns.rdatatype.to_text(question.rdtype)
+            if record_type in records:
+                response.answer.append(dns.rrset.from_text_list(name, 300, "IN", record_type, records[record_type]))
+        self.transport.sendto(response.to_wire(), address)
+
+
+def validate_with_name_server(emails, timeout=2.0):
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(FakeNameServer, local_addr=("127.0.0.1", 0))
+        try:
+            port = transport.get_extra_info("sockname")[1]
+            resolver = validate_email_async.DNSPythonResolver(nameservers=["127.0.0.1"], port=port, timeout=timeout)
+            return await validate_email_async.validate_emails_async(emails, resolver=resolver,
+                                                                    cache=validate_email_async.DomainCache())
+        finally:
+            transport.close()
+
+    return list(asyncio.run(run())[0])
+
+
+def test_dnspython_resolver():
+
+    assert validate_with_name_server(["a@corp.com", "b@nullmx.org", "c@implicit.net", "d@nothing.net",
+                                      "e@missing.com"]) == [validate_email.RESULT_SUCCESS,
+                                                            validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER,
+                                                            validate_email.RESULT_SUCCESS,
+                                                            validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER,
+                                                            validate_email.RESULT_DOMAIN_HAS_NO_MAIL_SERVER]
+
+
+def test_dnspython_resolver_timeout():
+
+    assert validate_with_name_server(["a@silent.com", "b@corp.com"], timeout=0.3) == [
+        validate_email.RESULT_DOMAIN_LOOKUP_FAILED, validate_email.RESULT_SUCCESS]
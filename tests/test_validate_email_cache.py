@@ -0,0 +1,49 @@
+"""Tests of the bounded cache of the results of validate_email."""
+
+from extract_email_from_http_header import domain_allowlist
+from extract_email_from_http_header import validate_email
+from extract_email_from_http_header import validate_email_cache
+
+
+def test_hits_misses_and_evictions():
+
+    cache = validate_email_cache.ValidationCache(max_size=2)
+    assert cache.validate_email("a@corp.com") == validate_email.validate_email("a@corp.com")
+    cache.validate_email("a@corp.com")
+    cache.validate_email("b@corp.com", ends_with="@corp.com")
+    cache.validate_email("c@corp.com")
+    assert cache.info() == validate_email_cache.CacheInfo(hits=1, misses=3, evictions=1, bypasses=0, max_size=2,
+                                                          size=2)
+
+    # The least recently used email was evicted.
+    cache.validate_email("a@corp.com")
+    assert cache.info().misses == 4
+
+    cache.clear()
+    assert cache.info() == validate_email_cache.CacheInfo(0, 0, 0, 0, 2, 0)
+
+
+def test_junk_is_not_cached():
+
+    cache = validate_email_cache.ValidationCache()
+    for index in range(10):
+        cache.validate_email("a" * 1000 + str(index) + "@corp.com")
+    cache.validate_email("a@corp.com", ends_with=42)
+    assert cache.info().bypasses == 11
+    assert cache.info().size == 0
+
+
+def test_allowlist_change_is_seen():
+
+    cache = validate_email_cache.ValidationCache()
+    allowlist = domain_allowlist.DomainAllowlist(["corp.com"])
+    assert cache.validate_email("a@other.org", ends_with=allowlist).result is (
+        validate_email.RESULT_EMAIL_DOES_NOT_END_WITH_SPECIFIC_VALUE)
+    assert cache.validate_email("a@corp.com", ends_with=allowlist).result is validate_email.RESULT_SUCCESS
+
+    allowlist.add("other.org")
+    assert cache.validate_email("a@other.org", ends_with=allowlist).result is validate_email.RESULT_SUCCESS
+    assert cache.validate_email("a@corp.com", ends_with=allowlist).result is validate_email.RESULT_SUCCESS
+    assert cache.info().hits == 0
+    assert cache.validate_email("a@corp.com", ends_with=allowlist).result is validate_email.RESULT_SUCCESS
+    assert cache.info().hits == 1